@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for mdq. Run with ``python -m benchmarks``.
+"""
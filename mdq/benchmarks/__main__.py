@@ -0,0 +1,145 @@
+"""
+Benchmarks for the mdq parser.
+
+Usage (from the mdq project directory):
+
+    python -m benchmarks run --questions 1000 --output results.json
+    python -m benchmarks run --mix multiple-choice=1,fill-in=1 --preamble 6
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks imports --repeat 10
+    python -m benchmarks revisions f3963e2^ --questions 300
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .generate import DEFAULT_MIX, generate_bank, parse_mix
+from .imports import run_imports
+from .revisions import compare_revisions
+from .suite import compare, metadata, run_suite
+
+
+def main(argv: list[str] | None = None) -> int:
+    cli = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[1])
+    commands = cli.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmark suite")
+    run.add_argument("--questions", "-n", type=int, default=500)
+    run.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Relative frequency of question types, e.g. multiple-choice=4,fill-in=1",
+    )
+    run.add_argument("--preamble", type=int, default=3, help="Paragraphs per preamble")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", "-o", type=Path, help="Write results as JSON")
+
+    cmp = commands.add_parser("compare", help="Compare two JSON reports")
+    cmp.add_argument("old", type=Path)
+    cmp.add_argument("new", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.1)
+
+    imports = commands.add_parser("imports", help="Measure import times")
+    imports.add_argument("--repeat", type=int, default=5)
+
+    revisions = commands.add_parser(
+        "revisions", help="Compare the parser of two git revisions end to end"
+    )
+    revisions.add_argument("old", help="Baseline revision")
+    revisions.add_argument("new", nargs="?", help="Revision to compare (default: working tree)")
+    revisions.add_argument("--questions", "-n", type=int, default=300)
+    revisions.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    revisions.add_argument("--preamble", type=int, default=3)
+    revisions.add_argument("--repeat", type=int, default=3)
+    revisions.add_argument("--seed", type=int, default=0)
+
+    args = cli.parse_args(argv)
+    if args.command == "run":
+        return run_command(args)
+    if args.command == "imports":
+        return imports_command(args)
+    if args.command == "revisions":
+        return revisions_command(args)
+    return compare_command(args)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    bank = generate_bank(args.questions, args.mix, preamble=args.preamble, seed=args.seed)
+    results = run_suite(bank, repeat=args.repeat)
+    report = {
+        **metadata(),
+        "config": {
+            "questions": args.questions,
+            "mix": args.mix,
+            "preamble": args.preamble,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    print(f"{'phase':<16}{'time (ms)':>12}{'questions/s':>14}{'peak (KiB)':>12}{'errors':>8}")
+    for phase, result in results.items():
+        print(
+            f"{phase:<16}{result['seconds'] * 1000:>12.1f}"
+            f"{result['questions_per_second'] or 0:>14.0f}"
+            f"{result['peak_memory'] / 1024:>12.0f}{result['errors']:>8}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    # Throughput is meaningless if part of the work failed early.
+    if failed := [phase for phase, result in results.items() if result["errors"]]:
+        print(f"error: phases with errors: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def imports_command(args: argparse.Namespace) -> int:
+    print(f"{'scenario':<16}{'time (ms)':>12}{'modules':>10}")
+    for name, result in run_imports(args.repeat).items():
+        print(f"{name:<16}{result['seconds'] * 1000:>12.1f}{result['modules']:>10}")
+    return 0
+
+
+def revisions_command(args: argparse.Namespace) -> int:
+    bank = generate_bank(args.questions, args.mix, preamble=args.preamble, seed=args.seed)
+    results = compare_revisions(bank, args.old, args.new, repeat=args.repeat)
+
+    print(f"{args.old} -> {args.new or 'working tree'}")
+    print(f"{'function':<16}{'old (ms)':>12}{'errors':>8}{'new (ms)':>12}{'errors':>8}{'speed-up':>10}")
+    status = 0
+    for name, result in results.items():
+        old, new = result["old"], result["new"]
+        if old["errors"] or new["errors"]:
+            speedup, status = "n/a", 1
+        else:
+            speedup = f"{old['seconds'] / new['seconds']:.2f}x"
+        print(
+            f"{name:<16}{old['seconds'] * 1000:>12.1f}{old['errors']:>8}"
+            f"{new['seconds'] * 1000:>12.1f}{new['errors']:>8}{speedup:>10}"
+        )
+    if status:
+        print("error: revisions with errors cannot be compared", file=sys.stderr)
+    return status
+
+
+def compare_command(args: argparse.Namespace) -> int:
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    rows = compare(old, new, args.threshold)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for phase, metric, a, b, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{phase:<16}{metric:<22}{a:>14.1f}{b:>14.1f}{b / a:>8.2f}x  {flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Compare the sandboxed executor with one interpreter per execution.
+
+Both run the same small Python program with many inputs. The baseline starts
+a new interpreter with subprocess.run() for each input, which is what a naive
+grader would do. The executor forks each run from warm workers.
+
+Usage:
+
+    python -m benchmarks.executor --submissions 200 --cases 5 --workers 4
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mdq.executor import Executor, Job, TestCase
+
+PROGRAM = """
+n = int(input())
+print(sum(i * i for i in range(n)))
+"""
+
+
+def baseline(jobs: list[Job], workers: int) -> int:
+    def run(args):
+        source, case = args
+        cmd = [sys.executable, "-c", source]
+        return subprocess.run(cmd, input=case.input, capture_output=True, text=True, timeout=5)
+
+    runs = [(job.source, case) for job in jobs for case in job.cases]
+    with ThreadPoolExecutor(workers) as pool:
+        return sum(1 for _ in pool.map(run, runs))
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cli.add_argument("--submissions", type=int, default=200)
+    cli.add_argument("--cases", type=int, default=5)
+    cli.add_argument("--workers", type=int, default=4)
+    cli.add_argument("--batch-size", type=int, default=8)
+    args = cli.parse_args()
+
+    cases = tuple(TestCase(str(100 * i)) for i in range(args.cases))
+    jobs = [Job(f"s{i}", PROGRAM, cases) for i in range(args.submissions)]
+    total = args.submissions * args.cases
+
+    start = time.perf_counter()
+    baseline(jobs, args.workers)
+    naive = time.perf_counter() - start
+
+    with Executor(args.workers, batch_size=args.batch_size) as executor:
+        start = time.perf_counter()
+        results = list(executor.run(jobs))
+        pooled = time.perf_counter() - start
+    assert len(results) == total and all(r.ok for r in results)
+
+    print(f"executions: {total}, workers: {args.workers}")
+    print(f"  subprocess.run: {naive:8.2f} s  ({total / naive:7.0f}/s)")
+    print(f"  executor:       {pooled:8.2f} s  ({total / pooled:7.0f}/s, {naive / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
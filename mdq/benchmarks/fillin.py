@@ -0,0 +1,98 @@
+"""
+Compare compiled fill-in matching with a naive per-response loop.
+
+The naive grader inspects the answer key for each answer, parsing regular
+expressions, case folding accepted answers and computing tolerances every
+time. score_batch matches one column of answers at a time with a matcher
+compiled once per question.
+
+Usage:
+
+    python -m benchmarks.fillin --responses 10000 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import time
+
+import numpy as np
+
+from mdq.fillin import compile_matcher, parse_fill_in, parse_tolerance
+from mdq.models import FillIn
+
+SOURCE = """\
+The capital of France is [^capital], it has about [^population] million people
+and is crossed by the [^river]. Its most famous tower is [^tower] meters tall.
+
+[^capital]: Paris | Paris, France
+[^population]: = 2.1 ±10%
+[^river]: /^(the )?(river )?seine( river)?$/i
+[^tower]: = 330 ± 5 m
+"""
+
+ANSWERS = [
+    ["Paris", "paris", "PARIS ", "Lyon", "paris, france", ""],
+    ["2.1", "2", "2,2", "11", "two", None],
+    ["Seine", "the seine", "Seine River", "Loire", "river seine"],
+    ["330", "324 m", "330m", "300", "1000"],
+]
+
+
+def naive(question: FillIn, responses) -> list[float]:
+    blanks = [part for part in question.body if part.type != "static"]
+    scores = []
+    for response in responses:
+        hits = 0
+        for blank, answer in zip(blanks, response):
+            if answer is None:
+                continue
+            if blank.type == "numeric":
+                tolerance = parse_tolerance(blank.tolerance, blank.answer_key)
+                try:
+                    value = float(answer.removesuffix(blank.unit or "").replace(",", "."))
+                except ValueError:
+                    continue
+                hits += abs(value - blank.answer_key) <= tolerance * (1 + 1e-9) + 1e-9
+            elif isinstance(blank.answer_key, str) and blank.answer_key.startswith("/"):
+                pattern = blank.answer_key[1:].rpartition("/")[0]
+                hits += bool(re.search(pattern, " ".join(answer.split()), re.I))
+            else:
+                keys = [blank.answer_key] if isinstance(blank.answer_key, str) else blank.answer_key
+                hits += " ".join(answer.split()).casefold() in [k.casefold() for k in keys]
+        scores.append(100 * hits / len(blanks))
+    return scores
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cli.add_argument("--responses", type=int, default=10_000)
+    cli.add_argument("--repeat", type=int, default=5)
+    args = cli.parse_args()
+
+    rng = random.Random(0)
+    question = FillIn(id="q", title="Q", stem="?", body=parse_fill_in(SOURCE))
+    responses = [[rng.choice(options) for options in ANSWERS] for _ in range(args.responses)]
+    matcher = compile_matcher(question)
+    assert np.allclose(matcher.score_batch(responses), naive(question, responses))
+
+    loop = best_of(args.repeat, naive, question, responses)
+    batch = best_of(args.repeat, matcher.score_batch, responses)
+    single = best_of(args.repeat, matcher.match, responses[0])
+    print(f"responses: {args.responses}, blanks: {len(matcher.blanks)}")
+    print(f"  naive loop:    {loop * 1000:8.2f} ms")
+    print(f"  score_batch:   {batch * 1000:8.2f} ms  ({loop / batch:.1f}x)")
+    print(f"  single:        {single * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Synthetic question banks.
+
+Each generated question comes with its Markdown source and the data expected
+for the corresponding model, so model construction can be measured without
+depending on the parser.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Any
+
+#: Relative frequency of each question type in the default mix. It only has
+#: types the parser accepts: code-io sources can be generated with --mix, but
+#: parse_question() cannot read them yet.
+DEFAULT_MIX = {
+    "multiple-choice": 4,
+    "true-false": 2,
+    "fill-in": 1,
+}
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua ut enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+
+@dataclass
+class SyntheticQuestion:
+    id: str
+    type: str
+    source: str
+    data: dict[str, Any] = field(repr=False)
+
+
+def parse_mix(src: str) -> dict[str, int]:
+    """
+    Parse a mix specification like "multiple-choice=4,fill-in=1".
+    """
+    mix = {}
+    for item in src.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in GENERATORS:
+            raise ValueError(f"unknown question type: {name}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def generate_bank(
+    size: int,
+    mix: dict[str, int] | None = None,
+    *,
+    preamble: int = 3,
+    seed: int = 0,
+) -> list[SyntheticQuestion]:
+    """
+    Generate size questions, with types drawn from mix.
+
+    ``preamble`` controls the number of paragraphs before the stem. Preambles
+    alternate between plain text, math and tables.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    types = rng.choices(list(mix), weights=list(mix.values()), k=size)
+    return [
+        GENERATORS[kind](rng, f"q{i}", preamble) for i, kind in enumerate(types)
+    ]
+
+
+def exam_source(questions: list[SyntheticQuestion], title: str = "Synthetic exam") -> str:
+    """
+    Join questions into the source of an exam.
+    """
+    parts = [f"# {title}\n\n    shuffle: true\n\nAn exam preamble.\n\n---\n\n"]
+    parts.extend(q.source + "\n" for q in questions)
+    return "".join(parts)
+
+
+def multiple_choice(rng: random.Random, id: str, preamble: int) -> SyntheticQuestion:
+    stem = f"{sentence(rng)}?"
+    correct = rng.randrange(5)
+    lines, choices = [], []
+    for i in range(5):
+        text = sentence(rng, 4)
+        choice: dict[str, Any] = {"text": text}
+        mark = ""
+        if i == correct:
+            mark, choice["correct"] = "[x] ", True
+        lines.append(f"* {mark}{text}")
+        if rng.random() < 0.3:
+            choice["feedback"] = feedback = sentence(rng)
+            lines.append(f"  > {feedback}")
+        choices.append(choice)
+    return _question(rng, id, "multiple-choice", preamble, stem, lines, choices=choices)
+
+
+def true_false(rng: random.Random, id: str, preamble: int) -> SyntheticQuestion:
+    stem = "Judge the statements."
+    lines, choices = [], []
+    for _ in range(rng.randint(3, 6)):
+        value = rng.random() < 0.5
+        text = sentence(rng, 6)
+        lines.append(f"* [{'T' if value else 'F'}] {text}")
+        choices.append({"text": text, "correct": value})
+    return _question(rng, id, "true-false", preamble, stem, lines, choices=choices)
+
+
+def fill_in(rng: random.Random, id: str, preamble: int) -> SyntheticQuestion:
+    a, b = rng.randint(1, 9), rng.randint(1, 9)
+    stem = f"{a} + {b} = [^value], which is an [^oddity] number."
+    options = sorted({a + b, a + b + 1, a + b - 1, a + b + 2})
+    lines = ["[^value]:"]
+    lines.extend(f"  * {n}{' ✅' if n == a + b else ''}" for n in options)
+    lines.append("")
+    lines.append("[^oddity]:")
+    lines.append(f"  * even{' ✅' if (a + b) % 2 == 0 else ''}")
+    lines.append(f"  * odd{' ✅' if (a + b) % 2 else ''}")
+    body = [
+        {"type": "static", "text": f"{a} + {b} = "},
+        {"type": "selection", "choices": [{"text": str(n), "correct": n == a + b} for n in options]},
+        {"type": "static", "text": ", which is an "},
+        {
+            "type": "selection",
+            "choices": [
+                {"text": "even", "correct": (a + b) % 2 == 0},
+                {"text": "odd", "correct": (a + b) % 2 == 1},
+            ],
+        },
+        {"type": "static", "text": " number."},
+    ]
+    return _question(rng, id, "fill-in", preamble, stem, lines, body=body)
+
+
+def code_io(rng: random.Random, id: str, preamble: int) -> SyntheticQuestion:
+    stem = "Write a program that asks the user for their name and greets them."
+    names = [rng.choice(WORDS).title() for _ in range(3)]
+    lines = [
+        "### [io]",
+        "",
+        *(f"    @input {name}" for name in names),
+        "",
+        "### [program]",
+        "",
+        "```python",
+        'name = input("name: ")',
+        'print(f"Hello {name}!")',
+        "```",
+    ]
+    data = {
+        "supported-languages": ["python"],
+        "answer-key": [{"inputs": names}],
+    }
+    return _question(rng, id, "code-io", preamble, stem, lines, **data)
+
+
+GENERATORS = {
+    "multiple-choice": multiple_choice,
+    "true-false": true_false,
+    "fill-in": fill_in,
+    "code-io": code_io,
+}
+
+
+def sentence(rng: random.Random, words: int = 10) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def paragraph(rng: random.Random, kind: int) -> str:
+    match kind % 3:
+        case 0:
+            return " ".join(sentence(rng) + "." for _ in range(4))
+        case 1:
+            return f"{sentence(rng)} $x^{rng.randint(2, 9)} + \\frac{{a}}{{b}}$:\n\n$$\n\\sum_{{i=0}}^n i = \\frac{{n(n+1)}}{{2}}\n$$"
+        case _:
+            rows = "\n".join(f"| {rng.choice(WORDS)} | {rng.randint(0, 99)} |" for _ in range(4))
+            return f"| name | value |\n|------|-------|\n{rows}"
+
+
+def _question(
+    rng: random.Random,
+    id: str,
+    kind: str,
+    preamble: int,
+    stem: str,
+    lines: list[str],
+    **data: Any,
+) -> SyntheticQuestion:
+    title = f"Question {id}"
+    paragraphs = [paragraph(rng, i) for i in range(preamble)]
+    source = "\n\n".join(
+        [f"## [{id}] {title}", "    weight: 1.0", *paragraphs, stem, "\n".join(lines)]
+    )
+    data.update(
+        id=id,
+        title=title,
+        type=kind,
+        stem=stem,
+        preamble="\n\n".join(paragraphs),
+        weight=1.0,
+    )
+    return SyntheticQuestion(id, kind, source + "\n", data)
@@ -0,0 +1,114 @@
+"""
+Compare vectorized batch grading with a naive per-response loop.
+
+Both graders compute the score of random responses to a multiple choice and a
+true/false question. grade_batch is timed from response models, which includes
+encoding them as arrays, and from already encoded arrays, which is the cost of
+re-grading stored responses after the answer key changes.
+
+Usage:
+
+    python -m benchmarks.grading --responses 10000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from mdq.grading import choice_values, encode_responses, grade_batch
+from mdq.models import MultipleChoice, TrueFalse
+from mdq.models.response import MultipleChoiceResponse, TrueFalseResponse
+
+
+def naive_multiple_choice(question: MultipleChoice, responses) -> list[float]:
+    values = choice_values(question).tolist()
+    scores = []
+    for response in responses:
+        ids = response.selected_choice_ids
+        if len(ids) != 1:
+            scores.append(0.0)
+        elif (value := values[ids[0]]) > 0:
+            scores.append(value)
+        else:
+            scores.append(value - question.penalty)
+    return scores
+
+
+def naive_true_false(question: TrueFalse, responses) -> list[float]:
+    key = [v > 0 for v in choice_values(question).tolist()]
+    grading = question.grading
+    size = len(key)
+    scores = []
+    for response in responses:
+        score = 0.0
+        for i, value in response.answer.items():
+            if value == key[i]:
+                score += grading.correct_grade / size
+            else:
+                score -= grading.penalty_for_incorrect / size
+        scores.append(score)
+    return scores
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cli.add_argument("--responses", type=int, default=10_000)
+    cli.add_argument("--choices", type=int, default=5)
+    cli.add_argument("--repeat", type=int, default=5)
+    args = cli.parse_args()
+
+    rng = random.Random(0)
+    n, size = args.responses, args.choices
+    choices = [{"text": f"choice {i}", "correct": i == 0} for i in range(size)]
+    mc = MultipleChoice(id="mc", title="MC", stem="?", choices=choices, penalty=25)
+    tf = TrueFalse(
+        id="tf",
+        title="TF",
+        stem="?",
+        choices=[{**c, "correct": rng.random() < 0.5} for c in choices],
+        grading={"correct_grade": 100, "penalty_for_incorrect": 50},
+    )
+    mc_responses = [
+        MultipleChoiceResponse(question_id="mc", selected_choice_ids=[rng.randrange(size)])
+        for _ in range(n)
+    ]
+    tf_responses = [
+        TrueFalseResponse(
+            question_id="tf",
+            answer={i: rng.random() < 0.5 for i in range(size) if rng.random() < 0.9},
+        )
+        for _ in range(n)
+    ]
+
+    print(f"responses: {n}, choices: {size}")
+    for name, question, responses, naive in [
+        ("multiple-choice", mc, mc_responses, naive_multiple_choice),
+        ("true-false", tf, tf_responses, naive_true_false),
+    ]:
+        expected = naive(question, responses)
+        assert np.allclose(grade_batch(question, responses).scores, expected)
+        encoded = encode_responses(question, responses)
+        loop = best_of(args.repeat, naive, question, responses)
+        batch = best_of(args.repeat, grade_batch, question, responses)
+        regrade = best_of(args.repeat, grade_batch, question, encoded)
+        one = best_of(args.repeat, grade_batch, question, responses[:1])
+        print(f"{name}:")
+        print(f"  naive loop:    {loop * 1000:8.2f} ms")
+        print(f"  grade_batch:   {batch * 1000:8.2f} ms  ({loop / batch:.1f}x)")
+        print(f"  encoded:       {regrade * 1000:8.2f} ms  ({loop / regrade:.1f}x)")
+        print(f"  single:        {one * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Import-time measurements for the mdq package.
+
+Each scenario runs in a fresh interpreter, so module caches from previous runs
+do not hide the cost of importing mdq. The reported time excludes interpreter
+startup and covers only the statements of the scenario.
+
+import:
+    ``import mdq``
+enums:
+    ``import mdq`` and access to the enums used by the server.
+cli:
+    Import of the command line interface.
+first_tokenize:
+    Import and tokenization of a small source, which builds the markdown engine.
+first_model:
+    Import and validation of a single question model.
+"""
+
+import subprocess
+import sys
+from typing import Any
+
+SCENARIOS = {
+    "import": "import mdq",
+    "enums": "import mdq; mdq.QuestionType.MULTIPLE_CHOICE; mdq.Format.MARKDOWN",
+    "cli": "import mdq.cli",
+    "first_tokenize": "from mdq.parser import read_tokens; read_tokens('# Title\\n\\ntext')",
+    "first_model": (
+        "from mdq.models import Essay; "
+        "Essay.model_validate({'id': 'q', 'title': 'Q', 'stem': 'Why?'})"
+    ),
+}
+
+TEMPLATE = """\
+import time
+_start = time.perf_counter()
+{statements}
+_elapsed = time.perf_counter() - _start
+import sys
+print(_elapsed, len(sys.modules))
+"""
+
+
+def run_imports(repeat: int = 5) -> dict[str, dict[str, Any]]:
+    """
+    Measure all import scenarios, keeping the best of repeat runs.
+    """
+    return {name: measure_import(code, repeat) for name, code in SCENARIOS.items()}
+
+
+def measure_import(statements: str, repeat: int = 5) -> dict[str, Any]:
+    """
+    Time statements in repeat fresh interpreters.
+    """
+    code = TEMPLATE.format(statements=statements.replace("; ", "\n"))
+    times = []
+    modules = 0
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        seconds, modules = out.split()
+        times.append(float(seconds))
+    return {"seconds": min(times), "modules": int(modules)}
@@ -0,0 +1,64 @@
+"""
+Compare per-item ItemMark parsing with the batch ItemMarks scanner.
+
+Both approaches classify the items of every list in a synthetic exam and decide
+the question type of each list. Tokenization is done once, outside the timings.
+
+Usage:
+
+    python -m benchmarks.item_marks --questions 1000 --repeat 5
+"""
+
+import argparse
+import time
+
+from mdq.parser import first_child, read_tokens
+from mdq.types import ItemMark, ItemMarks
+
+from .generate import exam_source, generate_bank
+
+
+def per_item(stream, lists: list[int]) -> list:
+    result = []
+    for index in lists:
+        kinds = set()
+        for item in stream[index].children:
+            focus = first_child(item, type="paragraph")
+            focus = first_child(focus, type="inline")
+            kinds.add(ItemMark.parse(focus.content).kind if focus else "none")
+        result.append(kinds)
+    return result
+
+
+def batch(stream, lists: list[int]) -> list:
+    return [ItemMarks.scan(stream, index).question_type() for index in lists]
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cli.add_argument("--questions", type=int, default=1000)
+    cli.add_argument("--repeat", type=int, default=5)
+    args = cli.parse_args()
+
+    mix = {"multiple-choice": 2, "true-false": 1}
+    stream = read_tokens(exam_source(generate_bank(args.questions, mix, preamble=1)))
+    lists = [b.index for b in stream.blocks() if b.type == "bullet_list"]
+
+    old = best_of(args.repeat, per_item, stream, lists)
+    new = best_of(args.repeat, batch, stream, lists)
+    print(f"lists: {len(lists)}")
+    print(f"per item:    {old * 1000:8.2f} ms")
+    print(f"batch scan:  {new * 1000:8.2f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare the SyntaxTreeNode/deque parsing core with the flat TokenStream cursor.
+
+Both cores perform the same work on a synthetic exam: walk all top-level
+blocks with match() calls on type/tag, recover the source of each list and
+read the item marks of each list item. Tokenization is timed separately since
+it is shared by both implementations.
+
+The walkers are hand-written models of the two traversals, not the parser
+itself, so their ratio says nothing about the speed of parse_question() or
+parse_exam(). Use ``python -m benchmarks revisions`` to compare the real
+parser across commits.
+
+Usage:
+
+    python -m benchmarks.parser_core --questions 300 --repeat 5
+"""
+
+import argparse
+import time
+from collections import deque
+
+from markdown_it.tree import SyntaxTreeNode
+
+from mdq.parser import first_child, get_markdown
+from mdq.tokens import TokenStream
+
+from .generate import exam_source, generate_bank
+
+
+def legacy_walk(tokens, source: str) -> int:
+    nodes = deque(SyntaxTreeNode(tokens).children)
+    lines = source.splitlines()
+    count = 0
+    while nodes:
+        node = nodes.popleft()
+        if legacy_verify(node, tag="h2") or legacy_verify(node, type="code_block"):
+            continue
+        if legacy_verify(node, tag="ul"):
+            count += len(legacy_source_block(node, lines))
+            for item in node.children:
+                focus = legacy_first_child(item, type="paragraph")
+                focus = legacy_first_child(focus, type="inline")
+                count += len(focus.content) if focus else 0
+    return count
+
+
+def cursor_walk(tokens, source: str) -> int:
+    stream = TokenStream(tokens, source)
+    size, ends, verify = stream.size, stream.ends, stream.verify
+    count = 0
+    pos = 0
+    while pos < size:
+        index, pos = pos, ends[pos]
+        if verify(index, None, {"tag": "h2"}) or verify(index, None, {"type": "code_block"}):
+            continue
+        if verify(index, None, {"tag": "ul"}):
+            node = stream[index]
+            count += len(stream.source_block(index))
+            for item in node.children:
+                focus = first_child(item, type="paragraph")
+                focus = first_child(focus, type="inline")
+                count += len(focus.content) if focus else 0
+    return count
+
+
+def legacy_verify(node, **kwargs) -> bool:
+    return not any(getattr(node, k) != v for k, v in kwargs.items())
+
+
+def legacy_first_child(node, **kwargs):
+    if node is None or not node.children:
+        return None
+    child = node.children[0]
+    return child if legacy_verify(child, **kwargs) else None
+
+
+def legacy_source_block(node, lines) -> str:
+    start = end = None
+    for child in node.walk():
+        if (pos := child.map) is None:
+            continue
+        a, b = pos
+        start = min(a, b) if start is None else start
+        end = max(a, b) if end is None else max(end, a, b)
+    if start is None or end is None:
+        return ""
+    return "\n".join(lines[start:end])
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cli.add_argument("--questions", type=int, default=300)
+    cli.add_argument("--repeat", type=int, default=5)
+    args = cli.parse_args()
+
+    bank = generate_bank(args.questions, {"multiple-choice": 1}, preamble=1)
+    source = exam_source(bank)
+    md = get_markdown()
+    tokens = md.parse(source)
+    assert legacy_walk(tokens, source) == cursor_walk(tokens, source)
+
+    tokenize = best_of(args.repeat, md.parse, source)
+    legacy = best_of(args.repeat, legacy_walk, tokens, source)
+    cursor = best_of(args.repeat, cursor_walk, tokens, source)
+
+    print(f"questions: {args.questions}, tokens: {len(tokens)}")
+    print(f"tokenize:        {tokenize * 1000:8.2f} ms")
+    print(f"tree + deque:    {legacy * 1000:8.2f} ms")
+    print(f"token cursor:    {cursor * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+End-to-end comparison of the parser of two git revisions.
+
+The mdq sources of each revision are exported to a temporary directory and
+parse_question() and parse_exam() are timed in a fresh interpreter for each
+tree, on the same synthetic corpus. The working tree is used when a revision
+is not given.
+
+Timings are only compared when both trees parse every source without errors:
+a parser that fails early is not faster, so a ratio is not reported.
+"""
+
+import io
+import json
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from .generate import SyntheticQuestion, exam_source
+
+#: Script executed in each tree. It only relies on parse_question() and
+#: parse_exam(), which every revision has. Anything the parser prints is
+#: discarded, so the output is a single JSON document.
+WORKER = """\
+import contextlib, io, json, sys, time
+from mdq.parser import parse_exam, parse_question
+
+def run(func, sources, repeat):
+    times, errors = [], 0
+    for _ in range(repeat):
+        errors = 0
+        start = time.perf_counter()
+        for src in sources:
+            try:
+                func(src)
+            except Exception:
+                errors += 1
+        times.append(time.perf_counter() - start)
+    return {"seconds": min(times), "errors": errors}
+
+corpus = json.load(sys.stdin)
+with contextlib.redirect_stdout(io.StringIO()):
+    results = {
+        "parse_question": run(parse_question, corpus["questions"], corpus["repeat"]),
+        "parse_exam": run(parse_exam, [corpus["exam"]], corpus["repeat"]),
+    }
+print(json.dumps(results))
+"""
+
+
+def export_revision(rev: str, dest: Path) -> Path:
+    """
+    Extract the mdq project directory of a git revision into dest.
+
+    Must be called from the mdq project directory. Return dest.
+    """
+    def git(*args: str, cwd: str | None = None) -> bytes:
+        return subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=True).stdout
+
+    root = git("rev-parse", "--show-toplevel").decode().strip()
+    prefix = git("rev-parse", "--show-prefix").decode().strip()
+    archive = git("archive", "--format=tar", f"{rev}:{prefix}", cwd=root)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest, filter="data")
+    return dest
+
+
+def time_tree(tree: Path, corpus: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """
+    Time the parser of the project in tree on corpus, in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        cwd=tree,
+        input=json.dumps(corpus),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def compare_revisions(
+    questions: list[SyntheticQuestion],
+    old: str,
+    new: str | None = None,
+    repeat: int = 3,
+) -> dict[str, dict[str, Any]]:
+    """
+    Time parse_question() and parse_exam() on revisions old and new.
+
+    Return a mapping from each function to the results of "old" and "new".
+    """
+    corpus = {
+        "questions": [q.source for q in questions],
+        "exam": exam_source(questions),
+        "repeat": repeat,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        old_tree = export_revision(old, Path(tmp, "old"))
+        new_tree = Path.cwd() if new is None else export_revision(new, Path(tmp, "new"))
+        old_results = time_tree(old_tree, corpus)
+        new_results = time_tree(new_tree, corpus)
+    return {
+        name: {"old": old_results[name], "new": new_results[name]} for name in new_results
+    }
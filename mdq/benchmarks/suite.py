@@ -0,0 +1,201 @@
+"""
+Timing and memory measurements for the mdq parser.
+
+Each phase is timed separately on the same synthetic bank:
+
+tokenize:
+    read_tokens() on each question source.
+parse_question:
+    parse_question() on each question source, including tokenization.
+parse_exam:
+    parse_exam() on a single exam with all questions.
+models:
+    pydantic model construction from the expected data of each question.
+load_json:
+    mdq.load_json() on the serialized exam with all questions.
+load_trusted:
+    mdq.load_json() in trusted mode on the same serialized exam.
+
+Peak memory is measured with tracemalloc in a separate run, so it does not
+distort the timings.
+"""
+
+import datetime
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import mdq
+from mdq import models
+from mdq.loader import load_json
+from mdq.parser import parse_exam, parse_question, read_tokens
+
+from .generate import SyntheticQuestion, exam_source
+
+MODEL_TYPES = {
+    cls.model_fields["type"].default: cls
+    for cls in [
+        models.MultipleChoice,
+        models.MultipleSelection,
+        models.TrueFalse,
+        models.Associative,
+        models.Essay,
+        models.FillIn,
+        models.CodeIo,
+        models.UnitTest,
+    ]
+}
+
+
+def run_suite(
+    questions: list[SyntheticQuestion], repeat: int = 3
+) -> dict[str, dict[str, Any]]:
+    """
+    Measure all phases on the given questions.
+    """
+    exam = exam_source(questions)
+    data = exam_json(questions)
+    phases: dict[str, Callable[[], int]] = {
+        "tokenize": lambda: tokenize(questions),
+        "parse_question": lambda: parse_questions(questions),
+        "parse_exam": lambda: parse_exams(exam),
+        "models": lambda: build_models(questions),
+        "load_json": lambda: load_exam_json(data),
+        "load_trusted": lambda: load_exam_json(data, trusted=True),
+    }
+    return {name: measure(func, len(questions), repeat) for name, func in phases.items()}
+
+
+def measure(func: Callable[[], int], count: int, repeat: int) -> dict[str, Any]:
+    """
+    Time func, keeping the best of repeat runs, and measure its peak memory.
+
+    func must return the number of errors it found.
+    """
+    times = []
+    errors = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        errors = func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    return {
+        "seconds": seconds,
+        "questions_per_second": count / seconds if seconds else None,
+        "peak_memory": peak,
+        "errors": errors,
+    }
+
+
+def tokenize(questions: list[SyntheticQuestion]) -> int:
+    for question in questions:
+        read_tokens(question.source)
+    return 0
+
+
+def parse_questions(questions: list[SyntheticQuestion]) -> int:
+    errors = 0
+    for question in questions:
+        try:
+            parse_question(question.source)
+        except Exception:
+            errors += 1
+    return errors
+
+
+def parse_exams(src: str) -> int:
+    try:
+        parse_exam(src)
+    except Exception:
+        return 1
+    return 0
+
+
+def build_models(questions: list[SyntheticQuestion]) -> int:
+    errors = 0
+    for question in questions:
+        try:
+            MODEL_TYPES[question.type].model_validate(question.data)
+        except Exception:
+            errors += 1
+    return errors
+
+
+def exam_json(questions: list[SyntheticQuestion]) -> bytes:
+    """
+    Serialize an exam with the models of all valid questions.
+    """
+    valid = []
+    for question in questions:
+        try:
+            valid.append(MODEL_TYPES[question.type].model_validate(question.data))
+        except Exception:
+            pass
+    exam = models.Exam(id="synthetic", title="Synthetic exam", questions=valid)
+    return exam.model_dump_json(by_alias=True, exclude_unset=True).encode()
+
+
+def load_exam_json(data: bytes, trusted: bool = False) -> int:
+    try:
+        load_json(data, "exam", trusted=trusted)
+    except Exception:
+        return 1
+    return 0
+
+
+def metadata() -> dict[str, Any]:
+    """
+    Information about the environment in which the benchmark was executed.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "mdq": mdq.__version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(
+    old: dict[str, Any], new: dict[str, Any], threshold: float = 0.1
+) -> list[tuple[str, str, float, float, bool]]:
+    """
+    Compare two benchmark reports.
+
+    Return a list of (phase, metric, old, new, regressed) tuples. A metric
+    regressed if it got worse by more than threshold (a fraction).
+    """
+    rows = []
+    for phase, new_result in new["results"].items():
+        if (old_result := old["results"].get(phase)) is None:
+            continue
+        for metric, higher_is_better in [
+            ("questions_per_second", True),
+            ("peak_memory", False),
+        ]:
+            a, b = old_result.get(metric), new_result.get(metric)
+            if not a or not b:
+                continue
+            change = (a - b) / a if higher_is_better else (b - a) / a
+            rows.append((phase, metric, a, b, change > threshold))
+    return rows
@@ -1,20 +1,43 @@
 """
 A simple Markdown-based format to declare questions for a LMS.
+
+The package namespace is cheap to import: the parser, the markdown engine and
+the pydantic models are only loaded when one of the names that need them is
+first accessed.
 """
 
 import os
 import re
+from typing import TYPE_CHECKING
+
+from .models.enums import TextFormat as Format
+from .types import QuestionType
 
-from .models import Exam, Question
-from .parser import parse_exam, parse_question
+if TYPE_CHECKING:
+    from .bank import Bank
+    from .changes import diff
+    from .compiler import compile_tree
+    from .loader import load_json
+    from .models import Exam, ExamHeader, Question
+    from .parser import iter_exam, parse_exam, parse_question
+    from .variants import generate_variants
 
 __version__ = "0.1"
 __author__ = "Fábio Macêdo Mendes"
 __all__ = [
     "parse_question",
     "parse_exam",
+    "iter_exam",
+    "compile_tree",
+    "load_json",
+    "generate_variants",
+    "diff",
+    "Bank",
     "Question",
     "Exam",
+    "ExamHeader",
+    "QuestionType",
+    "Format",
 ]
 
 #: Global regular expression that matches valid slugs.
@@ -24,5 +47,39 @@ SLUG_INVALID_WHITESPACE = set(" \t\n\f")
 
 #: Name of recognized file extensions
 MDQ_EXTENSIONS = (".mdq", ".mde", ".e.md", ".q.md", ".md")
+QUESTION_EXTENSIONS = (".mdq", ".q.md")
+EXAM_EXTENSIONS = (".mde", ".e.md")
+
+#: Public names that are imported on first access.
+_LAZY_MODULES = {
+    "parse_question": "parser",
+    "parse_exam": "parser",
+    "iter_exam": "parser",
+    "compile_tree": "compiler",
+    "load_json": "loader",
+    "generate_variants": "variants",
+    "diff": "changes",
+    "Bank": "bank",
+    "Question": "models",
+    "Exam": "models",
+    "ExamHeader": "models",
+}
 
 del re, os
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY_MODULES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    from importlib import import_module
+
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,246 @@
+"""
+Compiled question banks.
+
+A bank is a single binary file that stores many questions and supports random
+access by key. Readers memory-map the file and only decode the questions they
+ask for, so memory usage does not depend on the size of the bank.
+
+The file layout is::
+
+    header | payloads | keys | index
+
+header:
+    Magic bytes, format version, flags, number of questions and the offsets
+    of the keys table and of the index.
+payloads:
+    The JSON representation of each question, compressed with zlib if the
+    FLAG_ZLIB flag is set.
+keys:
+    UTF-8 encoded keys, concatenated.
+index:
+    One fixed-size entry per question, sorted by key, with the offset and size
+    of its key and of its payload.
+
+All integers are little-endian.
+"""
+
+import mmap
+import os
+import random
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from .models import Question
+
+MAGIC = b"MDQB"
+VERSION = 1
+FLAG_ZLIB = 1
+
+#: File extension for compiled banks.
+BANK_EXTENSION = ".mdqb"
+
+#: magic, version, flags, count, keys offset, index offset
+HEADER = struct.Struct("<4sHHIQQ")
+
+#: key offset, key size, payload offset, payload size
+ENTRY = struct.Struct("<QIQI")
+
+
+class BankWriter:
+    """
+    Write questions to a bank file.
+
+    Payloads are streamed to disk as they are added and only the index is
+    kept in memory. The file is written to a temporary location and moved to
+    path when the writer is closed, so readers never see a partial bank.
+
+    Use it as a context manager, or call close() explicitly.
+    """
+
+    def __init__(self, path: str | Path, *, compress: bool = True) -> None:
+        self.path = Path(path)
+        self.compress = compress
+        self._tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self._entries: list[tuple[bytes, int, int]] = []
+        self._keys: set[bytes] = set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = self._tmp.open("wb")
+        self._fd.write(bytes(HEADER.size))
+
+    def __enter__(self) -> "BankWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __contains__(self, key: str) -> bool:
+        return key.encode("utf-8") in self._keys
+
+    def add(self, key: str, data: str | bytes) -> None:
+        """
+        Add the JSON representation of a question under the given key.
+
+        Raises ValueError if the key was already added. The writer is left
+        untouched, so other entries can still be added.
+        """
+        encoded = key.encode("utf-8")
+        if encoded in self._keys:
+            raise ValueError(f"duplicate key in bank: {key}")
+        self._keys.add(encoded)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self.compress:
+            data = zlib.compress(data)
+        self._entries.append((encoded, self._fd.tell(), len(data)))
+        self._fd.write(data)
+
+    def close(self) -> None:
+        """
+        Write the index and move the bank to its final location.
+        """
+        if self._fd.closed:
+            return
+
+        entries = sorted(self._entries)
+
+        fd = self._fd
+        keys_offset = fd.tell()
+        key_offsets = []
+        for key, _, _ in entries:
+            key_offsets.append(fd.tell())
+            fd.write(key)
+
+        index_offset = fd.tell()
+        for key_offset, (key, offset, size) in zip(key_offsets, entries):
+            fd.write(ENTRY.pack(key_offset, len(key), offset, size))
+
+        flags = FLAG_ZLIB if self.compress else 0
+        fd.seek(0)
+        fd.write(HEADER.pack(MAGIC, VERSION, flags, len(entries), keys_offset, index_offset))
+        fd.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        """
+        Discard the bank being written.
+        """
+        self._fd.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class Bank:
+    """
+    Read-only, memory-mapped view of a bank file.
+
+    Questions are decoded on access with load_json(). Pass ``trusted=True``
+    for banks produced by mdq itself to skip validation on repeated loads of
+    the same question.
+    """
+
+    def __init__(self, path: str | Path, *, trusted: bool = False) -> None:
+        self.path = Path(path)
+        self.trusted = trusted
+        with self.path.open("rb") as fd:
+            if os.fstat(fd.fileno()).st_size < HEADER.size:
+                raise ValueError(f"not a mdq bank: {path}")
+            self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, count, _, index = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"not a mdq bank: {path}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"unsupported bank version: {version}")
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self._count = count
+        self._index = index
+
+    def __enter__(self) -> "Bank":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key.encode("utf-8")) is not None
+
+    def __getitem__(self, key: str) -> "Question":
+        if (pos := self._find(key.encode("utf-8"))) is None:
+            raise KeyError(key)
+        return self.question_at(pos)
+
+    def get(self, key: str, default=None) -> "Question | None":
+        """
+        Return the question stored under key, or default if it does not exist.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        """
+        Iterate over keys in sorted order.
+        """
+        for pos in range(self._count):
+            yield self.key_at(pos).decode("utf-8")
+
+    def key_at(self, pos: int) -> bytes:
+        """
+        Encoded key of the question at the given position of the index.
+        """
+        offset, size, _, _ = ENTRY.unpack_from(self._mmap, self._index + pos * ENTRY.size)
+        return self._mmap[offset : offset + size]
+
+    def data_at(self, pos: int) -> bytes:
+        """
+        JSON representation of the question at the given position of the index.
+        """
+        if not 0 <= pos < self._count:
+            raise IndexError(pos)
+        _, _, offset, size = ENTRY.unpack_from(self._mmap, self._index + pos * ENTRY.size)
+        data = self._mmap[offset : offset + size]
+        return zlib.decompress(data) if self.compressed else data
+
+    def question_at(self, pos: int) -> "Question":
+        """
+        Decode the question at the given position of the index.
+        """
+        from .loader import load_json
+
+        return load_json(self.data_at(pos), trusted=self.trusted)
+
+    def sample(self, k: int, rng: random.Random | None = None) -> list["Question"]:
+        """
+        Decode k distinct questions chosen at random.
+        """
+        positions = (rng or random).sample(range(self._count), k)
+        return [self.question_at(pos) for pos in positions]
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _find(self, key: bytes) -> int | None:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self.key_at(lo) == key:
+            return lo
+        return None
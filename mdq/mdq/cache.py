@@ -0,0 +1,199 @@
+"""
+Persistent, content-addressed cache for parsed documents.
+
+Entries are keyed by a hash of the source text, the parsing options, the mdq
+version and the parser version, and store the validated model as JSON in a
+SQLite database. The cache is bounded in size and evicts the least recently
+used entries first.
+"""
+
+import functools
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import mdq
+
+from .models import Exam, Question
+from .parser import PARSER_VERSION
+
+#: Default maximum size of the cache, in bytes.
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+#: Writes between reads of the real size of the database. Other processes
+#: may write to the same cache, so the running total is only an estimate.
+SYNC_INTERVAL = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    atime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime);
+"""
+
+
+def default_cache_path() -> Path:
+    """
+    Location of the default cache database.
+
+    It can be overridden with the MDQ_CACHE_DIR environment variable.
+    """
+    if path := os.environ.get("MDQ_CACHE_DIR"):
+        return Path(path) / "parse-cache.sqlite3"
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "mdq" / "parse-cache.sqlite3"
+
+
+class ParseCache:
+    """
+    A size-bounded LRU store of parsed questions and exams.
+
+    Pass an instance as the ``cache`` argument of parse_question() or
+    parse_exam(). Use ":memory:" as path for a cache that is not persisted.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        if path is None:
+            path = default_cache_path()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._size = self.size
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        query = "SELECT 1 FROM entries WHERE key = ?"
+        return self._db.execute(query, (key,)).fetchone() is not None
+
+    @staticmethod
+    def key(kind: str, src: str, *options: str | None) -> str:
+        """
+        Compute the cache key for a source parsed with the given options.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"mdq-{mdq.__version__}-{PARSER_VERSION}\0{kind}\0".encode())
+        for option in options:
+            digest.update(b"\1" if option is None else f"{option}\0".encode())
+        digest.update(src.encode("utf-8"))
+        return digest.hexdigest()
+
+    @property
+    def size(self) -> int:
+        """
+        Total size of the stored documents, in bytes.
+        """
+        query = "SELECT COALESCE(SUM(size), 0) FROM entries"
+        return self._db.execute(query).fetchone()[0]
+
+    def get(self, key: str) -> Question | Exam | None:
+        """
+        Return the cached model for key, or None if it is not in the cache.
+        """
+        query = "SELECT type, data FROM entries WHERE key = ?"
+        row = self._db.execute(query, (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        query = "UPDATE entries SET atime = ? WHERE key = ?"
+        self._db.execute(query, (time.time(), key))
+        return load_model(*row)
+
+    def put(self, key: str, model: Question | Exam) -> None:
+        """
+        Store model in the cache, evicting old entries if necessary.
+
+        The size of the cache is tracked with a running total, so evictions
+        only scan the database when the cache may be full.
+        """
+        kind = "exam" if isinstance(model, Exam) else model.type
+        data = model.model_dump_json(by_alias=True, exclude_unset=True).encode()
+        query = "SELECT size FROM entries WHERE key = ?"
+        old = self._db.execute(query, (key,)).fetchone()
+        query = "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)"
+        self._db.execute(query, (key, kind, data, len(data), time.time()))
+        self._size += len(data) - (old[0] if old else 0)
+
+        self._writes += 1
+        if self._writes >= SYNC_INTERVAL:
+            self._writes = 0
+            self._size = self.size
+        if self._size > self.max_size:
+            self.evict()
+
+    def evict(self, max_size: int | None = None) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_size.
+
+        Return the number of removed entries.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        self._size = self.size
+        excess = self._size - max_size
+        if excess <= 0:
+            return 0
+
+        removed = []
+        query = "SELECT key, size FROM entries ORDER BY atime"
+        cursor = self._db.execute(query)
+        for key, size in cursor:
+            removed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        cursor.close()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", removed)
+        self._size = self.size
+        return len(removed)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        self._db.execute("DELETE FROM entries")
+        self._size = 0
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def load_model(kind: str, data: bytes) -> Question | Exam:
+    """
+    Load a model serialized by ParseCache.put().
+    """
+    from .loader import load_json
+
+    return load_json(data, kind)
+
+
+@functools.cache
+def open_cache(path: str | Path | None = None) -> ParseCache:
+    """
+    Return a shared cache instance for the given path.
+
+    Useful in worker processes, in which each process should open its own
+    connection to the database.
+    """
+    return ParseCache(path)
@@ -0,0 +1,260 @@
+"""
+Structural comparison of two versions of an exam.
+
+Questions are matched by id and compared through their content hashes (see
+mdq.hashing). Only questions with different hashes are compared field by
+field, so the cost is linear in the size of the exams. Each changed question
+is classified by what changed, which tells whether stored responses must be
+re-graded, remapped or invalidated:
+
+text:
+    Wording changed: stem, preamble, feedback, the text of a choice, etc.
+order:
+    The same choices are shown in a different order. Responses that refer to
+    choices by position must be remapped with ``choice_map``.
+choices:
+    Choices were added or removed. Responses might refer to choices that no
+    longer exist.
+answer-key:
+    The correct answers changed.
+grading:
+    The weight, penalties or other grading options changed.
+type:
+    The question type changed.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+from .hashing import digest as _digest
+
+if TYPE_CHECKING:
+    from .models import Exam, Question
+
+TEXT = "text"
+ORDER = "order"
+CHOICES = "choices"
+ANSWER_KEY = "answer-key"
+GRADING = "grading"
+TYPE = "type"
+
+#: Changes that require stored responses to be graded again.
+REGRADE_CHANGES = frozenset([ANSWER_KEY, GRADING, CHOICES, TYPE])
+
+#: Fields that hold the correct answers of a question.
+ANSWER_KEY_FIELDS = frozenset(["answer_key", "keys", "values", "body"])
+
+#: Fields that affect how the answers are graded.
+GRADING_FIELDS = frozenset(
+    [
+        "weight",
+        "grading",
+        "penalty",
+        "conf",
+        "timeout",
+        "compilation",
+        "environment",
+        "linting",
+        "supported_languages",
+        "forbidden_functions",
+        "forbidden_modules",
+        "forbidden_types",
+        "forbidden_syntax",
+    ]
+)
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionChange:
+    """
+    Changes to a question that exists in both versions of an exam.
+
+    Attributes
+    ----------
+    id:
+        Question id.
+    changes:
+        Kinds of change, as described in the module documentation.
+    fields:
+        Names of the fields that changed.
+    choice_map:
+        For each choice of the old question, the index of the same choice in
+        the new question, or None if it was removed. Only set when choices
+        were reordered, added or removed.
+    """
+
+    id: str
+    changes: frozenset[str]
+    fields: tuple[str, ...]
+    choice_map: tuple[int | None, ...] | None = None
+
+    @property
+    def regrade(self) -> bool:
+        """
+        Whether stored responses must be graded again.
+        """
+        return not self.changes.isdisjoint(REGRADE_CHANGES)
+
+
+@dataclass(frozen=True, slots=True)
+class ExamDiff:
+    """
+    Minimal set of changes between two versions of an exam.
+
+    Attributes
+    ----------
+    added:
+        Ids of questions that only exist in the new exam.
+    removed:
+        Ids of questions that only exist in the old exam.
+    changed:
+        Changes to questions that exist in both exams.
+    header:
+        Names of the exam fields that changed, other than questions.
+    reordered:
+        Whether questions present in both exams appear in a different order.
+    """
+
+    added: tuple[str, ...] = ()
+    removed: tuple[str, ...] = ()
+    changed: tuple[QuestionChange, ...] = ()
+    header: tuple[str, ...] = ()
+    reordered: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added or self.removed or self.changed or self.header or self.reordered
+        )
+
+    @property
+    def regrade(self) -> list[str]:
+        """
+        Ids of the questions whose stored responses must be graded again.
+        """
+        return [change.id for change in self.changed if change.regrade]
+
+
+def diff(old: "Exam", new: "Exam") -> ExamDiff:
+    """
+    Compare two versions of an exam.
+
+    Raises ValueError if an exam has repeated question ids.
+    """
+    old_questions = _by_id(old.questions)
+    new_questions = _by_id(new.questions)
+
+    changed = []
+    for id, question in new_questions.items():
+        if (previous := old_questions.get(id)) is not None:
+            if change := diff_questions(previous, question):
+                changed.append(change)
+
+    common = [id for id in new_questions if id in old_questions]
+    header = [
+        name
+        for name in type(new).model_fields
+        if name != "questions" and _digest(getattr(old, name)) != _digest(getattr(new, name))
+    ]
+    return ExamDiff(
+        added=tuple(id for id in new_questions if id not in old_questions),
+        removed=tuple(id for id in old_questions if id not in new_questions),
+        changed=tuple(changed),
+        header=tuple(header),
+        reordered=common != [id for id in old_questions if id in new_questions],
+    )
+
+
+def diff_questions(old: "Question", new: "Question") -> QuestionChange | None:
+    """
+    Compare two versions of the same question.
+
+    Return None if they are equivalent.
+    """
+    if old.content_hash() == new.content_hash():
+        return None
+    if old.type != new.type:
+        fields = sorted(set(type(old).model_fields) | set(type(new).model_fields))
+        return QuestionChange(new.id, frozenset([TYPE]), tuple(fields))
+
+    changes = set()
+    fields = []
+    choice_map = None
+    for name in type(new).model_fields:
+        if name == "id":
+            continue
+        if name == "choices":
+            kinds, choice_map = _diff_choices(old.choices, new.choices)  # type: ignore[attr-defined]
+            if kinds:
+                changes.update(kinds)
+                fields.append(name)
+            continue
+        if _digest(getattr(old, name)) == _digest(getattr(new, name)):
+            continue
+        fields.append(name)
+        if name in ANSWER_KEY_FIELDS:
+            changes.add(ANSWER_KEY)
+        elif name in GRADING_FIELDS:
+            changes.add(GRADING)
+        else:
+            changes.add(TEXT)
+
+    if not changes:
+        return None
+    return QuestionChange(new.id, frozenset(changes), tuple(fields), choice_map)
+
+
+def _diff_choices(old: list, new: list) -> tuple[set[str], tuple[int | None, ...] | None]:
+    old_content = [_choice_digest(c) for c in old]
+    new_content = [_choice_digest(c) for c in new]
+    old_key = [_digest(c.correct) for c in old]
+    new_key = [_digest(c.correct) for c in new]
+
+    if old_content == new_content:
+        return ({ANSWER_KEY} if old_key != new_key else set()), None
+
+    # Match choices with the same content, in order of appearance.
+    positions = defaultdict(list)
+    for i, content in enumerate(new_content):
+        positions[content].append(i)
+    for stack in positions.values():
+        stack.reverse()
+    choice_map = tuple(
+        positions[content].pop() if positions.get(content) else None
+        for content in old_content
+    )
+
+    if None not in choice_map and len(old) == len(new):
+        changes = {ORDER}
+        if any(old_key[i] != new_key[j] for i, j in enumerate(choice_map)):  # type: ignore[index]
+            changes.add(ANSWER_KEY)
+        return changes, choice_map
+
+    if len(old) == len(new):
+        # Same number of choices with some of them edited in place.
+        changes = {TEXT}
+        if old_key != new_key:
+            changes.add(ANSWER_KEY)
+        return changes, None
+
+    changes = {CHOICES}
+    matched = [(i, j) for i, j in enumerate(choice_map) if j is not None]
+    if any(old_key[i] != new_key[j] for i, j in matched) or any(
+        new[j].correct for j in set(range(len(new))) - {j for _, j in matched}
+    ):
+        changes.add(ANSWER_KEY)
+    return changes, choice_map
+
+
+def _by_id(questions: Iterable["Question"]) -> dict[str, "Question"]:
+    result = {}
+    for question in questions:
+        if question.id in result:
+            raise ValueError(f"repeated question id: {question.id}")
+        result[question.id] = question
+    return result
+
+
+def _choice_digest(choice) -> bytes:
+    return _digest([choice.text, choice.feedback, choice.fixed])
+
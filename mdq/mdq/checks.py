@@ -0,0 +1,318 @@
+"""
+Static checks of forbidden functions, modules, types and syntax.
+
+Programming questions can forbid students from using some functions, modules,
+types or syntactic constructs. Submissions are parsed once and a single pass
+over the syntax tree collects everything the rules need: how many times each
+keyword is used, which names are referenced and which modules are imported.
+Analyses are cached by the hash of the source, so identical submissions are
+only parsed once.
+
+Names are resolved through imports, so ``from os import system as run`` makes
+``run()`` count as a use of ``os.system``. Builtins can be referred to with or
+without the "builtins." prefix. Only Python sources are supported.
+"""
+
+import ast
+import hashlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    from .models.question import BaseProgrammingQuestion
+
+type Rule = Literal["function", "module", "type", "syntax", "error"]
+
+#: Maximum number of analyses kept by analyze().
+ANALYSIS_CACHE_SIZE = 4096
+
+#: Keywords counted for each type of node.
+KEYWORDS: dict[type[ast.AST], tuple[str, ...]] = {
+    ast.If: ("if",),
+    ast.IfExp: ("if",),
+    ast.For: ("for",),
+    ast.AsyncFor: ("async", "for"),
+    ast.comprehension: ("for",),
+    ast.While: ("while",),
+    ast.FunctionDef: ("def",),
+    ast.AsyncFunctionDef: ("async", "def"),
+    ast.Lambda: ("lambda",),
+    ast.ClassDef: ("class",),
+    ast.Import: ("import",),
+    ast.ImportFrom: ("import",),
+    ast.Try: ("try",),
+    ast.TryStar: ("try",),
+    ast.With: ("with",),
+    ast.AsyncWith: ("async", "with"),
+    ast.Return: ("return",),
+    ast.Break: ("break",),
+    ast.Continue: ("continue",),
+    ast.Pass: ("pass",),
+    ast.Global: ("global",),
+    ast.Nonlocal: ("nonlocal",),
+    ast.Yield: ("yield",),
+    ast.YieldFrom: ("yield",),
+    ast.Await: ("await",),
+    ast.Assert: ("assert",),
+    ast.Delete: ("del",),
+    ast.Raise: ("raise",),
+    ast.Match: ("match",),
+    ast.And: ("and",),
+    ast.Or: ("or",),
+    ast.Not: ("not",),
+    ast.In: ("in",),
+    ast.NotIn: ("not", "in"),
+    ast.Is: ("is",),
+    ast.IsNot: ("is", "not"),
+}
+
+#: Types created by literals and comprehensions.
+LITERAL_TYPES: dict[type[ast.AST], str] = {
+    ast.List: "list",
+    ast.ListComp: "list",
+    ast.Dict: "dict",
+    ast.DictComp: "dict",
+    ast.Set: "set",
+    ast.SetComp: "set",
+    ast.Tuple: "tuple",
+    ast.JoinedStr: "str",
+    ast.GeneratorExp: "generator",
+}
+
+#: Functions that import modules given by name.
+IMPORT_FUNCTIONS = frozenset(["__import__", "importlib.import_module"])
+
+
+@dataclass(frozen=True, slots=True)
+class Analysis:
+    """
+    Facts about a Python source needed by the checks.
+
+    Attributes
+    ----------
+    syntax:
+        Number of times each keyword is used.
+    names:
+        Fully qualified names referenced by the code, like "print" or
+        "os.path.join", including every prefix of dotted names.
+    modules:
+        Imported modules, including their parent packages and dotted names
+        accessed through them.
+    literals:
+        Types created by literals and comprehensions.
+    error:
+        Syntax error message, if the source could not be parsed.
+    """
+
+    syntax: Counter[str]
+    names: frozenset[str]
+    modules: frozenset[str]
+    literals: frozenset[str]
+    error: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Violation:
+    """
+    A use of something forbidden by a question.
+    """
+
+    rule: Rule
+    name: str
+    message: str
+
+
+_cache: OrderedDict[bytes, Analysis] = OrderedDict()
+
+
+def analyze(source: str) -> Analysis:
+    """
+    Analyze a Python source.
+
+    Results are cached by the content of source.
+    """
+    key = hashlib.blake2b(source.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    try:
+        result = _cache[key]
+    except KeyError:
+        pass
+    else:
+        _cache.move_to_end(key)
+        return result
+
+    result = _analyze(source)
+    _cache[key] = result
+    if len(_cache) > ANALYSIS_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
+
+
+class Checker:
+    """
+    Forbidden names and syntax limits of a question, prepared to check many
+    submissions.
+    """
+
+    def __init__(
+        self,
+        functions=(),
+        modules=(),
+        types=(),
+        syntax: dict[str, int] | None = None,
+    ) -> None:
+        self.functions = frozenset(map(_strip_builtins, functions))
+        self.modules = frozenset(modules)
+        self.types = frozenset(map(_strip_builtins, types))
+        self.syntax = dict(syntax or {})
+
+    def __bool__(self) -> bool:
+        return bool(self.functions or self.modules or self.types or self.syntax)
+
+    @classmethod
+    def from_question(
+        cls, question: "BaseProgrammingQuestion", language: str = "python"
+    ) -> "Checker":
+        """
+        Rules declared by question for the given language.
+
+        Raises ValueError if the question declares rules for a language other
+        than Python.
+        """
+        checker = cls(
+            question.forbidden_functions.get(language, ()),
+            question.forbidden_modules.get(language, ()),
+            question.forbidden_types.get(language, ()),
+            question.forbidden_syntax,
+        )
+        if checker and language != "python":
+            raise ValueError(f"static checks are not supported for {language}")
+        return checker
+
+    def check(self, source: str) -> list[Violation]:
+        """
+        Return all violations found in source.
+
+        A source with syntax errors yields a single "error" violation.
+        """
+        if not self:
+            return []
+        analysis = analyze(source)
+        if analysis.error is not None:
+            return [Violation("error", "SyntaxError", analysis.error)]
+
+        violations = []
+        for name in sorted(self.modules & analysis.modules):
+            violations.append(Violation("module", name, f"module {name} cannot be imported"))
+        for name in sorted(self.functions & analysis.names):
+            violations.append(Violation("function", name, f"function {name} cannot be used"))
+        for name in sorted(self.types & (analysis.names | analysis.literals)):
+            violations.append(Violation("type", name, f"type {name} cannot be used"))
+        for keyword, limit in self.syntax.items():
+            if (count := analysis.syntax[keyword]) > limit:
+                if limit == 0:
+                    message = f'"{keyword}" cannot be used'
+                else:
+                    message = f'"{keyword}" can be used at most {limit} times, found {count}'
+                violations.append(Violation("syntax", keyword, message))
+        return violations
+
+
+def check(
+    question: "BaseProgrammingQuestion", source: str, language: str = "python"
+) -> list[Violation]:
+    """
+    Check source against the rules of a question.
+    """
+    return Checker.from_question(question, language).check(source)
+
+
+def _analyze(source: str) -> Analysis:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as ex:
+        return Analysis(Counter(), frozenset(), frozenset(), frozenset(), str(ex))
+
+    syntax: Counter[str] = Counter()
+    literals = set()
+    references = set()
+    aliases = {}
+    modules = set()
+    dynamic_imports = []
+    keywords, literal_types = KEYWORDS, LITERAL_TYPES
+
+    for node in ast.walk(tree):
+        cls = type(node)
+        if cls is ast.Name:
+            references.add(node.id)
+            continue
+        if cls is ast.Attribute:
+            if (dotted := _dotted(node)) is not None:
+                references.add(dotted)
+            continue
+        if (words := keywords.get(cls)) is not None:
+            syntax.update(words)
+            if cls is ast.comprehension:
+                if node.ifs:
+                    syntax["if"] += len(node.ifs)
+                if node.is_async:
+                    syntax["async"] += 1
+            elif cls is ast.Import:
+                for alias in node.names:
+                    modules.add(alias.name)
+                    if alias.asname:
+                        aliases[alias.asname] = alias.name
+            elif cls is ast.ImportFrom and node.level == 0 and node.module:
+                modules.add(node.module)
+                for alias in node.names:
+                    aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+        elif (name := literal_types.get(cls)) is not None:
+            literals.add(name)
+        elif cls is ast.Call and node.args:
+            arg = node.args[0]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                if (func := _dotted(node.func)) is not None:
+                    dynamic_imports.append((func, arg.value))
+
+    # Aliases are only known after the whole tree is visited.
+    for func, module in dynamic_imports:
+        if _resolve(func, aliases) in IMPORT_FUNCTIONS:
+            modules.add(module)
+    names = set()
+    for reference in references:
+        names.update(_prefixes(_resolve(reference, aliases)))
+    imported = set()
+    for module in modules:
+        imported.update(_prefixes(module))
+    # Submodules used through an imported package, like numpy.linalg after
+    # "import numpy".
+    roots = {module.partition(".")[0] for module in modules}
+    imported.update(name for name in names if name.partition(".")[0] in roots)
+    return Analysis(syntax, frozenset(names), frozenset(imported), frozenset(literals))
+
+
+def _dotted(node: ast.AST) -> str | None:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _resolve(name: str, aliases: dict[str, str]) -> str:
+    head, _, tail = name.partition(".")
+    if (target := aliases.get(head)) is not None:
+        name = f"{target}.{tail}" if tail else target
+    return _strip_builtins(name)
+
+
+def _prefixes(name: str) -> list[str]:
+    parts = name.split(".")
+    return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def _strip_builtins(name: str) -> str:
+    return name.removeprefix("builtins.")
@@ -0,0 +1,147 @@
+"""
+Command line interface for mdq.
+"""
+
+from pathlib import Path
+from typing import Annotated
+
+import rich
+import typer
+
+MANIFEST_NAME = ".mdq-manifest.json"
+
+app = typer.Typer(
+    help="Markdown questions toolkit",
+    add_completion=False,
+    pretty_exceptions_enable=False,
+)
+
+
+@app.callback()
+def callback():
+    """
+    Markdown questions toolkit.
+    """
+
+
+@app.command("compile")
+def compile_(
+    path: Annotated[Path, typer.Argument(help="Source file or directory")],
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            help="Output directory, a .jsonl file to write JSON Lines or a .mdqb bank",
+        ),
+    ] = None,
+    workers: Annotated[
+        int | None,
+        typer.Option("--workers", "-j", help="Number of worker processes"),
+    ] = None,
+    cache: Annotated[
+        Path | None,
+        typer.Option("--cache", help="Path to a parse cache database"),
+    ] = None,
+    no_cache: Annotated[
+        bool, typer.Option("--no-cache", help="Parse all files from scratch")
+    ] = False,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            "--incremental",
+            "-i",
+            help="Only compile sources that changed since the last build",
+        ),
+    ] = False,
+    quiet: Annotated[
+        bool, typer.Option("--quiet", "-q", help="Only report errors")
+    ] = False,
+):
+    """
+    Parse all questions and exams under PATH.
+    """
+    from .cache import default_cache_path
+    from .compiler import compile_tree
+
+    if no_cache:
+        cache = None
+    elif cache is None:
+        cache = default_cache_path()
+
+    manifest = None
+    if incremental:
+        if output is None or output.suffix in (".jsonl", ".mdqb"):
+            rich.print("[bold red]--incremental requires an output directory[/bold red]")
+            raise typer.Exit(code=2)
+        manifest = output / MANIFEST_NAME
+
+    compiled = errors = 0
+    results = compile_tree(
+        path, workers=workers, output=output, cache=cache, manifest=manifest
+    )
+    for result in results:
+        if result.ok:
+            compiled += 1
+            if not quiet:
+                rich.print(f"[green]ok[/green]    {result.path}")
+        else:
+            errors += 1
+            rich.print(f"[bold red]error[/bold red] {result.path}: {result.error}")
+
+    if not quiet:
+        rich.print(f"\n{compiled} compiled, {errors} failed")
+    if errors:
+        raise typer.Exit(code=1)
+
+
+@app.command("watch")
+def watch(
+    path: Annotated[Path, typer.Argument(help="Source file or directory")],
+    json_: Annotated[
+        bool,
+        typer.Option("--json", help="Print one JSON document per update"),
+    ] = False,
+    poll: Annotated[
+        bool, typer.Option("--poll", help="Poll for changes instead of using inotify")
+    ] = False,
+    debounce: Annotated[
+        float,
+        typer.Option("--debounce", help="Seconds to wait for a burst of saves to end"),
+    ] = 0.05,
+):
+    """
+    Parse all questions and exams under PATH and re-parse them as they change.
+    """
+    from .watch import Update, Watcher
+
+    def report(update: Update) -> None:
+        if json_:
+            print(update.to_json(), flush=True)
+            return
+        failed = {d.path for d in update.diagnostics}
+        for path in update.parsed:
+            if str(path) not in failed:
+                rich.print(f"[green]ok[/green]    {path}")
+        for path in update.removed:
+            rich.print(f"[yellow]removed[/yellow] {path}")
+        for d in update.diagnostics:
+            line = "" if d.span is None else f":{d.span[0] + 1}"
+            rich.print(f"[bold red]error[/bold red] {d.path}{line}: {d.error}: {d.message}")
+        rich.print(f"[dim]{len(update.parsed)} parsed in {update.elapsed * 1000:.1f} ms[/dim]")
+
+    with Watcher(path, debounce=debounce, backend="poll" if poll else "auto") as watcher:
+        report(watcher.scan())
+        try:
+            for update in watcher.updates():
+                report(update)
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    app()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Bulk compilation of question banks.
+
+A question bank is a directory tree of question (.q.md, .mdq) and exam
+(.e.md, .mde) files. The functions in this module walk the tree, parse each
+source in a pool of worker processes and stream the resulting JSON documents
+to disk.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+from typing import IO, Iterator, Literal
+
+from .bank import BANK_EXTENSION, BankWriter
+from .cache import open_cache
+from .incremental import Manifest, SourceEntry, parse_exam_incremental
+from .parser import parse_exam, parse_question
+from .utils import remove_extensions, source_kind
+
+type SourceKind = Literal["question", "exam"]
+
+
+@dataclass
+class CompileResult:
+    """
+    Result of compiling a single source file.
+
+    Exactly one of ``data`` or ``error`` is set. ``data`` holds the validated
+    model serialized as JSON, so results are cheap to send across processes.
+    Incremental builds also set ``source``, the manifest entry of the content
+    that was actually parsed.
+    """
+
+    path: Path
+    kind: SourceKind
+    data: str | None = None
+    error: str | None = None
+    source: SourceEntry | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_sources(path: str | Path) -> list[Path]:
+    """
+    List all question and exam files under path, in a deterministic order.
+    """
+    path = Path(path)
+    if path.is_file():
+        return [path] if source_kind(path.name) else []
+
+    sources = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        sources.extend(Path(root, f) for f in sorted(files) if source_kind(f))
+    return sources
+
+
+def compile_file(
+    path: Path,
+    cache: str | Path | None = None,
+    incremental: bool = False,
+) -> CompileResult:
+    """
+    Parse a single question or exam file.
+
+    Errors are captured in the result instead of being raised. If cache is
+    given, it is the path to a parse cache database. Incremental compilation
+    requires a cache and parses exams one question at a time, re-using the
+    cached questions that did not change.
+    """
+    kind = source_kind(path.name)
+    if kind is None:
+        return CompileResult(path, "question", error="not a mdq source file")
+
+    source = None
+    try:
+        parse_cache = None if cache is None else open_cache(cache)
+        src: str | Path = path
+        filename = None
+        if incremental:
+            # The manifest records the hash of the bytes that were parsed.
+            source, src = SourceEntry.read(path, kind)
+            filename = path.name
+        if kind == "question":
+            model = parse_question(src, filename=filename, cache=parse_cache)
+        elif incremental and parse_cache is not None:
+            model = parse_exam_incremental(src, parse_cache, filename=filename)
+        else:
+            model = parse_exam(src, filename=filename, cache=parse_cache)
+        # Fields left unset are omitted, so the output can be loaded back even
+        # when their defaults do not validate, like the empty title.
+        data = model.model_dump_json(by_alias=True, exclude_unset=True)
+    except Exception as ex:
+        return CompileResult(path, kind, error=f"{type(ex).__name__}: {ex}")
+    return CompileResult(path, kind, data=data, source=source)
+
+
+def compile_tree(
+    path: str | Path,
+    *,
+    workers: int | None = None,
+    output: str | Path | None = None,
+    cache: str | Path | None = None,
+    manifest: str | Path | None = None,
+    chunksize: int = 16,
+) -> Iterator[CompileResult]:
+    """
+    Compile all question and exam files under path.
+
+    Sources are split across ``workers`` processes (defaults to the number of
+    CPUs). Results are yielded in the order files are found as soon as they are
+    ready. A failure in one file never aborts the whole compilation: check
+    ``result.error`` for each result.
+
+    If ``output`` is given, successful results are also written to disk. A path
+    ending in ``.jsonl`` is written as a JSON Lines file with one document per
+    line. A path ending in ``.mdqb`` is written as a compiled bank (see
+    mdq.bank), with questions of exams stored as separate entries. Any other
+    path is treated as a directory that mirrors the source tree, with one .json
+    file per source.
+
+    ``cache`` is the path to a ParseCache database shared by all workers.
+    Unchanged sources are loaded from it instead of being parsed again. No
+    cache is used if it is None.
+
+    ``manifest`` enables incremental builds. It is the path to a file that
+    records the state of each source after it is compiled. Only sources that
+    changed since the last build, or whose media files changed, are compiled
+    and yielded. Incremental builds cannot write JSON Lines files or banks,
+    since the unchanged documents would be lost. Exams are only re-parsed
+    question by question if a cache is given.
+    """
+    base = Path(path)
+    sources = find_sources(base)
+    if base.is_file():
+        base = base.parent
+    if output is not None:
+        output = Path(output)
+
+    if manifest is None:
+        yield from _write_results(
+            _compile_all(sources, workers, cache, chunksize), output, base
+        )
+        return
+
+    if output is not None and output.suffix in (".jsonl", BANK_EXTENSION):
+        raise ValueError("incremental builds require an output directory")
+
+    manifest = Manifest.load(manifest)
+    for name in manifest.prune(sources, base):
+        if output is not None:
+            remove_json_file(output, Path(name))
+
+    stale = [src for src in sources if not manifest.is_fresh(src, base)]
+    results = _compile_all(stale, workers, cache, chunksize, incremental=True)
+    try:
+        for result in _write_results(results, output, base):
+            if result.ok:
+                manifest.record(result.path, base, result.kind, result.source)
+            else:
+                manifest.entries.pop(result.path.relative_to(base).as_posix(), None)
+            yield result
+    finally:
+        manifest.save()
+
+
+def _write_results(
+    results: Iterator[CompileResult], output: Path | None, base: Path
+) -> Iterator[CompileResult]:
+    if output is None:
+        yield from results
+    elif output.suffix == ".jsonl":
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open("w", encoding="utf-8") as fd:
+            for result in results:
+                if result.ok:
+                    write_jsonl_record(fd, result, base)
+                yield result
+    elif output.suffix == BANK_EXTENSION:
+        with BankWriter(output) as bank:
+            for result in results:
+                if result.ok:
+                    result = add_bank_entries(bank, result, base)
+                yield result
+    else:
+        for result in results:
+            if result.ok:
+                write_json_file(output, result, base)
+            yield result
+
+
+def write_jsonl_record(fd: IO[str], result: CompileResult, base: Path) -> None:
+    """
+    Write result as a single line of a JSON Lines file.
+    """
+    path = json.dumps(result.path.relative_to(base).as_posix())
+    fd.write(f'{{"path": {path}, "kind": "{result.kind}", "data": {result.data}}}\n')
+
+
+def add_bank_entries(bank: BankWriter, result: CompileResult, base: Path) -> CompileResult:
+    """
+    Add the entries of result to bank.
+
+    Nothing is added if any key is repeated, either within the result or with
+    an entry of a previous result. The returned result records the error
+    instead, and the rest of the bank is still written.
+    """
+    entries = list(bank_entries(result, base))
+    seen: set[str] = set()
+    for key, _ in entries:
+        if key in bank or key in seen:
+            return replace(result, data=None, error=f"ValueError: duplicate key in bank: {key}")
+        seen.add(key)
+    for key, data in entries:
+        bank.add(key, data)
+    return result
+
+
+def bank_entries(result: CompileResult, base: Path) -> Iterator[tuple[str, str]]:
+    """
+    Split result into (key, data) entries of a compiled bank.
+
+    The key of a question file is its path relative to base, without
+    extensions. Questions of an exam use the key of the exam followed by the
+    question id, as in "week1/exam/q1".
+    """
+    relative = result.path.relative_to(base)
+    key = (relative.parent / remove_extensions(relative.name)).as_posix()
+    if result.kind == "question":
+        yield key, result.data or ""
+        return
+    for question in json.loads(result.data or "{}").get("questions", []):
+        yield f"{key}/{question['id']}", json.dumps(question, separators=(",", ":"))
+
+
+def write_json_file(output: Path, result: CompileResult, base: Path) -> Path:
+    """
+    Write result to the output directory, mirroring its path relative to base.
+    """
+    dest = json_file_path(output, result.path.relative_to(base))
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_text(result.data or "", encoding="utf-8")
+    return dest
+
+
+def remove_json_file(output: Path, relative: Path) -> None:
+    """
+    Remove the output file of a deleted source.
+    """
+    json_file_path(output, relative).unlink(missing_ok=True)
+
+
+def json_file_path(output: Path, relative: Path) -> Path:
+    return output / relative.parent / f"{remove_extensions(relative.name)}.json"
+
+
+def _compile_all(
+    sources: list[Path],
+    workers: int | None,
+    cache: str | Path | None,
+    chunksize: int,
+    incremental: bool = False,
+) -> Iterator[CompileResult]:
+    if cache is not None:
+        cache = Path(cache).absolute()
+    compile_one = partial(compile_file, cache=cache, incremental=incremental)
+
+    if workers == 1 or len(sources) <= 1:
+        yield from map(compile_one, sources)
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+    chunksize = max(1, min(chunksize, len(sources) // workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(compile_one, sources, chunksize=chunksize)
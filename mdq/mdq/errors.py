@@ -1,6 +1,8 @@
-from markdown_it.tree import SyntaxTreeNode as Node
 from dataclasses import dataclass
 
+from .tokens import Block, Span
+
+
 class ParseError(ValueError):
     message: str
 
@@ -11,7 +13,7 @@ class EmptyQuestions(ParseError):
 
 @dataclass
 class NodesRemaining(ParseError):
-    node: Node
+    node: Block
     message: str = "There are unparsed nodes remaining"
 
 
@@ -25,3 +27,26 @@ class MissingField(ParseError):
 class IncompleteQuestion(ParseError):
     message: str = "Question ended before inferring its type"
 
+
+@dataclass
+class InvalidBlank(ParseError):
+    name: str
+    message: str = "Invalid fill-in blank"
+
+
+@dataclass
+class DuplicateQuestion(ParseError):
+    id: str
+    message: str = "Two questions have the same id"
+
+
+def error_span(ex: BaseException) -> Span | None:
+    """
+    Range of source lines related to an error raised by the parser, if known.
+
+    Like markdown-it maps, spans are (start, end) pairs of 0-based line
+    numbers, with the end excluded.
+    """
+    if isinstance(node := getattr(ex, "node", None), Block) and node.map:
+        return node.map
+    return getattr(ex, "span", None)
@@ -0,0 +1,562 @@
+"""
+Sandboxed execution of programs for code-io and unit-test questions.
+
+Programs run in a pool of worker processes. Each worker is a Python
+interpreter that receives batches of jobs and forks a fresh child for every
+test case, so the cost of starting an interpreter is paid once per worker
+instead of once per execution. Children run with:
+
+* resource limits on CPU time, memory, open files and written file sizes,
+* a wall-clock timeout, after which the whole process group is killed,
+* no network access: children move to a new network namespace, or install
+  an audit hook that rejects sockets if namespaces are not available,
+* a private temporary working directory, removed after each run.
+
+Python programs are executed inside the forked child. Programs in other
+languages are run with the interpreters in COMMANDS. Compiled languages are
+not supported yet.
+
+Results are streamed back as each test case finishes. This module only
+works on Unix-like systems.
+
+Children can still read any file readable by the worker, so workers should
+run as an unprivileged user.
+"""
+
+import builtins
+import io
+import json
+import math
+import os
+import resource
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Literal
+
+if TYPE_CHECKING:
+    from .models import CodeIo, UnitTest
+
+type Status = Literal["ok", "error", "timeout", "output-limit", "unsupported"]
+
+#: Interpreters used for languages other than Python. "{file}" is replaced by
+#: the path of a file with the source code.
+COMMANDS: dict[str, list[str]] = {
+    "bash": ["bash", "{file}"],
+    "javascript": ["node", "{file}"],
+    "lua": ["lua", "{file}"],
+    "php": ["php", "{file}"],
+    "r": ["Rscript", "{file}"],
+    "ruby": ["ruby", "{file}"],
+}
+
+#: Audit events rejected in Python programs.
+DENIED_EVENTS = ("os.exec", "os.fork", "os.forkpty", "os.posix_spawn", "os.spawn", "os.system", "subprocess.Popen")  # fmt: skip
+
+MIB = 2**20
+
+
+@dataclass(frozen=True, slots=True)
+class Limits:
+    """
+    Resource limits for each execution.
+
+    Attributes
+    ----------
+    timeout:
+        Wall-clock time in seconds.
+    cpu:
+        CPU time in seconds. Defaults to the timeout, rounded up.
+    memory:
+        Size of the address space in bytes.
+    output:
+        Maximum number of bytes written to stdout and stderr, combined.
+    files:
+        Maximum number of open files.
+    file_size:
+        Maximum size of files written by the program, in bytes.
+    """
+
+    timeout: float = 5.0
+    cpu: int | None = None
+    memory: int = 512 * MIB
+    output: int = 1 * MIB
+    files: int = 64
+    file_size: int = 1 * MIB
+
+
+@dataclass(frozen=True, slots=True)
+class TestCase:
+    """
+    A single execution of a program.
+
+    ``input`` is passed to stdin. For Python programs, ``test`` is code that
+    runs in the namespace of the program after it finishes, such as the
+    assertions of a unit test.
+    """
+
+    input: str = ""
+    test: str | None = None
+
+    # Not a test class, despite the name.
+    __test__ = False
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    """
+    A program and the test cases it should run.
+
+    ``timeout`` overrides the wall-clock timeout of the executor limits.
+    """
+
+    id: str
+    source: str
+    cases: tuple[TestCase, ...]
+    language: str = "python"
+    timeout: float | None = None
+
+
+@dataclass(slots=True)
+class CaseResult:
+    """
+    Result of running one test case of a job.
+    """
+
+    job: str
+    case: int
+    status: Status
+    stdout: str = ""
+    stderr: str = ""
+    returncode: int | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class Executor:
+    """
+    Pool of sandboxed workers.
+
+    Jobs are sent to workers in batches of ``batch_size``. Use it as a context
+    manager, or call close() to stop the workers.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        limits: Limits = Limits(),
+        batch_size: int = 8,
+        isolate_network: bool = True,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.limits = limits
+        self.batch_size = batch_size
+        self.isolate_network = isolate_network
+        self._pool: list[_Worker] = []
+
+    def __enter__(self) -> "Executor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def run(self, jobs: Iterable[Job]) -> Iterator[CaseResult]:
+        """
+        Run all jobs and yield the result of each test case as it finishes.
+
+        Results of the same job are yielded in order, but results of different
+        jobs may be interleaved.
+        """
+        jobs = iter(jobs)
+        if not self._pool:
+            config = {"limits": asdict(self.limits), "network": self.isolate_network}
+            self._pool = [_Worker(config) for _ in range(self.workers)]
+
+        selector = selectors.DefaultSelector()
+        try:
+            for worker in self._pool:
+                if worker.send(list(islice(jobs, self.batch_size))):
+                    selector.register(worker.fd, selectors.EVENT_READ, worker)
+
+            while selector.get_map():
+                for key, _ in selector.select():
+                    worker: _Worker = key.data
+                    for message in worker.read():
+                        if "done" not in message:
+                            yield CaseResult(**message)
+                            continue
+                        worker.pending -= 1
+                        if worker.pending == 0 and not worker.send(
+                            list(islice(jobs, self.batch_size))
+                        ):
+                            selector.unregister(worker.fd)
+        finally:
+            selector.close()
+            # Workers still busy with an abandoned run would send stale
+            # results to the next one.
+            if any(worker.pending for worker in self._pool):
+                self.close()
+
+    def close(self) -> None:
+        for worker in self._pool:
+            worker.close()
+        self._pool = []
+
+
+def run_jobs(jobs: Iterable[Job], **kwargs: Any) -> list[CaseResult]:
+    """
+    Run jobs in a temporary executor and return all results, sorted by job
+    and test case.
+    """
+    with Executor(**kwargs) as executor:
+        results = list(executor.run(jobs))
+    return sorted(results, key=lambda r: (r.job, r.case))
+
+
+def code_io_job(
+    question: "CodeIo", source: str, *, id: str, language: str = "python"
+) -> Job:
+    """
+    Job that runs source with the inputs of a code-io question.
+
+    Inputs come from the examples and the "inputs" entries of the answer key.
+    Iospec entries are not supported and are ignored.
+    """
+    inputs = []
+    for item in question.answer_key:
+        if (value := getattr(item, "input", None)) is not None:
+            inputs.append(value)
+        inputs.extend(getattr(item, "inputs", ()))
+    cases = tuple(TestCase(input=value) for value in inputs)
+    return Job(id, source, cases, language, question_timeout(question, language))
+
+
+def unit_test_job(
+    question: "UnitTest", source: str, *, id: str, language: str = "python"
+) -> Job:
+    """
+    Job that runs each test of a unit-test question after source.
+    """
+    cases = tuple(TestCase(test=test) for test in question.answer_key)
+    return Job(id, source, cases, language, question_timeout(question, language))
+
+
+def question_timeout(question: "CodeIo | UnitTest", language: str) -> float | None:
+    """
+    Timeout declared by a question for the given language, if any.
+    """
+    timeout = question.timeout
+    if isinstance(timeout, dict):
+        return timeout.get(language)
+    return timeout
+
+
+class _Worker:
+    def __init__(self, config: dict) -> None:
+        package = Path(__file__).parent.parent
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(package), os.environ.get("PYTHONPATH")]))}  # fmt: skip
+        code = "from mdq.executor import worker_main; worker_main()"
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", code, json.dumps(config)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        self.fd = self.process.stdout.fileno()  # type: ignore[union-attr]
+        self.pending = 0
+        self._buffer = b""
+
+    def send(self, jobs: list[Job]) -> bool:
+        if not jobs:
+            return False
+        data = b"".join(json.dumps(asdict(job)).encode() + b"\n" for job in jobs)
+        self.process.stdin.write(data)  # type: ignore[union-attr]
+        self.process.stdin.flush()  # type: ignore[union-attr]
+        self.pending += len(jobs)
+        return True
+
+    def read(self) -> list[dict]:
+        data = os.read(self.fd, 1 << 16)
+        if not data:
+            raise RuntimeError(f"executor worker exited with code {self.process.wait()}")
+        *lines, self._buffer = (self._buffer + data).split(b"\n")
+        return [json.loads(line) for line in lines]
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()  # type: ignore[union-attr]
+        self.process.stdout.close()  # type: ignore[union-attr]
+
+
+#
+# Worker process
+#
+def worker_main() -> None:
+    """
+    Entry point of worker processes.
+
+    Jobs are read from stdin and results are written to stdout, both as JSON
+    lines. A line with a "done" key follows the results of each job.
+    """
+    config = json.loads(sys.argv[1])
+    limits = Limits(**config["limits"])
+    network = config["network"]
+
+    # Keep a private channel for results, so nothing else writes to it.
+    channel = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    for line in sys.stdin.buffer:
+        job = json.loads(line)
+        cases = [TestCase(**case) for case in job.pop("cases")]
+        for result in run_job(Job(**job, cases=tuple(cases)), limits, network):
+            channel.write(json.dumps(asdict(result)).encode() + b"\n")
+            channel.flush()
+        channel.write(json.dumps({"job": job["id"], "done": True}).encode() + b"\n")
+        channel.flush()
+
+
+def run_job(job: Job, limits: Limits, isolate_network: bool = True) -> Iterator[CaseResult]:
+    """
+    Run all test cases of a job in the current process.
+
+    This is what workers do for each job. Each case runs in a forked child.
+    """
+    timeout = job.timeout or limits.timeout
+    if job.language == "python":
+        try:
+            program = compile(job.source, "<program>", "exec")
+            tests = [
+                None if case.test is None else compile(case.test, "<test>", "exec")
+                for case in job.cases
+            ]
+        except SyntaxError:
+            error = traceback.format_exc(limit=0)
+            for i in range(len(job.cases)):
+                yield CaseResult(job.id, i, "error", stderr=error, returncode=1)
+            return
+        for i, (case, test) in enumerate(zip(job.cases, tests)):
+            yield _run_case(job.id, i, case, (program, test), timeout, limits, isolate_network)
+
+    elif (command := COMMANDS.get(job.language)) is not None:
+        with tempfile.NamedTemporaryFile("w", suffix=f".{job.language}") as fd:
+            fd.write(job.source)
+            fd.flush()
+            argv = [arg.replace("{file}", fd.name) for arg in command]
+            for i, case in enumerate(job.cases):
+                if case.test is not None:
+                    yield CaseResult(job.id, i, "unsupported", stderr="tests require Python")
+                else:
+                    yield _run_case(job.id, i, case, argv, timeout, limits, isolate_network)
+
+    else:
+        for i in range(len(job.cases)):
+            message = f"unsupported language: {job.language}"
+            yield CaseResult(job.id, i, "unsupported", stderr=message)
+
+
+def _run_case(
+    job: str,
+    index: int,
+    case: TestCase,
+    program: tuple | list[str],
+    timeout: float,
+    limits: Limits,
+    isolate_network: bool,
+) -> CaseResult:
+    workdir = tempfile.mkdtemp(prefix="mdq-run-")
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    start = time.perf_counter()
+
+    pid = os.fork()
+    if pid == 0:
+        _child(program, workdir, (stdin_r, stdout_w, stderr_w), timeout, limits, isolate_network)
+    try:
+        # Also set by the child. Doing it on both sides ensures the group
+        # exists before it might be killed.
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+    try:
+        outputs, status = _communicate(
+            pid, stdin_w, stdout_r, stderr_r, case.input.encode(), start + timeout, limits.output
+        )
+        _, wait_status = os.waitpid(pid, 0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    returncode = os.waitstatus_to_exitcode(wait_status)
+    if status is None:
+        if returncode == -signal.SIGXCPU:
+            status = "timeout"
+        else:
+            status = "ok" if returncode == 0 else "error"
+    return CaseResult(
+        job,
+        index,
+        status,
+        stdout=outputs[stdout_r].decode(errors="replace"),
+        stderr=outputs[stderr_r].decode(errors="replace"),
+        returncode=returncode,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def _communicate(pid, stdin, stdout, stderr, data, deadline, max_output):
+    # Feed stdin and collect outputs until the child closes them, the
+    # deadline expires or it writes too much.
+    outputs = {stdout: bytearray(), stderr: bytearray()}
+    status: Status | None = None
+    selector = selectors.DefaultSelector()
+    selector.register(stdout, selectors.EVENT_READ)
+    selector.register(stderr, selectors.EVENT_READ)
+    if data:
+        os.set_blocking(stdin, False)
+        selector.register(stdin, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin)
+
+    try:
+        while len(selector.get_map()) and status is None:
+            if (left := deadline - time.perf_counter()) <= 0:
+                status = "timeout"
+                break
+            for key, _ in selector.select(left):
+                fd = key.fd
+                if fd == stdin:
+                    try:
+                        data = data[os.write(fd, data[: 1 << 16]) :]
+                    except BrokenPipeError:
+                        data = b""
+                    if not data:
+                        selector.unregister(fd)
+                        os.close(fd)
+                    continue
+                chunk = os.read(fd, 1 << 16)
+                if not chunk:
+                    selector.unregister(fd)
+                    os.close(fd)
+                    continue
+                outputs[fd] += chunk
+                if len(outputs[stdout]) + len(outputs[stderr]) > max_output:
+                    status = "output-limit"
+                    break
+    finally:
+        if status is not None:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        for key in list(selector.get_map().values()):
+            os.close(key.fd)
+        selector.close()
+    return outputs, status
+
+
+def _child(program, workdir, fds, timeout, limits, isolate_network) -> None:
+    # Runs in the forked child and never returns.
+    code = 1
+    try:
+        os.setpgid(0, 0)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        _close_fds()
+        os.chdir(workdir)
+        if isolate_network:
+            _isolate_network()
+        _set_limits(limits, timeout)
+
+        if isinstance(program, list):
+            os.execvp(program[0], program)
+
+        # Streams inherited from the worker may hold buffered data.
+        sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False))
+        sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), write_through=True)
+        sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), write_through=True)
+        sys.addaudithook(_deny_processes)
+        code = _exec_program(*program)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(code)
+
+
+def _exec_program(program, test) -> int:
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    try:
+        exec(program, namespace)
+        if test is not None:
+            exec(test, namespace)
+    except SystemExit as ex:
+        if ex.code is None or isinstance(ex.code, int):
+            return ex.code or 0
+        print(ex.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+    return 0
+
+
+def _close_fds() -> None:
+    # Listing open descriptors is much faster than closing every possible one
+    # when the limit of open files is high.
+    try:
+        fds = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    except OSError:
+        os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+        return
+    for fd in fds:
+        if fd > 2:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _isolate_network() -> None:
+    try:
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+    except (AttributeError, OSError):
+        sys.addaudithook(_deny_network)
+
+
+def _deny_network(event: str, args) -> None:
+    if event.startswith("socket."):
+        raise PermissionError("network access is disabled")
+
+
+def _deny_processes(event: str, args) -> None:
+    if event.startswith(DENIED_EVENTS):
+        raise PermissionError("creating processes is disabled")
+
+
+def _set_limits(limits: Limits, timeout: float) -> None:
+    cpu = limits.cpu or math.ceil(timeout)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (limits.memory, limits.memory))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limits.files, limits.files))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (limits.file_size, limits.file_size))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
@@ -0,0 +1,484 @@
+"""
+Fill-in-the-blank questions.
+
+Blanks are written as footnote references in the stem of the question and the
+footnote definitions placed right after the stem declare their answers:
+
+    2 + 2 = [^sum] and the capital of France is [^capital], which is in [^eu].
+
+    [^sum]: = 4 ± 0.1
+    [^capital]: Paris | Paris, France
+    [^eu]:
+      * Asia
+      * Europe ✅
+
+Definitions that start with "=" declare numeric blanks, with an optional
+absolute or percentual ("±5%") tolerance and a unit. A list of choices declares
+a selection box, in which correct choices are checked with "[x]", a percentage
+or a trailing ✅. Anything else is a text blank: one or more accepted answers
+separated by "|", or a regular expression enclosed in slashes. An empty
+definition is a text blank that is graded manually.
+
+Answers are graded by a FillInMatcher, compiled once per question. Text blanks
+become case-folded sets or precompiled regular expressions and numeric blanks
+become closed intervals, so a whole batch of responses is matched one column
+at a time, evaluating each distinct answer only once.
+"""
+
+import math
+import re
+import textwrap
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+from .errors import InvalidBlank
+from .models.shared import (
+    Choice,
+    FillInNumeric,
+    FillInSelection,
+    FillInStatic,
+    FillInText,
+)
+from .types import ITEM_MARK_REGEX, MarkKind, scan_item_mark
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .models import FillIn
+
+type Blank = FillInText | FillInNumeric | FillInSelection
+type Part = FillInStatic | Blank
+type Answer = str | int | float | None
+
+#: Maximum number of matchers kept by compile_matcher().
+MATCHER_CACHE_SIZE = 1024
+
+#: Relative tolerance always accepted by numeric blanks, which absorbs the
+#: rounding of answer keys written as decimal numbers.
+EPSILON = 1e-9
+
+NUMBER = r"[-+]?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE][-+]?\d+)?"
+REFERENCE_REGEX = re.compile(r"\[\^([^\]\s]+)\](?!:)")
+DEFINITION_REGEX = re.compile(r" {0,3}\[\^([^\]\s]+)\]:[ \t]*(.*)$")
+NUMERIC_REGEX = re.compile(
+    rf"=\s*(?P<key>{NUMBER})\s*(?:(?:±|\+/?-)\s*(?P<tolerance>{NUMBER}\s*%?))?"
+    r"\s*(?P<unit>.*)",
+    re.DOTALL,
+)
+REGEX_ANSWER = re.compile(r"/(?P<pattern>.+)/(?P<flags>[aimsx]*)", re.DOTALL)
+BULLET_REGEX = re.compile(r"[*+-][ \t]+")
+CHECK_MARK = "✅"
+REGEX_FLAGS = {
+    "a": re.ASCII,
+    "i": re.IGNORECASE,
+    "m": re.MULTILINE,
+    "s": re.DOTALL,
+    "x": re.VERBOSE,
+}
+
+
+#
+# Parsing
+#
+def parse_fill_in(src: str) -> list[Part]:
+    """
+    Parse the body of a fill-in question from a paragraph followed by the
+    definitions of its blanks.
+    """
+    lines = src.strip("\n").splitlines()
+    start = next(
+        (i for i, line in enumerate(lines) if DEFINITION_REGEX.match(line)), len(lines)
+    )
+    definitions, end = read_definitions(lines, start)
+    if end < len(lines):
+        raise InvalidBlank("", f"unexpected content after blanks: {lines[end]!r}")
+    return parse_body("\n".join(lines[:start]).strip(), definitions)
+
+
+def read_definitions(lines: Sequence[str], start: int = 0) -> tuple[dict[str, str], int]:
+    """
+    Read consecutive footnote definitions starting at the given line.
+
+    Return the source of each definition, mapped by name, and the index past
+    the last line that belongs to a definition. As in footnotes, definitions
+    continue on indented lines.
+    """
+    definitions: dict[str, list[str]] = {}
+    name = None
+    end = pos = start
+    while pos < len(lines):
+        line = lines[pos]
+        pos += 1
+        if not line.strip():
+            continue
+        if m := DEFINITION_REGEX.match(line):
+            name = m[1]
+            if name in definitions:
+                raise InvalidBlank(name, f"blank [^{name}] is defined twice")
+            definitions[name] = [m[2]]
+        elif name is not None and line[:1] in " \t":
+            definitions[name].append(line)
+        else:
+            break
+        end = pos
+    return {k: _join_definition(v) for k, v in definitions.items()}, end
+
+
+def parse_body(text: str, definitions: dict[str, str]) -> list[Part]:
+    """
+    Split text into static snippets and the blanks referenced in it.
+
+    Raises InvalidBlank if a blank is not defined, is referenced twice or is
+    never referenced.
+    """
+    parts: list[Part] = []
+    used = set()
+    pos = 0
+    for m in REFERENCE_REGEX.finditer(text):
+        if static := text[pos : m.start()]:
+            parts.append(FillInStatic(text=static))
+        name = m[1]
+        if name in used:
+            raise InvalidBlank(name, f"blank [^{name}] is used twice")
+        try:
+            source = definitions[name]
+        except KeyError:
+            raise InvalidBlank(name, f"blank [^{name}] is not defined") from None
+        parts.append(parse_blank(name, source))
+        used.add(name)
+        pos = m.end()
+    if static := text[pos:]:
+        parts.append(FillInStatic(text=static))
+
+    if unused := [name for name in definitions if name not in used]:
+        raise InvalidBlank(unused[0], f"blank [^{unused[0]}] is never used")
+    return parts
+
+
+def parse_blank(name: str, src: str) -> Blank:
+    """
+    Parse the definition of a single blank.
+    """
+    src = src.strip()
+    if src.startswith("="):
+        if not (m := NUMERIC_REGEX.fullmatch(src)):
+            raise InvalidBlank(name, f"invalid numeric answer for [^{name}]: {src!r}")
+        key = _parse_number(m["key"])
+        tolerance = m["tolerance"]
+        if tolerance is not None:
+            tolerance = tolerance.replace(" ", "")
+            tolerance = f"±{tolerance}" if tolerance.endswith("%") else _parse_number(tolerance)
+        return FillInNumeric(
+            **{"answer-key": key}, tolerance=tolerance or 0, unit=m["unit"].strip() or None
+        )
+    if BULLET_REGEX.match(src):
+        return FillInSelection(choices=_parse_choices(name, src))
+    if not src:
+        return FillInText()
+    if REGEX_ANSWER.fullmatch(src):
+        return FillInText(**{"answer-key": src})
+    answers = [answer.strip() for answer in src.split("|")]
+    if not all(answers):
+        raise InvalidBlank(name, f"empty answer for [^{name}]")
+    return FillInText(**{"answer-key": answers[0] if len(answers) == 1 else answers})
+
+
+def parse_tolerance(tolerance: float | str | None, answer_key: float) -> float:
+    """
+    Absolute tolerance of a numeric blank.
+
+    Percentual tolerances like "±5%" are relative to the answer key.
+    """
+    if tolerance is None:
+        return 0.0
+    if isinstance(tolerance, str):
+        value = tolerance.strip().removeprefix("±").removeprefix("+-").strip()
+        if value.endswith("%"):
+            return abs(answer_key) * _parse_number(value[:-1]) / 100
+        return abs(_parse_number(value))
+    return abs(float(tolerance))
+
+
+def _join_definition(lines: list[str]) -> str:
+    first, *rest = lines
+    tail = textwrap.dedent("\n".join(rest)).strip("\n")
+    return f"{first}\n{tail}" if first and tail else first or tail
+
+
+def _parse_choices(name: str, src: str) -> list[Choice]:
+    items: list[str] = []
+    for line in src.splitlines():
+        if m := BULLET_REGEX.match(line):
+            items.append(line[m.end() :])
+        elif items and line.strip():
+            items[-1] += " " + line.strip()
+
+    choices = []
+    for item in items:
+        kind, value = scan_item_mark(item)
+        if kind is not MarkKind.NONE:
+            item = item[ITEM_MARK_REGEX.match(item).end() :]  # type: ignore[union-attr]
+        match kind:
+            case MarkKind.TRUE | MarkKind.FALSE:
+                raise InvalidBlank(name, f"true/false marks are not valid in [^{name}]")
+            case MarkKind.CHECKED:
+                correct = True
+            case MarkKind.PERCENT:
+                correct = value
+            case _:
+                correct = None
+        if item.rstrip().endswith(CHECK_MARK):
+            item, correct = item.rstrip().removesuffix(CHECK_MARK), True
+        choices.append(Choice(text=item.strip(), correct=correct))
+
+    if len(choices) < 2:
+        raise InvalidBlank(name, f"[^{name}] must have at least two choices")
+    if not any(choice.correct for choice in choices):
+        raise InvalidBlank(name, f"[^{name}] has no correct choice")
+    return choices
+
+
+def _parse_number(src: str) -> float:
+    value = float(src.replace(",", "."))
+    return int(value) if value.is_integer() and "e" not in src.lower() else value
+
+
+#
+# Matching
+#
+class TextMatcher:
+    """
+    Accepted answers of a text blank.
+
+    Answers are compared after collapsing whitespace and, unless the blank is
+    case sensitive, case folding.
+    """
+
+    __slots__ = ("answers", "regex", "case_sensitive")
+
+    def __init__(self, blank: FillInText) -> None:
+        self.case_sensitive = blank.case_sensitive
+        self.answers: frozenset[str] | None = None
+        self.regex: re.Pattern | None = None
+
+        key = blank.answer_key
+        if isinstance(key, str) and (m := REGEX_ANSWER.fullmatch(key)):
+            flags = 0 if self.case_sensitive else re.IGNORECASE
+            for flag in m["flags"]:
+                flags |= REGEX_FLAGS[flag]
+            self.regex = re.compile(m["pattern"], flags)
+        elif key is not None:
+            answers = [key] if isinstance(key, str) else key
+            self.answers = frozenset(map(self.normalize, answers))
+
+    @property
+    def manual(self) -> bool:
+        return self.answers is None and self.regex is None
+
+    def normalize(self, value: str) -> str:
+        value = " ".join(value.split())
+        return value if self.case_sensitive else value.casefold()
+
+    def credit(self, value: Answer) -> float:
+        if value is None or self.manual:
+            return 0.0
+        value = self.normalize(str(value))
+        if self.regex is not None:
+            return 1.0 if self.regex.search(value) else 0.0
+        return 1.0 if value in self.answers else 0.0  # type: ignore[operator]
+
+
+class NumericMatcher:
+    """
+    Closed interval of accepted values of a numeric blank.
+
+    Answers can use a decimal comma and be followed by the unit of the blank.
+    """
+
+    __slots__ = ("low", "high", "unit", "manual")
+
+    def __init__(self, blank: FillInNumeric) -> None:
+        self.unit = blank.unit
+        self.manual = blank.answer_key is None
+        if self.manual:
+            # An empty interval.
+            self.low, self.high = math.inf, -math.inf
+        else:
+            key = float(blank.answer_key)
+            delta = parse_tolerance(blank.tolerance, key) + abs(key) * EPSILON
+            self.low, self.high = key - delta, key + delta
+
+    def value(self, value: Answer) -> float:
+        """
+        Numeric value of an answer, or NaN if it is not a number.
+        """
+        if value is None:
+            return math.nan
+        if not isinstance(value, str):
+            return float(value)
+        value = value.strip()
+        if self.unit:
+            value = value.removesuffix(self.unit).rstrip()
+        try:
+            return float(value.replace(",", "."))
+        except ValueError:
+            return math.nan
+
+    def credit(self, value: Answer) -> float:
+        return 1.0 if self.low <= self.value(value) <= self.high else 0.0
+
+
+class SelectionMatcher:
+    """
+    Credit of each choice of a selection blank.
+
+    Answers are the indexes of the selected choices.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, blank: FillInSelection) -> None:
+        values = []
+        for choice in blank.choices:
+            if isinstance(choice.correct, bool):
+                values.append(1.0 if choice.correct else 0.0)
+            else:
+                values.append((choice.correct or 0.0) / 100)
+        self.values = tuple(values)
+
+    manual = False
+
+    def credit(self, value: Answer) -> float:
+        try:
+            index = int(value)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return 0.0
+        return self.values[index] if 0 <= index < len(self.values) else 0.0
+
+
+type BlankMatcher = TextMatcher | NumericMatcher | SelectionMatcher
+
+
+@dataclass(frozen=True, slots=True)
+class FillInMatcher:
+    """
+    Answer keys of a fill-in question, prepared to grade many responses.
+
+    A response is a sequence with one answer per blank, in the order they
+    appear in the body of the question. Missing answers are None.
+
+    Attributes
+    ----------
+    blanks:
+        One matcher per blank.
+    """
+
+    blanks: tuple[BlankMatcher, ...]
+
+    @classmethod
+    def from_question(cls, question: "FillIn") -> "FillInMatcher":
+        matchers: list[BlankMatcher] = []
+        for part in question.body:
+            match part:
+                case FillInText():
+                    matchers.append(TextMatcher(part))
+                case FillInNumeric():
+                    matchers.append(NumericMatcher(part))
+                case FillInSelection():
+                    matchers.append(SelectionMatcher(part))
+        return cls(tuple(matchers))
+
+    @property
+    def manual(self) -> bool:
+        """
+        True if some blank must be graded manually.
+        """
+        return any(blank.manual for blank in self.blanks)
+
+    def match(self, answers: Sequence[Answer]) -> list[bool]:
+        """
+        Tell which answers of a single response get full credit.
+        """
+        answers = _pad(answers, len(self.blanks))
+        return [blank.credit(a) >= 1.0 for blank, a in zip(self.blanks, answers)]
+
+    def credit_batch(self, responses: Sequence[Sequence[Answer]]) -> "np.ndarray":
+        """
+        Matrix in which [i, j] is the credit, from 0 to 1, of the answer of
+        response i to blank j.
+
+        Each distinct answer to a blank is evaluated only once and numeric
+        answers are compared with their intervals in a single vectorized pass.
+        """
+        import numpy as np
+
+        size = len(self.blanks)
+        credits = np.zeros((len(responses), size))
+        rows = [_pad(response, size) for response in responses]
+        for j, blank in enumerate(self.blanks):
+            column = [row[j] for row in rows]
+            unique = dict.fromkeys(column)
+            if isinstance(blank, NumericMatcher):
+                for value in unique:
+                    unique[value] = blank.value(value)
+                values = np.fromiter(map(unique.__getitem__, column), np.float64, len(column))
+                credits[:, j] = (blank.low <= values) & (values <= blank.high)
+            else:
+                for value in unique:
+                    unique[value] = blank.credit(value)
+                credits[:, j] = np.fromiter(
+                    map(unique.__getitem__, column), np.float64, len(column)
+                )
+        return credits
+
+    def match_batch(self, responses: Sequence[Sequence[Answer]]) -> "np.ndarray":
+        """
+        Boolean matrix in which [i, j] tells if the answer of response i to
+        blank j gets full credit.
+        """
+        return self.credit_batch(responses) >= 1.0
+
+    def score_batch(self, responses: Sequence[Sequence[Answer]]) -> "np.ndarray":
+        """
+        Score of each response as a percentage.
+
+        Blanks are worth an equal share of the grade. Blanks graded manually
+        are not counted.
+        """
+        import numpy as np
+
+        auto = np.array([not blank.manual for blank in self.blanks], dtype=np.float64)
+        credits = self.credit_batch(responses)
+        return credits @ auto * (100 / max(auto.sum(), 1.0))
+
+
+_cache: OrderedDict[str, FillInMatcher] = OrderedDict()
+
+
+def compile_matcher(question: "FillIn") -> FillInMatcher:
+    """
+    Matcher for the answers of question.
+
+    Matchers are cached by the content hash of the question.
+    """
+    key = question.content_hash()
+    try:
+        result = _cache[key]
+    except KeyError:
+        pass
+    else:
+        _cache.move_to_end(key)
+        return result
+
+    result = FillInMatcher.from_question(question)
+    _cache[key] = result
+    if len(_cache) > MATCHER_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
+
+
+def _pad(answers: Sequence[Answer], size: int) -> Sequence[Answer]:
+    if len(answers) >= size:
+        return answers
+    return [*answers, *([None] * (size - len(answers)))]
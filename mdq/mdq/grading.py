@@ -0,0 +1,253 @@
+"""
+Batch grading of choice-based questions.
+
+Responses are encoded as NumPy arrays with one row per response and one column
+per choice, and all scores are computed in a single vectorized pass. The same
+code path grades a single response submitted online and thousands of stored
+responses after the answer key of a question changes.
+
+Scores are percentages in the 0-100 range, before the weight of the question
+is applied. Requires NumPy (install the "grading" extra).
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import Sequence
+
+import numpy as np
+
+from .models import MultipleChoice, MultipleSelection, TrueFalse
+from .models.response import MultipleChoiceResponse, TrueFalseResponse
+from .models.shared import TrueFalseGrading
+
+type ChoiceQuestion = MultipleChoice | MultipleSelection | TrueFalse
+type ChoiceResponse = MultipleChoiceResponse | TrueFalseResponse
+
+#: Encoding of unanswered items in true/false answer matrices.
+UNANSWERED = -1
+
+
+@dataclass
+class BatchGrades:
+    """
+    Result of grading many responses to the same question.
+
+    Attributes
+    ----------
+    scores:
+        Final score of each response.
+    penalties:
+        Points subtracted from each response due to incorrect answers.
+    selected:
+        Number of responses that selected each choice. For true/false
+        questions, the number of responses that marked each item as true.
+    answered:
+        Number of responses that answered each choice or item.
+    correct:
+        Number of responses that got each choice or item right.
+    """
+
+    scores: np.ndarray
+    penalties: np.ndarray
+    selected: np.ndarray
+    answered: np.ndarray
+    correct: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+
+def grade(question: ChoiceQuestion, response: ChoiceResponse) -> float:
+    """
+    Grade a single response.
+    """
+    return float(grade_batch(question, [response]).scores[0])
+
+
+def grade_batch(
+    question: ChoiceQuestion, responses: Sequence[ChoiceResponse] | np.ndarray
+) -> BatchGrades:
+    """
+    Grade all responses to question.
+
+    Choices are identified by their position in ``question.choices``.
+    Responses can be given as models or as a matrix created by
+    encode_responses(). Encoding is the most expensive step, so keep the
+    matrix around to re-grade the same responses after the answer key changes.
+
+    Raises ValueError if a response refers to a choice that does not exist.
+    """
+    if not isinstance(responses, np.ndarray):
+        responses = encode_responses(question, responses)
+    if responses.shape[1] != len(question.choices):
+        raise ValueError("responses do not match the number of choices")
+
+    match question:
+        case MultipleChoice():
+            return _grade_multiple_choice(question, responses)
+        case MultipleSelection():
+            return _grade_multiple_selection(question, responses)
+        case TrueFalse():
+            return _grade_true_false(question, responses)
+    raise TypeError(f"cannot grade {type(question).__name__} questions")
+
+
+def encode_responses(
+    question: ChoiceQuestion, responses: Sequence[ChoiceResponse]
+) -> np.ndarray:
+    """
+    Encode responses as a matrix with one row per response.
+    """
+    if isinstance(question, TrueFalse):
+        return encode_answers(question, responses)  # type: ignore[arg-type]
+    return encode_selections(question, responses)  # type: ignore[arg-type]
+
+
+def encode_selections(
+    question: MultipleChoice | MultipleSelection,
+    responses: Sequence[MultipleChoiceResponse],
+) -> np.ndarray:
+    """
+    Boolean matrix in which [i, j] tells if response i selected choice j.
+    """
+    ids = [r.selected_choice_ids for r in responses]
+    sizes = np.fromiter(map(len, ids), np.intp, len(ids))
+    rows = np.repeat(np.arange(len(ids)), sizes)
+    cols = np.fromiter(chain.from_iterable(ids), np.intp, sizes.sum())
+    return _scatter(question, rows, cols, True, np.bool_, len(ids))
+
+
+def encode_answers(
+    question: TrueFalse, responses: Sequence[TrueFalseResponse]
+) -> np.ndarray:
+    """
+    Matrix in which [i, j] is 1 or 0 if response i marked item j as true or
+    false, and UNANSWERED otherwise.
+    """
+    answers = [r.answer for r in responses]
+    sizes = np.fromiter(map(len, answers), np.intp, len(answers))
+    rows = np.repeat(np.arange(len(answers)), sizes)
+    cols = np.fromiter(chain.from_iterable(answers), np.intp, sizes.sum())
+    values = np.fromiter(
+        chain.from_iterable(a.values() for a in answers), np.int8, sizes.sum()
+    )
+    return _scatter(question, rows, cols, values, np.int8, len(answers))
+
+
+def choice_values(question: ChoiceQuestion) -> np.ndarray:
+    """
+    Value of each choice as a percentage.
+
+    Booleans are mapped to 100 or 0 and unset values count as 0.
+    """
+    values = []
+    for choice in question.choices:
+        if isinstance(choice.correct, bool):
+            values.append(100.0 if choice.correct else 0.0)
+        else:
+            values.append(choice.correct or 0.0)
+    return np.array(values, dtype=np.float64)
+
+
+def _scatter(question, rows, cols, values, dtype, count) -> np.ndarray:
+    size = len(question.choices)
+    if cols.size and (cols.min() < 0 or cols.max() >= size):
+        bad = int(rows[(cols < 0) | (cols >= size)][0])
+        raise ValueError(f"response {bad} refers to a choice that does not exist")
+    matrix = np.full((count, size), False if dtype is np.bool_ else UNANSWERED, dtype)
+    matrix[rows, cols] = values
+    return matrix
+
+
+# Reductions below are written as matrix products over 0/1 float matrices,
+# which are considerably faster than sum() over boolean arrays.
+
+
+def _grade_multiple_choice(question: MultipleChoice, selected: np.ndarray) -> BatchGrades:
+    values = choice_values(question)
+    matrix = selected.astype(np.float64)
+    ones = np.ones(len(values))
+
+    # Only responses with a single selection are valid.
+    single = matrix @ ones == 1
+    raw = np.where(single, matrix @ values, 0.0)
+    penalties = np.where(single & (raw <= 0), question.penalty, 0.0)
+    scores = raw - penalties
+
+    grading = question.grading
+    if grading is not None and (grading.min_value is not None or grading.max_value is not None):
+        scores = np.clip(scores, grading.min_value, grading.max_value)
+
+    valid = single.astype(np.float64)
+    return BatchGrades(
+        scores=scores,
+        penalties=penalties,
+        selected=_counts(np.ones(len(matrix)) @ matrix),
+        answered=np.full(len(values), int(single.sum())),
+        correct=_counts((valid @ matrix) * (values > 0)),
+    )
+
+
+def _grade_multiple_selection(
+    question: MultipleSelection, selected: np.ndarray
+) -> BatchGrades:
+    key = (choice_values(question) > 0).astype(np.float64)
+    matrix = selected.astype(np.float64)
+    size = len(key)
+
+    # Selected correct choices plus unselected incorrect ones.
+    hits = matrix @ (2 * key - 1) + (size - key.sum())
+    counts = np.ones(len(matrix)) @ matrix
+    grading = question.grading or TrueFalseGrading()
+    return _grade_items(
+        grading,
+        size,
+        hits,
+        size - hits,
+        selected=counts,
+        answered=np.full(size, float(len(matrix))),
+        correct=np.where(key > 0, counts, len(matrix) - counts),
+    )
+
+
+def _grade_true_false(question: TrueFalse, answers: np.ndarray) -> BatchGrades:
+    key = (choice_values(question) > 0).astype(np.float64)
+    true = (answers == 1).astype(np.float64)
+    false = (answers == 0).astype(np.float64)
+    ones = np.ones(len(answers))
+    true_counts, false_counts = ones @ true, ones @ false
+
+    grading = question.grading or TrueFalseGrading()
+    return _grade_items(
+        grading,
+        len(key),
+        true @ key + false @ (1 - key),
+        true @ (1 - key) + false @ key,
+        selected=true_counts,
+        answered=true_counts + false_counts,
+        correct=np.where(key > 0, true_counts, false_counts),
+    )
+
+
+def _grade_items(
+    grading: TrueFalseGrading,
+    size: int,
+    hits: np.ndarray,
+    misses: np.ndarray,
+    **stats: np.ndarray,
+) -> BatchGrades:
+    # Each item is worth an equal share of the grade.
+    size = size or 1
+    correct_grade = grading.correct_grade or 0.0
+    penalty = grading.penalty_for_incorrect or 0.0
+    penalties = misses * (penalty / size)
+    scores = hits * (correct_grade / size) - penalties
+    return BatchGrades(
+        scores=scores,
+        penalties=penalties,
+        **{name: _counts(value) for name, value in stats.items()},
+    )
+
+
+def _counts(values: np.ndarray) -> np.ndarray:
+    return np.rint(values).astype(np.intp)
@@ -0,0 +1,125 @@
+"""
+Canonical content hashes of models.
+
+The hash of a model depends only on the values of its fields, never on how
+the model was built: field order, dict insertion order, set iteration order
+and the difference between a default and an explicitly given value do not
+affect it. String enums hash as their values, and integral floats hash as
+integers, so ``weight=100`` and ``weight=100.0`` are the same question.
+
+Values are fed directly to the hasher, without serializing models with
+model_dump(). The digest of each model is cached on the instance, so nested
+models are hashed once, however many times their parents are hashed.
+"""
+
+import hashlib
+import struct
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+
+#: Size of digests, in bytes.
+DIGEST_SIZE = 16
+
+#: Key of the cached digest in the __dict__ of models. Pydantic ignores
+#: non-field keys in __dict__ when comparing models.
+CACHE_KEY = "__content_digest__"
+
+_LENGTH = struct.Struct("<Q")
+
+
+def content_hash(model: BaseModel) -> str:
+    """
+    Canonical hash of a model, as a hex string.
+    """
+    return model_digest(model).hex()
+
+
+def model_digest(model: BaseModel) -> bytes:
+    """
+    Canonical digest of a model.
+
+    The result is cached on the instance. Assigning to a field clears the cache
+    of that model, but not of the models that contain it.
+    """
+    try:
+        return model.__dict__[CACHE_KEY]
+    except KeyError:
+        pass
+
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    cls = type(model)
+    _update_str(hasher, b"M", cls.__name__)
+    values = model.__dict__
+    for name in sorted(cls.__pydantic_fields__):
+        _update_str(hasher, b"k", name)
+        _update(hasher, values[name])
+    if extra := model.__pydantic_extra__:
+        _update(hasher, extra)
+
+    digest = model.__dict__[CACHE_KEY] = hasher.digest()
+    return digest
+
+
+def digest(value: Any) -> bytes:
+    """
+    Canonical digest of any value that can be stored in a model.
+    """
+    if isinstance(value, BaseModel):
+        return model_digest(value)
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    _update(hasher, value)
+    return hasher.digest()
+
+
+def clear_cache(model: BaseModel) -> None:
+    """
+    Forget the cached digest of a model.
+    """
+    model.__dict__.pop(CACHE_KEY, None)
+
+
+def _update(hasher, value: Any) -> None:
+    # Each value is encoded as a type tag followed by its contents. Variable
+    # size contents are prefixed by their length, so encodings never collide.
+    match value:
+        case None:
+            hasher.update(b"N")
+        case bool():
+            hasher.update(b"T" if value else b"F")
+        case str():
+            _update_str(hasher, b"s", value)
+        case int():
+            _update_str(hasher, b"i", str(value))
+        case float():
+            if value.is_integer():
+                _update_str(hasher, b"i", str(int(value)))
+            else:
+                _update_str(hasher, b"f", repr(value))
+        case Enum():
+            # String enums are handled as strings above.
+            _update_str(hasher, b"e", f"{type(value).__qualname__}.{value.name}")
+        case BaseModel():
+            hasher.update(b"m" + model_digest(value))
+        case list() | tuple():
+            hasher.update(b"L" + _LENGTH.pack(len(value)))
+            for item in value:
+                _update(hasher, item)
+        case dict():
+            items = sorted(digest(k) + digest(v) for k, v in value.items())
+            hasher.update(b"D" + _LENGTH.pack(len(items)))
+            hasher.update(b"".join(items))
+        case set() | frozenset():
+            items = sorted(map(digest, value))
+            hasher.update(b"S" + _LENGTH.pack(len(items)))
+            hasher.update(b"".join(items))
+        case bytes():
+            hasher.update(b"b" + _LENGTH.pack(len(value)) + value)
+        case _:
+            _update_str(hasher, b"r", repr(value))
+
+
+def _update_str(hasher, tag: bytes, value: str) -> None:
+    data = value.encode("utf-8", "surrogatepass")
+    hasher.update(tag + _LENGTH.pack(len(data)) + data)
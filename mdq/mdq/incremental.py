@@ -0,0 +1,225 @@
+"""
+Incremental compilation of question banks.
+
+A manifest records the size, modification time and content hash of each
+compiled source, together with the local media files it references. Sources
+that did not change since the last build are skipped without being read.
+
+Exams are compiled section by section: each question is parsed independently
+and stored in the parse cache, so editing one question of a large exam only
+re-parses that question before the exam is re-assembled.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+import mdq
+
+from .cache import ParseCache
+from .models import Exam, Question
+from .parser import (
+    ExamParser,
+    check_unique_id,
+    override_fields,
+    parse_exam_question,
+    read_source,
+    split_exam,
+)
+
+MANIFEST_VERSION = 2
+MEDIA_REGEX = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+
+
+@dataclass
+class SourceEntry:
+    """
+    Manifest information about a single source file.
+
+    Media files that did not exist when the source was compiled are recorded
+    with a None signature, so creating them later triggers a rebuild.
+    """
+
+    kind: str
+    size: int
+    mtime_ns: int
+    hash: str
+    media: dict[str, tuple[int, int] | None] = field(default_factory=dict)
+
+    @classmethod
+    def read(cls, path: Path, kind: str) -> tuple["SourceEntry", str]:
+        """
+        Read source file and return its manifest entry and its text.
+
+        The file is read only once: the text is what the caller should parse,
+        so the recorded hash always matches the compiled content.
+        """
+        # Stat before reading: if the file changes in between, the recorded
+        # modification time is stale and the next build re-hashes the file.
+        stat = path.stat()
+        data = path.read_bytes()
+        src = data.decode("utf-8")
+        entry = cls(
+            kind=kind,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            hash=hashlib.blake2b(data, digest_size=20).hexdigest(),
+            media={name: media_signature(path.parent / name) for name in find_media(src)},
+        )
+        return entry, src
+
+
+class Manifest:
+    """
+    Tracks which sources were compiled and the files they depend on.
+    """
+
+    def __init__(self, path: str | Path, entries: dict[str, SourceEntry] | None = None):
+        self.path = Path(path)
+        self.entries: dict[str, SourceEntry] = entries or {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Manifest":
+        """
+        Load manifest from path.
+
+        Return an empty manifest if the file does not exist or was created by a
+        different version of mdq.
+        """
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+
+        if data.get("version") != MANIFEST_VERSION or data.get("mdq") != mdq.__version__:
+            return cls(path)
+
+        entries = {}
+        for name, entry in data["sources"].items():
+            media = {k: v and tuple(v) for k, v in entry.pop("media").items()}
+            entries[name] = SourceEntry(**entry, media=media)
+        return cls(path, entries)
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "mdq": mdq.__version__,
+            "sources": {k: asdict(v) for k, v in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+
+    def is_fresh(self, path: Path, base: Path) -> bool:
+        """
+        Check if path and its media files are unchanged since the last build.
+
+        The content hash is only computed when the file's size or modification
+        time changed.
+        """
+        entry = self.entries.get(path.relative_to(base).as_posix())
+        if entry is None:
+            return False
+
+        stat = path.stat()
+        if (stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+            if file_hash(path) != entry.hash:
+                return False
+            entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+
+        for name, signature in entry.media.items():
+            if media_signature(path.parent / name) != signature:
+                return False
+        return True
+
+    def record(
+        self, path: Path, base: Path, kind: str, entry: SourceEntry | None = None
+    ) -> None:
+        """
+        Register a successfully compiled source.
+
+        entry should be the one read when the source was compiled. The file is
+        only read again if it is not given.
+        """
+        if entry is None:
+            entry, _ = SourceEntry.read(path, kind)
+        self.entries[path.relative_to(base).as_posix()] = entry
+
+    def prune(self, sources: list[Path], base: Path) -> list[str]:
+        """
+        Remove entries of sources that no longer exist.
+
+        Return the names of removed entries.
+        """
+        existing = {path.relative_to(base).as_posix() for path in sources}
+        removed = [name for name in self.entries if name not in existing]
+        for name in removed:
+            del self.entries[name]
+        return removed
+
+
+def parse_exam_incremental(
+    src: str | Path | TextIO,
+    cache: ParseCache,
+    *,
+    id: str | None = None,
+    title: str | None = None,
+    filename: str | Path | None = None,
+) -> Exam:
+    """
+    Parse exam re-using the cached result for each unchanged question.
+
+    Only the exam header, epilogue and the questions that are not in the cache
+    are parsed.
+    """
+    src, default_id, default_title = read_source(src, id, title, filename)
+    sections = split_exam(src)
+    parser = ExamParser.from_sections(sections, default_id, default_title)
+    seen: set[str] = set()
+    for n, section in enumerate(sections.questions, 1):
+        question = _parse_section(section, n, cache)
+        check_unique_id(question, seen)
+        parser.body.append(question)
+
+    exam = parser.build()
+    override_fields(exam, id=id, title=title)
+    return exam
+
+
+def _parse_section(src: str, n: int, cache: ParseCache) -> Question:
+    # Questions without an explicit id are named after their position.
+    key = cache.key("exam-question", src, str(n))
+    if (question := cache.get(key)) is not None:
+        return question
+
+    question = parse_exam_question(src, n)
+    cache.put(key, question)
+    return question
+
+
+def find_media(src: str) -> list[str]:
+    """
+    List relative paths of images referenced in a Markdown source.
+    """
+    media = []
+    for url in MEDIA_REGEX.findall(src):
+        if "://" in url or url.startswith(("/", "#", "data:")):
+            continue
+        if url not in media:
+            media.append(url)
+    return media
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.blake2b(path.read_bytes(), digest_size=20).hexdigest()
+
+
+def media_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
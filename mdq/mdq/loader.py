@@ -0,0 +1,85 @@
+"""
+Fast loading of serialized questions and exams.
+
+load_json() decodes bytes directly with pydantic-core's JSON parser into the
+requested model. Questions of unknown type are dispatched on their "type"
+field in a single step, instead of trying each question model in turn.
+"""
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, get_args
+
+from pydantic import TypeAdapter
+
+if TYPE_CHECKING:
+    from .models import Exam, Question
+
+#: Maximum number of documents kept by the trusted loader.
+TRUSTED_CACHE_SIZE = 256
+
+_trusted: OrderedDict[tuple[str | None, bytes], Any] = OrderedDict()
+_trusted_lock = threading.Lock()
+
+
+def load_json(
+    data: bytes | str,
+    kind: str | None = None,
+    *,
+    trusted: bool = False,
+) -> "Question | Exam":
+    """
+    Load a question or exam from its JSON representation.
+
+    ``kind`` is either "exam", a question type or None. If None, data must be
+    a question and its model is selected by the "type" field. Invalid data
+    raises a pydantic ValidationError.
+
+    Set ``trusted`` for data written by mdq itself, like the contents of a
+    database or of a compiled bank. Repeated loads of the same document
+    return a shallow copy of the model loaded the first time, without
+    validating it again. Fields of the copy can be reassigned, but nested
+    lists and models are shared between callers and must not be modified.
+    """
+    if not trusted:
+        return get_adapter(kind).validate_json(data)
+
+    key = (kind, hashlib.blake2b(_as_bytes(data), digest_size=16).digest())
+    with _trusted_lock:
+        if (model := _trusted.get(key)) is not None:
+            _trusted.move_to_end(key)
+            return model.model_copy()
+
+    # Validation runs outside the lock. Two threads may validate the same
+    # document, which is harmless.
+    model = get_adapter(kind).validate_json(data)
+    with _trusted_lock:
+        _trusted[key] = model
+        if len(_trusted) > TRUSTED_CACHE_SIZE:
+            _trusted.popitem(last=False)
+    return model.model_copy()
+
+
+@functools.cache
+def get_adapter(kind: str | None = None) -> TypeAdapter:
+    """
+    Return a TypeAdapter for the given kind of document.
+
+    Adapters are created once and reused by subsequent calls.
+    """
+    from . import models
+
+    if kind is None:
+        return TypeAdapter(models.AnyQuestion)
+    if kind == "exam":
+        return TypeAdapter(models.Exam)
+    for cls in get_args(models.Question.__value__):
+        if cls.model_fields["type"].default == kind:
+            return TypeAdapter(cls)
+    raise ValueError(f"invalid kind of document: {kind!r}")
+
+
+def _as_bytes(data: bytes | str) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
@@ -1,31 +1,34 @@
-from .exam import Exam
-from .question import (
-    Associative,
-    CodeIo,
-    Essay,
-    FillIn,
-    MultipleChoice,
-    MultipleSelection,
-    QuestionType,
-    TrueFalse,
-    UnitTest,
-)
-
-type Question = (
-    Associative
-    | CodeIo
-    | Essay
-    | FillIn
-    | MultipleChoice
-    | MultipleSelection
-    | TrueFalse
-    | UnitTest
-)
+"""
+Pydantic models for questions and exams.
 
+Models are imported on first access, so importing lightweight submodules such
+as ``mdq.models.enums`` does not pay for pydantic and the model classes.
+"""
+
+from typing import TYPE_CHECKING
+
+from ..types import QuestionType
+
+if TYPE_CHECKING:
+    from .exam import Exam, ExamHeader
+    from .question import (
+        AnyQuestion,
+        Associative,
+        CodeIo,
+        Essay,
+        FillIn,
+        MultipleChoice,
+        MultipleSelection,
+        Question,
+        TrueFalse,
+        UnitTest,
+    )
 
 __all__ = [
     "Exam",
+    "ExamHeader",
     "Question",
+    "AnyQuestion",
     "Associative",
     "CodeIo",
     "Essay",
@@ -36,3 +39,35 @@ __all__ = [
     "UnitTest",
     "QuestionType",
 ]
+
+_LAZY_MODULES = {
+    "Exam": "exam",
+    "ExamHeader": "exam",
+    "Question": "question",
+    "AnyQuestion": "question",
+    "Associative": "question",
+    "CodeIo": "question",
+    "Essay": "question",
+    "FillIn": "question",
+    "MultipleChoice": "question",
+    "MultipleSelection": "question",
+    "TrueFalse": "question",
+    "UnitTest": "question",
+}
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY_MODULES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    from importlib import import_module
+
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any
+
 from pydantic import BaseModel
 
 
@@ -12,8 +14,34 @@ class Model(BaseModel):
         """Pydantic configuration"""
 
         extra = "forbid"
+        # Validators are built on first use instead of at class creation, so
+        # importing the models is cheap.
+        defer_build = True
         # allow_mutation = False
         # frozen = True
         json_encoders = {
             set: list,
         }
+
+    def content_hash(self) -> str:
+        """
+        Canonical hash of the content of the model.
+
+        Equivalent models have the same hash, regardless of field order or
+        whether defaults were given explicitly. See mdq.hashing.
+        """
+        from ..hashing import content_hash
+
+        return content_hash(self)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self.__dict__.pop("__content_digest__", None)
+        super().__setattr__(name, value)
+
+    def model_copy(
+        self, *, update: dict[str, Any] | None = None, deep: bool = False
+    ) -> Any:
+        copy = super().model_copy(update=update, deep=deep)
+        if update:
+            copy.__dict__.pop("__content_digest__", None)
+        return copy
@@ -1,7 +1,7 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 
-class TextFormat(Enum):
+class TextFormat(StrEnum):
     """
     How to interpret textual strings.
     """
@@ -4,22 +4,13 @@ from pydantic import Field
 
 from .base import Model
 from .enums import TextFormat
-from .question import (
-    Associative,
-    CodeIo,
-    Essay,
-    FillIn,
-    MultipleChoice,
-    MultipleSelection,
-    TrueFalse,
-    UnitTest,
-)
+from .question import AnyQuestion
 from .shared import DefaultGrading, Footnote, MediaItem
 
 
-class Exam(Model):
+class ExamHeader(Model):
     """
-    A document with a sequence of questions.
+    The information about an exam, without its questions.
     """
 
     class Config:
@@ -70,19 +61,6 @@ class Exam(Model):
             default_factory=set,
         ),
     ]
-    questions: Annotated[
-        list[
-            MultipleChoice
-            | MultipleSelection
-            | TrueFalse
-            | Associative
-            | FillIn
-            | Essay
-            | CodeIo
-            | UnitTest
-        ],
-        Field(description="List of questions", min_items=1),
-    ]
     format: Annotated[
         TextFormat, Field(description="How to interpret textual strings.")
     ] = TextFormat.MARKDOWN
@@ -100,3 +78,14 @@ class Exam(Model):
             "Set the default configuration for all questions in this exam.",
         ),
     ] = False
+
+
+class Exam(ExamHeader):
+    """
+    A document with a sequence of questions.
+    """
+
+    questions: Annotated[
+        list[AnyQuestion],
+        Field(description="List of questions", min_items=1),
+    ]
@@ -26,20 +26,7 @@ from .shared import (
     MediaItem,
     TrueFalseGrading,
 )
-from ..types import NOT_GIVEN
-
-type QuestionType = Literal[
-    "multiple-choice",
-    "multiple-selection",
-    "associative",
-    "true-false",
-    "numerical",
-    "matching",
-    "essay",
-    "fill-in",
-    "code-io",
-    "unit-test",
-]
+from ..types import NOT_GIVEN, QuestionType
 
 
 class BaseQuestion[Grading = IntervalGrading](Model, ABC):
@@ -139,6 +126,11 @@ class BaseQuestion[Grading = IntervalGrading](Model, ABC):
         "shuffle",
     ]
 
+    def model_post_init(self, context: Any) -> None:
+        # The discriminator is always serialized, even with exclude_unset=True,
+        # so dumps can be loaded back as a discriminated union.
+        self.__pydantic_fields_set__.add("type")
+
 
 class BaseProgrammingQuestion(BaseQuestion, ABC):
     """
@@ -402,3 +394,17 @@ class UnitTest(BaseProgrammingQuestion):
     ]
     INFO_FIELDS: ClassVar = [*BaseQuestion.INFO_FIELDS]
 
+
+type Question = (
+    Associative
+    | CodeIo
+    | Essay
+    | FillIn
+    | MultipleChoice
+    | MultipleSelection
+    | TrueFalse
+    | UnitTest
+)
+
+#: Any question, validated by dispatching on the "type" field.
+type AnyQuestion = Annotated[Question, Field(discriminator="type")]
@@ -0,0 +1,213 @@
+"""
+Expected outputs of code-io questions.
+
+The expected output for an input declared in the answer key of a CodeIo
+question is produced by running a reference program. Outputs are computed
+once and stored in a persistent cache keyed by the content hash of the
+question, the reference program and the input, so grading a submission only
+runs the submission itself. Outputs are recomputed only when the question or
+the reference program change.
+"""
+
+import hashlib
+import os
+import sqlite3
+import unicodedata
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .executor import Executor, Job, TestCase, question_timeout
+
+if TYPE_CHECKING:
+    from .models import CodeIo
+    from .models.shared import Conf
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT NOT NULL,
+    input TEXT NOT NULL,
+    question TEXT NOT NULL,
+    output TEXT NOT NULL,
+    PRIMARY KEY (key, input)
+);
+CREATE INDEX IF NOT EXISTS outputs_question ON outputs (question);
+"""
+
+
+def default_output_cache_path() -> Path:
+    """
+    Location of the default output cache database.
+
+    It is stored next to the parse cache (see mdq.cache.default_cache_path).
+    """
+    from .cache import default_cache_path
+
+    return default_cache_path().with_name("output-cache.sqlite3")
+
+
+class OutputCache:
+    """
+    Persistent store of the outputs of reference programs.
+
+    Entries are grouped by a key that identifies a question, a reference
+    program and a language, and are looked up by input. Use ":memory:" as
+    path for a cache that is not persisted.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        if path is None:
+            path = default_output_cache_path()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    @staticmethod
+    def key(question: "CodeIo", reference: str, language: str = "python") -> str:
+        """
+        Compute the key of the outputs of a question.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{question.content_hash()}\0{language}\0".encode())
+        digest.update(reference.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, key: str, inputs: Iterable[str]) -> dict[str, str]:
+        """
+        Return the cached outputs for the given inputs, mapped by input.
+
+        Inputs that are not in the cache are omitted.
+        """
+        result = {}
+        query = "SELECT output FROM outputs WHERE key = ? AND input = ?"
+        for value in inputs:
+            if (row := self._db.execute(query, (key, _input_digest(value))).fetchone()):
+                result[value] = row[0]
+        return result
+
+    def put_many(self, key: str, question_id: str, outputs: dict[str, str]) -> None:
+        """
+        Store outputs for the given key.
+
+        Outputs stored for the same question id under other keys are from
+        previous versions of the question and are removed.
+        """
+        rows = [(key, _input_digest(i), question_id, out) for i, out in outputs.items()]
+        with self._db:
+            self._db.execute("BEGIN")
+            query = "DELETE FROM outputs WHERE question = ? AND key != ?"
+            self._db.execute(query, (question_id, key))
+            query = "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)"
+            self._db.executemany(query, rows)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        self._db.execute("DELETE FROM outputs")
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def expected_outputs(
+    question: "CodeIo",
+    reference: str,
+    *,
+    language: str = "python",
+    cache: OutputCache | None = None,
+    executor: Executor | None = None,
+) -> list[str]:
+    """
+    Expected output for each test case of the question.
+
+    Outputs are listed in the same order as the test cases of the job created
+    by code_io_job(). Examples use their declared outputs, other inputs are
+    passed to the reference program. Only inputs missing from the cache are
+    executed.
+
+    Raises RuntimeError if the reference program fails on some input.
+    """
+    outputs: list[str | None] = []
+    inputs = []
+    for item in question.answer_key:
+        if (output := getattr(item, "output", None)) is not None:
+            outputs.append(output)
+        for value in getattr(item, "inputs", ()):
+            outputs.append(None)
+            inputs.append(value)
+
+    if inputs:
+        key = None if cache is None else cache.key(question, reference, language)
+        known = {} if cache is None else cache.get_many(key, inputs)  # type: ignore[arg-type]
+        if missing := [value for value in dict.fromkeys(inputs) if value not in known]:
+            computed = _run_reference(question, reference, language, missing, executor)
+            known.update(computed)
+            if cache is not None:
+                cache.put_many(key, question.id, computed)  # type: ignore[arg-type]
+        values = iter(inputs)
+        outputs = [known[next(values)] if out is None else out for out in outputs]
+    return outputs  # type: ignore[return-value]
+
+
+def compare_output(output: str, expected: str, conf: "Conf | None" = None) -> bool:
+    """
+    Compare the output of a program with the expected output.
+
+    Trailing newlines are always ignored. The options in conf can also ignore
+    trailing spaces and tabs in each line, case and accents.
+    """
+    return normalize_output(output, conf) == normalize_output(expected, conf)
+
+
+def normalize_output(text: str, conf: "Conf | None" = None) -> str:
+    """
+    Normalize text for comparison with compare_output().
+    """
+    text = text.rstrip("\r\n")
+    if conf is None:
+        return text
+    if conf.match_spaces:
+        text = "\n".join(line.rstrip().expandtabs() for line in text.splitlines())
+    if conf.ignore_accents:
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    if conf.case_sensitive is False:
+        text = text.casefold()
+    return text
+
+
+def _run_reference(question, reference, language, inputs, executor) -> dict[str, str]:
+    # One job per input, so inputs are spread across workers.
+    timeout = question_timeout(question, language)
+    jobs = [
+        Job(str(i), reference, (TestCase(value),), language, timeout)
+        for i, value in enumerate(inputs)
+    ]
+    if executor is None:
+        with Executor(min(len(jobs), os.cpu_count() or 1)) as executor:
+            results = list(executor.run(jobs))
+    else:
+        results = list(executor.run(jobs))
+
+    outputs = {}
+    for result in results:
+        value = inputs[int(result.job)]
+        if not result.ok:
+            message = result.stderr.strip().splitlines()[-1:] or [result.status]
+            raise RuntimeError(
+                f"reference program failed with input {value!r}: {message[0]}"
+            )
+        outputs[value] = result.stdout
+    return outputs
+
+
+def _input_digest(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
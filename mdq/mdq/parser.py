@@ -1,27 +1,35 @@
 import abc
-from collections import deque
+from dataclasses import dataclass
+import functools
 import io
-from itertools import islice
+from itertools import islice, pairwise
 from pathlib import Path
-from typing import Any, Callable, Iterable, MutableMapping, TextIO
-
-from markdown_it import MarkdownIt
-from markdown_it.tree import SyntaxTreeNode as Node
-from mdit_py_plugins.amsmath import amsmath_plugin
-from mdit_py_plugins.container import container_plugin
-from mdit_py_plugins.deflist import deflist_plugin
-from mdit_py_plugins.dollarmath import dollarmath_plugin
-from mdit_py_plugins.footnote import footnote_plugin
-from mdit_py_plugins.subscript import sub_plugin
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Iterator,
+    MutableMapping,
+    TextIO,
+)
 
 from . import models
-
-# from mdit_py_plugins.anchors import anchors_plugin
-# from mdit_py_plugins.tasklists import tasklists_plugin
-from .models import Exam, Question, QuestionType
-from .types import NOT_GIVEN, NOT_GIVEN_TYPE, ItemMark
+from .models import Exam, ExamHeader, Question, QuestionType
+from .tokens import Block, Predicate, Span, TokenStream
+from .types import ITEM_MARK_REGEX, NOT_GIVEN, NOT_GIVEN_TYPE, ItemMarks
 from .utils import humanize_slug, remove_extensions, slugify
-from . import errors
+from . import errors, fillin
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+
+    from .cache import ParseCache
+    from .models.shared import Choice
+
+#: Version of the parser output. Bump it whenever the same source parses to a
+#: different model, so cached results of older parsers are not reused.
+PARSER_VERSION = 2
 
 QUESTION_TYPES: dict[QuestionType, type[Question]] = {
     "multiple-choice": models.MultipleChoice,
@@ -32,33 +40,56 @@ QUESTION_TYPES: dict[QuestionType, type[Question]] = {
     "fill-in": models.FillIn,
 }
 
-type NodePredicate = Callable[[Node], bool] | None | dict[str, Any]
+type NodePredicate = Predicate
 
+FENCE_REGEX = re.compile(r" {0,3}(`{3,}|~{3,})")
+QUESTION_HEADING_REGEX = re.compile(r" {0,3}## ")
+HR_REGEX = re.compile(r" {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+TITLE_ID_REGEX = re.compile(r"\[\s*([^\]\s]+)\s*\]\s*(.*)", re.DOTALL)
 
-class EOFNode(Node):
-    tag: str = "eof"
-    type: str = "eof"
-    content: str = ""
-
-    def __bool__(self):
-        return False
 
+@functools.cache
+def get_markdown(html: bool = True) -> "MarkdownIt":
+    """
+    Return the MarkdownIt instance used to tokenize sources.
 
-md = (
-    (
-        MarkdownIt("commonmark", {"breaks": True, "html": True})
-        .use(footnote_plugin)
-        .use(amsmath_plugin)
-        .use(deflist_plugin)
-        .use(dollarmath_plugin)
-        .use(container_plugin, "info")
-        .use(sub_plugin)
-        # .use(tasklists_plugin, {"label": True})
-        # .use(anchors_plugin)
+    The instance and its plugins are created on first use, so importing mdq
+    does not pay for them. Pass ``html=False`` for an instance with the same
+    plugins that escapes raw HTML, which is used to render untrusted text.
+    """
+    from markdown_it import MarkdownIt
+    from mdit_py_plugins.amsmath import amsmath_plugin
+    from mdit_py_plugins.container import container_plugin
+    from mdit_py_plugins.deflist import deflist_plugin
+    from mdit_py_plugins.dollarmath import dollarmath_plugin
+    from mdit_py_plugins.footnote import footnote_plugin
+    from mdit_py_plugins.subscript import sub_plugin
+
+    # from mdit_py_plugins.anchors import anchors_plugin
+    # from mdit_py_plugins.tasklists import tasklists_plugin
+
+    return (
+        (
+            MarkdownIt("commonmark", {"breaks": True, "html": html})
+            .use(footnote_plugin)
+            .use(amsmath_plugin)
+            .use(deflist_plugin)
+            .use(dollarmath_plugin)
+            .use(container_plugin, "info")
+            .use(sub_plugin)
+            # .use(tasklists_plugin, {"label": True})
+            # .use(anchors_plugin)
+        )
+        .enable("table")
+        .enable("strikethrough")
     )
-    .enable("table")
-    .enable("strikethrough")
-)
+
+
+def __getattr__(name: str):
+    # The module level "md" instance is kept for backwards compatibility.
+    if name == "md":
+        return get_markdown()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_question(
@@ -67,48 +98,31 @@ def parse_question(
     id: str | None = None,
     title: str | None = None,
     filename: str | Path | None = None,
+    cache: "ParseCache | None" = None,
 ) -> Question:
-    # Normalize file name
-    if isinstance(src, Path) and filename is not None:
-        raise ValueError("Cannot specify filename when src is a Path")
-
-    if filename is None and isinstance(src, Path):
-        filename = src
-    elif filename is None and hasattr(src, "name"):
-        filename = getattr(src, "name", None)
-
-    if isinstance(filename, str):
-        filename = Path(filename).name
-    elif isinstance(filename, Path):
-        filename = filename.name
-
-    # Normalize id
-    default_id = None
-    if id is None and filename is not None:
-        default_id = slugify(remove_extensions(Path(filename).name))
-    elif id is None and title is not None:
-        default_id = slugify(title)
-
-    # Normalize title
-    default_title = None
-    if title is None and id is not None:
-        default_title = humanize_slug(id, title=True)
+    """
+    Parse a single question.
 
-    # Normalize source
-    if isinstance(src, Path):
-        src = src.read_text(encoding="utf-8")
-    elif not isinstance(src, str):
-        src = src.read()
+    If a cache is given, parsing is skipped when the same source was already
+    parsed with the same options.
+    """
+    src, default_id, default_title = read_source(src, id, title, filename)
+    if cache is not None:
+        key = cache.key("question", src, id, title, default_id, default_title)
+        if (cached := cache.get(key)) is not None:
+            return cached
 
     parser = QuestionParser(
         src,
-        deque(read_nodes(src)),
+        read_tokens(src),
         default_id=default_id,
         default_title=default_title,
     )
     question = parser.parse()
-    question.id = id or question.id
-    question.title = title or question.title
+    override_fields(question, id=id, title=title)
+
+    if cache is not None:
+        cache.put(key, question)
     return question
 
 
@@ -118,7 +132,113 @@ def parse_exam(
     id: str | None = None,
     title: str | None = None,
     filename: str | Path | None = None,
+    cache: "ParseCache | None" = None,
 ) -> Exam:
+    """
+    Parse an exam with a sequence of questions.
+
+    If a cache is given, parsing is skipped when the same source was already
+    parsed with the same options.
+    """
+    src, default_id, default_title = read_source(src, id, title, filename)
+    if cache is not None:
+        key = cache.key("exam", src, id, title, default_id, default_title)
+        if (cached := cache.get(key)) is not None:
+            return cached
+
+    parser = ExamParser(
+        src,
+        read_tokens(src),
+        default_id=default_id,
+        default_title=default_title,
+    )
+    exam = parser.parse()
+    override_fields(exam, id=id, title=title)
+
+    if cache is not None:
+        cache.put(key, exam)
+    return exam
+
+
+def iter_exam(
+    src: str | Path | TextIO,
+    *,
+    id: str | None = None,
+    title: str | None = None,
+    filename: str | Path | None = None,
+) -> Iterator[ExamHeader | Question]:
+    """
+    Parse an exam lazily.
+
+    Yield the exam header first and then each question as soon as it is
+    parsed. Questions are tokenized one at a time, so only a single question
+    is held in memory by the parser.
+    """
+    src, default_id, default_title = read_source(src, id, title, filename)
+    sections = split_exam(src)
+    if not sections.questions:
+        raise errors.EmptyQuestions()
+
+    header = ExamParser.from_sections(sections, default_id, default_title).header()
+    override_fields(header, id=id, title=title)
+    yield header
+
+    seen: set[str] = set()
+    for n, section in enumerate(sections.questions, 1):
+        question = parse_exam_question(section, n)
+        check_unique_id(question, seen)
+        yield question
+
+
+def parse_exam_question(src: str, n: int = 1) -> Question:
+    """
+    Parse the source of the n-th question section of an exam.
+
+    Questions without an explicit id are named after their position.
+    """
+    parser = QuestionParser(
+        src, read_tokens(src), fullmatch=False, default_id=question_id(n)
+    )
+    return parser.parse()
+
+
+def check_unique_id(question: Question, seen: set[str]) -> None:
+    """
+    Raise DuplicateQuestion if the id of question is in seen, and add it.
+    """
+    if question.id in seen:
+        raise errors.DuplicateQuestion(question.id)
+    seen.add(question.id)
+
+
+def question_id(n: int) -> str:
+    """
+    Default id of the n-th question of an exam.
+    """
+    return f"q{n}"
+
+
+def override_fields(model: Any, **fields: Any) -> None:
+    """
+    Set the given fields of a parsed model, skipping the ones that are None.
+
+    Fields that are not touched stay unset, so they are omitted by
+    ``model_dump(exclude_unset=True)``.
+    """
+    for name, value in fields.items():
+        if value is not None:
+            setattr(model, name, value)
+
+
+def read_source(
+    src: str | Path | TextIO,
+    id: str | None = None,
+    title: str | None = None,
+    filename: str | Path | None = None,
+) -> tuple[str, str | None, str | None]:
+    """
+    Read source and compute the default id and title for the parsed document.
+    """
     # Normalize file name
     if isinstance(src, Path) and filename is not None:
         raise ValueError("Cannot specify filename when src is a Path")
@@ -151,30 +271,81 @@ def parse_exam(
     elif not isinstance(src, str):
         src = src.read()
 
-    parser = ExamParser(
-        src,
-        deque(read_nodes(src)),
-        default_id=default_id,
-        default_title=default_title,
-    )
-    exam = parser.parse()
-    exam.id = id or exam.id
-    exam.title = title or exam.title
-    return exam
+    return src, default_id, default_title
+
+
+@dataclass
+class ExamSections:
+    """
+    The source of an exam split into independently parseable chunks.
+    """
+
+    header: str
+    questions: list[str]
+    epilogue: str = ""
+
+
+def split_exam(src: str) -> ExamSections:
+    """
+    Split exam source into header, question sections and epilogue.
+
+    Each question starts with an ATX level 2 heading (``## ...``) outside a
+    fenced code block. The epilogue starts at the last thematic break after the
+    last question.
+    """
+    lines = src.splitlines(keepends=True)
+    starts: list[int] = []
+    last_hr = None
+    fence = None
+    blank = True
+
+    for i, line in enumerate(lines):
+        if fence is not None:
+            if line.strip().startswith(fence) and not line.strip(fence[0]).strip():
+                fence = None
+        elif m := FENCE_REGEX.match(line):
+            fence = m.group(1)
+        elif QUESTION_HEADING_REGEX.match(line):
+            starts.append(i)
+        elif blank and HR_REGEX.match(line):
+            last_hr = i
+        blank = not line.strip()
+
+    if not starts:
+        return ExamSections(src, [])
+
+    end = len(lines)
+    if last_hr is not None and last_hr > starts[-1]:
+        end = last_hr
+
+    header = "".join(lines[: starts[0]])
+    questions = ["".join(lines[a:b]) for a, b in pairwise([*starts, end])]
+    epilogue = "".join(lines[end:])
+    return ExamSections(header, questions, epilogue)
 
 
 class Parser[T](abc.ABC, MutableMapping[str, Any]):
+    """
+    Base recursive descent parser.
+
+    Parsers move over the top-level blocks of a TokenStream using an integer
+    cursor. Parsers can share a stream: a sub-parser starts at the position of
+    its parent and the parent resumes from the sub-parser's final position.
+    """
+
     def __init__(
         self,
         source: str,
-        nodes: deque[Node],
+        stream: TokenStream,
         fullmatch: bool = True,
         default_id: str | None = None,
         default_title: str | None = None,
+        pos: int = 0,
     ) -> None:
         self.source = source
-        self.lines = source.splitlines()
-        self.nodes = nodes
+        self.stream = stream
+        self.lines = stream.lines
+        self.pos = pos
         self.default_id = default_id
         self.default_title = default_title
         self.fullmatch = fullmatch
@@ -196,10 +367,20 @@ class Parser[T](abc.ABC, MutableMapping[str, Any]):
         return len(self._fields)
 
     def parse(self) -> T:
-        self.root()
-        if self.fullmatch and self.nodes:
-            raise errors.NodesRemaining(self.nodes[0])
-        return self.build()
+        try:
+            self.root()
+            if self.fullmatch and not self.empty():
+                raise errors.NodesRemaining(self.peek())
+            return self.build()
+        except Exception as ex:
+            # Record the location of the error for diagnostics. Errors raised
+            # by nested parsers keep their own, more precise, location.
+            if getattr(ex, "span", None) is None:
+                try:
+                    ex.span = self.last_span()  # type: ignore[attr-defined]
+                except AttributeError:
+                    pass
+            raise
 
     @abc.abstractmethod
     def root(self) -> None:
@@ -215,36 +396,50 @@ class Parser[T](abc.ABC, MutableMapping[str, Any]):
         """
         Return true if node stream is empty
         """
-        return not bool(self.nodes)
+        return self.pos >= self.stream.size
+
+    def last_span(self) -> Span | None:
+        """
+        Source lines of the last block read, or of the next one if nothing
+        was read yet.
+        """
+        stream, pos = self.stream, self.pos
+        for index in range(pos):
+            if stream.ends[index] == pos and stream.spans[index] is not None:
+                return stream.spans[index]
+        return stream.spans[pos]
 
-    def eof_node(self) -> Node:
-        return Node(create_root=False)
+    def eof_node(self) -> Block:
+        return Block(self.stream, self.stream.size)
 
-    def peek(self) -> Node:
+    def peek(self) -> Block:
         """
         See next node, but do not advance
         """
-        if self.nodes:
-            return self.nodes[0]
-        return self.eof_node()
+        return Block(self.stream, self.pos)
 
-    def pop_node(self) -> Node:
-        return self.nodes.popleft()
+    def pop_node(self) -> Block:
+        if self.empty():
+            raise IndexError("no more nodes in stream")
+        return self.read()
 
-    def push_node(self, node: Node):
-        self.nodes.appendleft(node)
+    def push_node(self, node: Block):
+        """
+        Move cursor back to the start of node.
+        """
+        self.pos = node.index
 
-    def read(self) -> Node:
+    def read(self) -> Block:
         """
         Read one node. Use .pop_node() if you want EOF errors on empty streams.
         """
-        if self.nodes:
-            return self.nodes.popleft()
-        return self.eof_node()
+        node = Block(self.stream, self.pos)
+        self.pos = self.stream.ends[self.pos]
+        return node
 
     def expect(
         self, pred: NodePredicate = None, /, msg: str | None = None, **kwargs
-    ) -> Node:
+    ) -> Block:
         """
         Expect a predicate to hold to the next node.
         """
@@ -263,40 +458,40 @@ class Parser[T](abc.ABC, MutableMapping[str, Any]):
         msg = f"Expected token with {expected}, got {actual}"
         raise ValueError(msg)
 
-    def match(self, pred: NodePredicate = None, /, **kwargs) -> Node | None:
+    def match(self, pred: NodePredicate = None, /, **kwargs) -> Block | None:
         """
         Verify if next node satisfy predicate and if so, consume it.
         """
-        try:
-            node = self.nodes[0]
-        except IndexError:
+        pos = self.pos
+        if pos >= self.stream.size or not self.stream.verify(pos, pred, kwargs):
             return None
-        return self.nodes.popleft() if verify_node(node, pred, **kwargs) else None
+        self.pos = self.stream.ends[pos]
+        return Block(self.stream, pos)
 
-    def take(self, pred: NodePredicate = None, **kwargs) -> Iterable[Node]:
+    def take(self, pred: NodePredicate = None, **kwargs) -> Iterable[Block]:
         """
         Take all nodes that verify predicate.
         """
         while tok := self.match(pred, **kwargs):
             yield tok
 
-    def take_until(self, pred: NodePredicate = None, **kwargs) -> Iterable[Node]:
+    def take_until(self, pred: NodePredicate = None, **kwargs) -> Iterable[Block]:
         """
         Take nodes until the first one satisfy some prodicate
         """
-        nodes = self.nodes
-        while nodes and not verify_node(nodes[0], pred, **kwargs):
-            yield nodes.popleft()
+        stream = self.stream
+        while not self.empty() and not stream.verify(self.pos, pred, kwargs):
+            yield self.read()
 
     def show(self, detail: bool = False, limit=None) -> None:
-        nodes = iter(self.nodes)
+        nodes = self.stream.blocks(self.pos)
         if limit is not None:
             nodes = islice(nodes, 0, limit)
 
         for node in nodes:
-            print(node.pretty(show_text=True))
+            print(node.pretty())
             if detail:
-                print(vars(node))
+                print(vars(node.token))
         print("-----")
 
     def set(self, field: str, value: Any, force: bool = False) -> None:
@@ -306,41 +501,55 @@ class Parser[T](abc.ABC, MutableMapping[str, Any]):
             msg = f"Field '{field}' is already set to {self._fields[field]!r}"
             raise ValueError(msg)
 
-    def original_source_block(self, node: Node):
+    def original_source_block(self, node: Block):
         """
         Print the lines the node originally span in the source code
         """
-        start = end = None
-        for child in node.walk():
-            if (pos := child.map) is None:
-                continue
-            a, b = pos
-            if start is None:
-                start = min(a, b)
-            if end is None:
-                end = max(a, b)
-            end = max(end, a, b)
-
-        if start is None or end is None:  # noqa: E711
-            return ""
-
-        if start == end:
-            return self.lines[start]
-        return "\n".join(self.lines[start:end])
+        return self.stream.source_block(node.index)
 
 
 class ExamParser(Parser[Exam]):
     def __init__(
         self,
         source: str,
-        nodes: deque[Node],
+        stream: TokenStream,
         fullmatch: bool = True,
         default_id: str | None = None,
         default_title: str | None = None,
+        pos: int = 0,
     ) -> None:
-        super().__init__(source, nodes, fullmatch, default_id, default_title)
+        super().__init__(source, stream, fullmatch, default_id, default_title, pos)
         self.body: list[Question] = []
 
+    @classmethod
+    def from_sections(
+        cls,
+        sections: ExamSections,
+        default_id: str | None = None,
+        default_title: str | None = None,
+    ) -> "ExamParser":
+        """
+        Create a parser with the header and epilogue of a split exam.
+
+        Questions are parsed separately and must be added to the body before
+        calling build().
+        """
+        shell = sections.header + sections.epilogue
+        parser = cls(
+            shell,
+            read_tokens(shell),
+            default_id=default_id,
+            default_title=default_title,
+        )
+        parser.info()
+        parser.epilogue()
+        return parser
+
+    def header(self) -> ExamHeader:
+        if "id" not in self._fields:
+            self._fields["id"] = self.default_id or "exam"
+        return ExamHeader(**self._fields)
+
     def build(self):
         if "id" not in self._fields:
             self._fields["id"] = self.default_id or "exam"
@@ -353,9 +562,8 @@ class ExamParser(Parser[Exam]):
         self.questions()
         self.epilogue()
 
-        for node in self.nodes:
-            print(node.pretty(show_text=True))
-        self.nodes.clear()
+        # Trailing content after the epilogue is ignored
+        self.pos = self.stream.size
 
     #
     # Recursive descent parsing methods
@@ -372,9 +580,21 @@ class ExamParser(Parser[Exam]):
         self.expect(tag="hr")
 
     def questions(self) -> None:
-        while self.peek().tag != "hr":
-            parser = QuestionParser(self.source, self.nodes, fullmatch=False)
+        seen: set[str] = set()
+        # Footnote definitions are moved to a block at the end of the stream.
+        while (node := self.peek()).tag not in ("hr", "eof") and (
+            node.type != "footnote_block"
+        ):
+            parser = QuestionParser(
+                self.source,
+                self.stream,
+                fullmatch=False,
+                default_id=question_id(len(self.body) + 1),
+                pos=self.pos,
+            )
             question = parser.parse()
+            check_unique_id(question, seen)
+            self.pos = parser.pos
             self.body.append(question)
 
     def epilogue(self) -> None:
@@ -382,7 +602,6 @@ class ExamParser(Parser[Exam]):
             self.set("epilogue", epilogue.content)
 
     def metadata(self, src: str) -> None:
-        print(src)
         pass
 
 
@@ -390,15 +609,25 @@ class QuestionParser(Parser[Question]):
     def __init__(
         self,
         source: str,
-        nodes: deque[Node],
+        stream: TokenStream,
         fullmatch: bool = True,
         default_id: str | None = None,
         default_title: str | None = None,
+        pos: int = 0,
     ) -> None:
-        super().__init__(source, nodes, fullmatch, default_id, default_title)
+        super().__init__(source, stream, fullmatch, default_id, default_title, pos)
         self.type: QuestionType | NOT_GIVEN_TYPE = NOT_GIVEN
 
     def build(self) -> Question:
+        if "id" not in self._fields:
+            if self.default_id:
+                self._fields["id"] = self.default_id
+            elif title := self._fields.get("title"):
+                self._fields["id"] = slugify(title)
+            else:
+                raise errors.MissingField("id", message="Question has no id")
+        if "title" not in self._fields and self.default_title:
+            self._fields["title"] = self.default_title
         return self.question_class()(**self._fields)
 
     def question_class(self) -> type[Question]:
@@ -413,7 +642,7 @@ class QuestionParser(Parser[Question]):
     #
     def root(self) -> None:
         if title := self.match(tag="h2"):
-            self.set("title", title.content)
+            self.title(title.content)
         if info := self.match(type="code_block"):
             self.metadata(info.content)
 
@@ -425,110 +654,138 @@ class QuestionParser(Parser[Question]):
         if paragraphs and "stem" not in self:
             self.set("stem", paragraphs.pop())
         self.set("preamble", "\n\n".join(paragraphs))
+        self.epilogue()
 
-        self.show(True, 1)
+    def title(self, src: str) -> None:
+        """
+        Read the heading of a question, with an optional "[id]" prefix.
+        """
+        if m := TITLE_ID_REGEX.fullmatch(src.strip()):
+            self.set("id", m.group(1))
+            src = m.group(2)
+        if src := src.strip():
+            self.set("title", src)
 
     def preamble_paragraph(self) -> str | None:
-        node = self.read()
-        if self.type is NOT_GIVEN:
-            return self._paragraph_or_set_type(node)
-        raise NotImplementedError
+        if self.type is not NOT_GIVEN:
+            # The list of choices or the paragraph with blanks ended the body.
+            return None
+        return self._paragraph_or_set_type(self.read())
+
+    def epilogue(self) -> None:
+        """
+        Read the paragraphs after the choices, up to the end of the question.
+        """
+        blocks = [node.source() for node in self.take_until(is_question_boundary)]
+        if blocks:
+            self.set("epilogue", "\n\n".join(blocks))
 
     def metadata(self, src: str):
-        print(f"Question info: {self['title']}")
-        print(src)
+        pass
 
     #
     # Auxiliary methods
     #
-    def _paragraph_or_set_type(self, node: Node) -> str | None:
+    def _paragraph_or_set_type(self, node: Block) -> str | None:
+        if is_question_boundary(node):
+            raise errors.IncompleteQuestion()
         match node.tag:
-            case "eof":
-                raise errors.IncompleteQuestion()
             case "ul":
                 return self._paragraph_or_set_type_from_ul(node)
+            case "p" if "[^" in node.content:
+                return self._paragraph_or_set_fill_in(node)
             case _:
-                print(node.pretty())
                 return node.content
 
-    def _paragraph_or_set_type_from_ul(self, node: Node) -> str | None:
-        kinds = set()
-        for item in node.children:
-            mark = self._item_mark(item)
-            kinds.add(mark.kind)
-
-        if kinds == {"select"}:
-            self.type = "multiple-selection"
-        elif kinds == {"true-false"}:
-            self.type = "true-false"
-        elif kinds == {"none"}:
+    def _paragraph_or_set_type_from_ul(self, node: Block) -> str | None:
+        marks = ItemMarks.scan(self.stream, node.index)
+        if (kind := marks.question_type()) is None:
             return self.original_source_block(node)
-        elif kinds.issubset({"none", "select"}):
-            self.type = "multiple-choice"
-        return self.original_source_block(node)
+        self.type = kind
+        self.set("choices", self._choices(node, marks, kind))
+        return None
 
-    def _item_mark(self, node: Node) -> ItemMark:
-        if not node.children:
-            return None
+    def _choices(
+        self, node: Block, marks: ItemMarks, kind: QuestionType
+    ) -> list["Choice"]:
+        from .models.shared import Choice
+
+        choices = []
+        for item, mark in zip(node.children, marks):
+            paragraph = first_child(item, type="paragraph")
+            text = paragraph.content if paragraph else ""
+            if mark.kind != "none":
+                text = ITEM_MARK_REGEX.sub("", text, count=1)
+            feedback = [
+                child.source().strip().removeprefix(">").strip()
+                for child in item.children
+                if child.type == "blockquote"
+            ]
+            match mark.value:
+                case None:
+                    correct = False
+                case bool() | float() as value:
+                    correct = value
+                case value:
+                    correct = float(value)
+            choices.append(
+                Choice(
+                    text=text.strip(),
+                    correct=correct,
+                    feedback="\n".join(feedback),
+                )
+            )
+        return choices
 
-        focus = first_child(node, type="paragraph")
-        focus = first_child(focus, type="inline")
-        if focus is None:
-            return None
+    def _paragraph_or_set_fill_in(self, node: Block) -> str | None:
+        # Footnotes defined right after the paragraph are its blanks.
+        definitions, end = fillin.read_definitions(self.lines, node.map[1])
+        if not definitions:
+            return node.content
 
-        return ItemMark.parse(focus.content)
+        self.type = QuestionType.FILL_IN
+        self.set("body", fillin.parse_body(node.content, definitions))
 
+        # markdown-it moves the definitions to a footnote block at the end of
+        # the stream, but may leave nested blocks in place.
+        spans = self.stream.spans
+        while not self.empty() and (
+            self.stream.types[self.pos] == "footnote_block"
+            or (spans[self.pos] or (end, end))[0] < end
+        ):
+            self.read()
+        return node.content
 
 
-def read_nodes(src: str) -> Iterable[Node]:
-    tokens = md.parse(src)
-    ast = Node(tokens)
-    yield from ast.children
+def is_question_boundary(node: Block) -> bool:
+    """
+    True for blocks that end a question: the next question heading, the
+    thematic break before the exam epilogue or the end of the stream.
+    """
+    return node.tag in ("h2", "hr", "eof") or node.type == "footnote_block"
 
 
-def verify_node(node: Node, pred: NodePredicate, **kwargs) -> bool:
-    if not pred and not kwargs:
-        raise TypeError(
-            "must provide either a predicate function or keyword argument filters"
-        )
-    if pred is not None and kwargs:
-        raise TypeError("cannot provide both predicate function and argument filters")
-
-    if callable(pred):
-        return pred(node)
-    elif pred is not None:
-        kwargs = pred
+def read_tokens(src: str) -> TokenStream:
+    """
+    Tokenize source into a flat TokenStream.
+    """
+    return TokenStream(get_markdown().parse(src), src)
 
-    if any(getattr(node, k) != v for k, v in kwargs.items()):
-        return False
 
-    return True
+def verify_node(node: Block, pred: NodePredicate, **kwargs) -> bool:
+    return node.stream.verify(node.index, pred, kwargs)
 
 
-def first_child(node: Node | None, pred: NodePredicate = None, /, **kwargs) -> Node | None:
+def first_child(
+    node: Block | None, pred: NodePredicate = None, /, **kwargs
+) -> Block | None:
     """
     Verify if first child node satisfy predicate and if so return it.
     """
     if node is None:
         return None
-    try:
-        child = node.children[0]
-    except IndexError:
+    stream = node.stream
+    index = node.index + 1
+    if node.end == index or index >= stream.size:
         return None
-    return child if verify_node(child, pred, **kwargs) else None
-
-def take(self, pred: NodePredicate = None, **kwargs) -> Iterable[Node]:
-    """
-    Take all nodes that verify predicate.
-    """
-    while tok := self.match(pred, **kwargs):
-        yield tok
-
-def take_until(self, pred: NodePredicate = None, **kwargs) -> Iterable[Node]:
-    """
-    Take nodes until the first one satisfy some prodicate
-    """
-    nodes = self.nodes
-    while nodes and not verify_node(nodes[0], pred, **kwargs):
-        yield nodes.popleft()
-
+    return Block(stream, index) if stream.verify(index, pred, kwargs) else None
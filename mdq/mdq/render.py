@@ -0,0 +1,100 @@
+"""
+Rendering of text fields to HTML.
+
+Text is rendered with the same markdown configuration used by the parser, but
+with raw HTML disabled, so the output is safe to embed in pages. Rendered
+fragments are kept in a bounded cache keyed by a hash of their content, so the
+same text is rendered only once per process however many times it is shown.
+"""
+
+import hashlib
+import html
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Mapping
+
+#: Maximum number of fragments kept by render().
+RENDER_CACHE_SIZE = 8192
+
+#: Top level text fields of questions and exams.
+TEXT_FIELDS = ("description", "preamble", "stem", "epilogue")
+
+#: Text fields of the items of list fields.
+ITEM_TEXT_FIELDS = {
+    "choices": ("text", "feedback"),
+    "footnotes": ("text",),
+    "body": ("text",),
+}
+
+_cache: OrderedDict[bytes, str] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def render(text: str, format: str = "md") -> str:
+    """
+    Render text to sanitized HTML.
+
+    Text in the "text" format is escaped and wrapped in a paragraph, instead of
+    being interpreted as Markdown.
+    """
+    key = hashlib.blake2b(f"{format}\0{text}".encode(), digest_size=16).digest()
+    with _cache_lock:
+        if (result := _cache.get(key)) is not None:
+            _cache.move_to_end(key)
+            return result
+
+    if format == "text":
+        result = f"<p>{html.escape(text)}</p>\n"
+    else:
+        from .parser import get_markdown
+
+        result = get_markdown(html=False).render(text)
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def text_fields(data: Mapping[str, Any]) -> dict[str, str]:
+    """
+    Collect the non-empty text fields of a question or exam.
+
+    Data is the JSON representation of the document. Return a mapping from
+    the path of each field, like "stem" or "choices.0.text", to its source.
+    """
+    texts = {}
+    for name in TEXT_FIELDS:
+        if isinstance(text := data.get(name), str) and text:
+            texts[name] = text
+    for name, keys in ITEM_TEXT_FIELDS.items():
+        for i, item in enumerate(data.get(name) or ()):
+            if not isinstance(item, Mapping):
+                continue
+            for key in keys:
+                if isinstance(text := item.get(key), str) and text:
+                    texts[f"{name}.{i}.{key}"] = text
+    return texts
+
+
+def render_fields(data: Mapping[str, Any], format: str | None = None) -> dict[str, str]:
+    """
+    Render all text fields of a question or exam.
+
+    The format defaults to the "format" field of data, or Markdown if it is
+    not given. Return a mapping from field paths to HTML, as in text_fields().
+    """
+    format = format or data.get("format") or "md"
+    return {path: render(text, format) for path, text in text_fields(data).items()}
+
+
+def fields_hash(data: Mapping[str, Any], format: str | None = None) -> str:
+    """
+    Hash of the text fields of data and their format.
+
+    Rendered fields only need to be updated when the hash changes.
+    """
+    format = format or data.get("format") or "md"
+    src = json.dumps([format, text_fields(data)], sort_keys=True)
+    return hashlib.blake2b(src.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,246 @@
+"""
+Flat view of the markdown-it token stream.
+
+markdown-it produces a flat list of tokens in which container blocks are
+delimited by matching ``*_open`` and ``*_close`` tokens. A TokenStream
+precomputes a few arrays over that list in a single pass, so the parser can
+move through blocks with an integer cursor instead of building a tree of
+SyntaxTreeNode objects.
+"""
+
+from typing import Any, Callable, Iterator
+
+from markdown_it.token import Token
+
+type Span = tuple[int, int]
+type Predicate = Callable[["Block"], bool] | None | dict[str, Any]
+
+
+class TokenStream:
+    """
+    A list of tokens with precomputed lookup arrays.
+
+    All arrays have one extra position at the end, which represents the end of
+    the stream. It has type and tag equal to "eof".
+
+    Attributes
+    ----------
+    types:
+        Token types. Opening tokens have their "_open" suffix removed, so the
+        type of a block is the same as the type of the equivalent SyntaxTreeNode.
+    tags:
+        HTML tag of each token.
+    spans:
+        Range of source lines spanned by each token. For opening tokens, this
+        is the range spanned by the whole block.
+    ends:
+        Index past the end of the block started at each token. For tokens that
+        do not open a block, this is simply the next index.
+    """
+
+    __slots__ = ("tokens", "source", "lines", "size", "types", "tags", "spans", "ends")
+
+    def __init__(self, tokens: list[Token], source: str = "") -> None:
+        size = len(tokens)
+        types: list[str] = []
+        tags: list[str] = []
+        spans: list[Span | None] = []
+        ends = list(range(1, size + 2))
+        stack: list[int] = []
+
+        for i, token in enumerate(tokens):
+            nesting = token.nesting
+            tags.append(token.tag)
+            spans.append(tuple(token.map) if token.map else None)
+
+            if nesting == 1:
+                types.append(token.type.removesuffix("_open"))
+                stack.append(i)
+            elif nesting == -1:
+                types.append(token.type)
+                start = stack.pop()
+                ends[start] = i + 1
+                if spans[start] is None:
+                    spans[start] = _merge_spans(spans, start + 1, i)
+            else:
+                types.append(token.type)
+
+        types.append("eof")
+        tags.append("eof")
+        spans.append(None)
+        ends[size] = size
+
+        self.tokens = tokens
+        self.source = source
+        self.lines = source.splitlines()
+        self.size = size
+        self.types = types
+        self.tags = tags
+        self.spans = spans
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> "Block":
+        return Block(self, index)
+
+    def blocks(self, start: int = 0, stop: int | None = None) -> Iterator["Block"]:
+        """
+        Iterate over sibling blocks in the given range of indexes.
+        """
+        ends = self.ends
+        stop = self.size if stop is None else stop
+        while start < stop:
+            yield Block(self, start)
+            start = ends[start]
+
+    def verify(self, index: int, pred: Predicate, kwargs: dict[str, Any]) -> bool:
+        """
+        Check if the block at index satisfies the predicate or keyword filters.
+
+        Filters on type and tag are resolved directly from the lookup arrays.
+        """
+        if pred is None:
+            if not kwargs:
+                raise TypeError(
+                    "must provide either a predicate function or keyword argument filters"
+                )
+        elif kwargs:
+            raise TypeError("cannot provide both predicate function and argument filters")
+        elif callable(pred):
+            return pred(Block(self, index))
+        else:
+            kwargs = pred
+
+        for key, value in kwargs.items():
+            if key == "type":
+                if self.types[index] != value:
+                    return False
+            elif key == "tag":
+                if self.tags[index] != value:
+                    return False
+            elif getattr(Block(self, index), key) != value:
+                return False
+        return True
+
+    def source_block(self, index: int) -> str:
+        """
+        Return the source lines spanned by the block at index.
+        """
+        if (span := self.spans[index]) is None:
+            return ""
+        start, end = span
+        if start == end:
+            return self.lines[start]
+        return "\n".join(self.lines[start:end])
+
+
+class Block:
+    """
+    A lightweight reference to a block in a TokenStream.
+
+    Blocks expose the same attributes of SyntaxTreeNode that are used by the
+    parser, computed on demand from the stream.
+    """
+
+    __slots__ = ("stream", "index")
+
+    def __init__(self, stream: TokenStream, index: int) -> None:
+        self.stream = stream
+        self.index = index
+
+    def __bool__(self) -> bool:
+        return self.index < self.stream.size
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Block):
+            return self.stream is other.stream and self.index == other.index
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self.stream), self.index))
+
+    def __repr__(self) -> str:
+        return f"Block({self.type!r}, index={self.index})"
+
+    @property
+    def type(self) -> str:
+        return self.stream.types[self.index]
+
+    @property
+    def tag(self) -> str:
+        return self.stream.tags[self.index]
+
+    @property
+    def map(self) -> Span | None:
+        return self.stream.spans[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.stream.ends[self.index]
+
+    @property
+    def token(self) -> Token | None:
+        if self:
+            return self.stream.tokens[self.index]
+        return None
+
+    @property
+    def content(self) -> str:
+        """
+        Textual content of the block.
+
+        For blocks that wrap inline content, like paragraphs and headings, this
+        is the content of the inline token.
+        """
+        stream, index = self.stream, self.index
+        if index >= stream.size:
+            return ""
+        if stream.ends[index] == index + 1:
+            return stream.tokens[index].content
+        if stream.types[index + 1] == "inline":
+            return stream.tokens[index + 1].content
+        return ""
+
+    @property
+    def children(self) -> list["Block"]:
+        end = self.end
+        if end == self.index + 1:
+            return []
+        return list(self.stream.blocks(self.index + 1, end - 1))
+
+    def source(self) -> str:
+        """
+        Source lines spanned by the block.
+        """
+        return self.stream.source_block(self.index)
+
+    def pretty(self, indent: int = 2) -> str:
+        """
+        A textual representation of the block and its children.
+        """
+        stream = self.stream
+        lines = []
+        depth = 0
+        for i in range(self.index, self.end):
+            token = stream.tokens[i]
+            if token.nesting == -1:
+                depth -= 1
+                continue
+            text = f" {token.content!r}" if token.content else ""
+            lines.append(f"{' ' * indent * depth}<{stream.types[i]}>{text}")
+            depth += token.nesting
+        return "\n".join(lines)
+
+
+def _merge_spans(spans: list[Span | None], start: int, stop: int) -> Span | None:
+    lo = hi = None
+    for i in range(start, stop):
+        if (span := spans[i]) is not None:
+            a, b = span
+            lo = a if lo is None else min(lo, a)
+            hi = b if hi is None else max(hi, b)
+    if lo is None or hi is None:
+        return None
+    return (lo, hi)
@@ -1,10 +1,14 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
-from enum import Enum, auto
+from enum import Enum, IntEnum, StrEnum, auto
 from fractions import Fraction
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 import re
 
+if TYPE_CHECKING:
+    from .tokens import TokenStream
+
 ITEM_MARK_REGEX = re.compile(r"""
     \s*
     \[(?:
@@ -21,6 +25,23 @@ ITEM_MARK_REGEX = re.compile(r"""
 type Percent = float | int | Fraction
 
 
+class QuestionType(StrEnum):
+    """
+    Discriminator for the question type.
+    """
+
+    MULTIPLE_CHOICE = "multiple-choice"
+    MULTIPLE_SELECTION = "multiple-selection"
+    ASSOCIATIVE = "associative"
+    TRUE_FALSE = "true-false"
+    NUMERICAL = "numerical"
+    MATCHING = "matching"
+    ESSAY = "essay"
+    FILL_IN = "fill-in"
+    CODE_IO = "code-io"
+    UNIT_TEST = "unit-test"
+
+
 class NOT_GIVEN_TYPE(Enum):
     NOT_GIVEN = auto()
 
@@ -48,10 +69,158 @@ class ItemMark:
                 return ItemMark("select", True)
             case "pc":
                 return ItemMark("select", float(data))
-            case "other" if not data:
+            case "other" if not data.strip():
                 return ItemMark("select", False)
             case _:
                 raise NotImplementedError(m.groupdict())
 
+class MarkKind(IntEnum):
+    """
+    Compact code for the mark at the start of a list item.
+    """
+
+    NONE = 0
+    CHECKED = 1
+    UNCHECKED = 2
+    PERCENT = 3
+    TRUE = 4
+    FALSE = 5
+
+    @property
+    def group(self) -> Literal["true-false", "select", "none"]:
+        """
+        The corresponding ItemMark kind.
+        """
+        return MARK_GROUPS[self]
+
+    def item_mark(self, value: float = 0.0) -> ItemMark:
+        """
+        Expand to an ItemMark. Value is only used by PERCENT marks.
+        """
+        match self:
+            case MarkKind.NONE:
+                return ItemMark("none")
+            case MarkKind.PERCENT:
+                return ItemMark("select", value)
+            case MarkKind.TRUE | MarkKind.FALSE:
+                return ItemMark("true-false", self is MarkKind.TRUE)
+            case _:
+                return ItemMark("select", self is MarkKind.CHECKED)
+
+
+MARK_GROUPS = {
+    MarkKind.NONE: "none",
+    MarkKind.CHECKED: "select",
+    MarkKind.UNCHECKED: "select",
+    MarkKind.PERCENT: "select",
+    MarkKind.TRUE: "true-false",
+    MarkKind.FALSE: "true-false",
+}
+
+#: The most common marks, resolved without running ITEM_MARK_REGEX.
+SIMPLE_MARKS = {
+    "[x]": MarkKind.CHECKED,
+    "[X]": MarkKind.CHECKED,
+    "[t]": MarkKind.TRUE,
+    "[T]": MarkKind.TRUE,
+    "[f]": MarkKind.FALSE,
+    "[F]": MarkKind.FALSE,
+}
+
+SELECT_MARKS = frozenset([MarkKind.CHECKED, MarkKind.UNCHECKED, MarkKind.PERCENT])
+TRUE_FALSE_MARKS = frozenset([MarkKind.TRUE, MarkKind.FALSE])
+
+
+class ItemMarks:
+    """
+    Marks of all items of a list, stored as parallel arrays.
+
+    ``kinds`` holds MarkKind codes and ``values`` the percentage of PERCENT
+    marks (0.0 for other kinds).
+    """
+
+    __slots__ = ("kinds", "values")
+
+    def __init__(self, kinds: array | None = None, values: array | None = None):
+        self.kinds = array("b") if kinds is None else kinds
+        self.values = array("d") if values is None else values
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> ItemMark:
+        return MarkKind(self.kinds[index]).item_mark(self.values[index])
+
+    def __repr__(self) -> str:
+        kinds = ", ".join(MarkKind(k).name for k in self.kinds)
+        return f"ItemMarks([{kinds}])"
+
+    @classmethod
+    def scan(cls, stream: TokenStream, index: int) -> ItemMarks:
+        """
+        Read the marks of all items of the list that starts at index.
+
+        Only the inline content of the first paragraph of each item is
+        inspected. Items that do not start with a paragraph have no mark.
+        """
+        types, tokens, ends = stream.types, stream.tokens, stream.ends
+        kinds = array("b")
+        values = array("d")
+        append_kind, append_value = kinds.append, values.append
+
+        pos, stop = index + 1, ends[index] - 1
+        while pos < stop:
+            if types[pos + 1] == "paragraph" and types[pos + 2] == "inline":
+                kind, value = scan_item_mark(tokens[pos + 2].content)
+            else:
+                kind, value = MarkKind.NONE, 0.0
+            append_kind(kind)
+            append_value(value)
+            pos = ends[pos]
+        return cls(kinds, values)
+
+    def question_type(self) -> QuestionType | None:
+        """
+        The question type implied by the marks, if any.
+        """
+        kinds = set(self.kinds)
+        if not kinds or kinds == {MarkKind.NONE}:
+            return None
+        if kinds <= SELECT_MARKS:
+            return QuestionType.MULTIPLE_SELECTION
+        if kinds <= TRUE_FALSE_MARKS:
+            return QuestionType.TRUE_FALSE
+        if kinds <= SELECT_MARKS | {MarkKind.NONE}:
+            return QuestionType.MULTIPLE_CHOICE
+        return None
+
+
+def scan_item_mark(src: str) -> tuple[MarkKind, float]:
+    """
+    Classify the mark at the start of src.
+
+    Equivalent to ItemMark.parse(), but avoids the regular expression for
+    items without marks and for the most common marks.
+    """
+    src = src.lstrip()
+    if not src.startswith("["):
+        return MarkKind.NONE, 0.0
+    if (kind := SIMPLE_MARKS.get(src[:3])) is not None and src[3:4] != "(":
+        return kind, 0.0
+
+    mark = ItemMark.parse(src)
+    match mark.kind:
+        case "none":
+            return MarkKind.NONE, 0.0
+        case "true-false":
+            return (MarkKind.TRUE if mark.value else MarkKind.FALSE), 0.0
+        case _ if mark.value is True:
+            return MarkKind.CHECKED, 0.0
+        case _ if mark.value is False:
+            return MarkKind.UNCHECKED, 0.0
+        case _:
+            return MarkKind.PERCENT, float(mark.value)
+
+
 def parse_item_mark_content(src: str):
     ...
\ No newline at end of file
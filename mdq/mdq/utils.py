@@ -1,7 +1,7 @@
 import re
 import unicodedata
 from types import MappingProxyType
-from typing import Iterable, Mapping
+from typing import Iterable, Literal, Mapping
 
 import mdq
 
@@ -22,6 +22,20 @@ def remove_extensions(name: str) -> str:
     return name
 
 
+def source_kind(name: str) -> Literal["question", "exam"] | None:
+    """
+    Tell if a file name corresponds to a question or an exam source.
+
+    >>> source_kind("intro.q.md"), source_kind("final.mde"), source_kind("README.md")
+    ('question', 'exam', None)
+    """
+    if name.endswith(mdq.QUESTION_EXTENSIONS):
+        return "question"
+    if name.endswith(mdq.EXAM_EXTENSIONS):
+        return "exam"
+    return None
+
+
 def check_slug(src: str) -> Iterable[str]:
     """Verify if string is a valid slug."""
 
@@ -106,5 +120,5 @@ def slugify(string: str) -> str:
     """
 
     normalized = unicodedata.normalize("NFKD", string).encode("ascii", "ignore")
-    no_symbols = str(SYMBOL_REGEX.sub(b"", normalized).strip().lower())
+    no_symbols = SYMBOL_REGEX.sub(b"", normalized).strip().lower().decode("ascii")
     return SPACE_REGEX.sub("-", no_symbols)
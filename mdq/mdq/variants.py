@@ -0,0 +1,207 @@
+"""
+Per-student variants of an exam.
+
+A variant is a permutation of the questions of an exam and of the choices of
+each question, derived deterministically from a seed, usually a student or
+submission identifier. Variants only store permutations: questions are never
+copied, and the original exam is used to render and grade every variant.
+
+Choice permutations are drawn from precomputed tables of all valid orders of a
+question, so generating thousands of variants costs one random number per
+question per student, and identical orders are shared across variants.
+"""
+
+import functools
+import itertools
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+if TYPE_CHECKING:
+    from .models import Exam, Question
+    from .models.shared import Choice
+
+type Seed = int | str
+type Order = tuple[int, ...]
+
+#: Largest number of shuffled choices for which all orders are tabulated.
+MAX_TABLE_SIZE = 6
+
+
+@dataclass(frozen=True, slots=True)
+class Variant:
+    """
+    Order of questions and choices presented to a student.
+
+    Attributes
+    ----------
+    seed:
+        Seed used to generate the variant.
+    questions:
+        Index of the original question shown at each position.
+    choices:
+        For each original question, the index of the original choice shown at
+        each position, or None if choices are shown in the original order.
+    """
+
+    seed: Seed
+    questions: Order
+    choices: tuple[Order | None, ...]
+
+    def choice_order(self, question: int) -> Order | None:
+        """
+        Order of the choices of the original question at the given index.
+        """
+        return self.choices[question]
+
+    def display(self, exam: "Exam") -> Iterator[tuple["Question", list["Choice"] | None]]:
+        """
+        Iterate over the questions of exam in the order shown to the student,
+        together with their choices in display order.
+
+        Questions without choices are paired with None.
+        """
+        for index in self.questions:
+            question = exam.questions[index]
+            choices = getattr(question, "choices", None)
+            if choices is not None and (order := self.choices[index]) is not None:
+                choices = [choices[i] for i in order]
+            yield question, choices
+
+    def to_original(self, question: int, positions: Iterable[int]) -> list[int]:
+        """
+        Map choice positions shown to the student to the indices of the
+        choices in the original question.
+        """
+        if (order := self.choices[question]) is None:
+            return list(positions)
+        return [order[pos] for pos in positions]
+
+    def to_display(self, question: int, indices: Iterable[int]) -> list[int]:
+        """
+        Map indices of choices in the original question to the positions shown
+        to the student.
+        """
+        if (order := self.choices[question]) is None:
+            return list(indices)
+        inverse = _inverse(order)
+        return [inverse[i] for i in indices]
+
+    def answer_key(self, exam: "Exam") -> list[Order | None]:
+        """
+        Positions of the correct choices of each question, as shown to the
+        student, in display order.
+
+        Questions without choices have no key and are represented by None.
+        """
+        key = []
+        for index in self.questions:
+            choices = getattr(exam.questions[index], "choices", None)
+            if choices is None:
+                key.append(None)
+                continue
+            correct = [i for i, choice in enumerate(choices) if _is_correct(choice)]
+            key.append(tuple(sorted(self.to_display(index, correct))))
+        return key
+
+
+def generate_variants(
+    exam: "Exam",
+    seeds: Iterable[Seed],
+    *,
+    shuffle_questions: bool = True,
+) -> list[Variant]:
+    """
+    Generate one variant of exam for each seed.
+
+    The same exam and seed always produce the same variant. Choices are only
+    shuffled in questions that allow it, either by their own ``shuffle``
+    field or by the exam default, and choices marked as fixed keep their
+    positions.
+    """
+    tables = [_question_table(question, exam.shuffle) for question in exam.questions]
+    size = len(exam.questions)
+    identity = tuple(range(size))
+
+    variants = []
+    for seed in seeds:
+        rng = random.Random(seed)
+        if shuffle_questions:
+            order = list(identity)
+            rng.shuffle(order)
+            questions = tuple(order)
+        else:
+            questions = identity
+        choices = tuple(
+            None if table is None else table.draw(rng) for table in tables
+        )
+        variants.append(Variant(seed, questions, choices))
+    return variants
+
+
+class PermutationTable:
+    """
+    All orders of a list of choices that keep fixed choices in place.
+
+    Orders are tabulated when there are at most MAX_TABLE_SIZE shuffled choices
+    and generated on demand otherwise.
+    """
+
+    __slots__ = ("size", "free", "orders")
+
+    def __init__(self, size: int, fixed: Sequence[int] = ()) -> None:
+        fixed = set(fixed)
+        self.size = size
+        self.free = tuple(i for i in range(size) if i not in fixed)
+        self.orders: tuple[Order, ...] | None = None
+        if len(self.free) <= MAX_TABLE_SIZE:
+            self.orders = tuple(map(self._order, itertools.permutations(self.free)))
+
+    def draw(self, rng: random.Random) -> Order:
+        """
+        Choose an order at random.
+        """
+        if self.orders is not None:
+            return self.orders[rng.randrange(len(self.orders))]
+        free = list(self.free)
+        rng.shuffle(free)
+        return self._order(free)
+
+    def _order(self, permutation: Sequence[int]) -> Order:
+        order = list(range(self.size))
+        for pos, index in zip(self.free, permutation):
+            order[pos] = index
+        return tuple(order)
+
+
+@functools.cache
+def permutation_table(size: int, fixed: tuple[int, ...] = ()) -> PermutationTable:
+    """
+    Shared permutation table for the given number of choices and fixed
+    positions.
+    """
+    return PermutationTable(size, fixed)
+
+
+def _question_table(question: "Question", default: bool) -> PermutationTable | None:
+    choices = getattr(question, "choices", None)
+    shuffle = default if question.shuffle is None else question.shuffle
+    if not shuffle or not choices or len(choices) < 2:
+        return None
+    fixed = tuple(i for i, choice in enumerate(choices) if choice.fixed)
+    if len(choices) - len(fixed) < 2:
+        return None
+    return permutation_table(len(choices), fixed)
+
+
+@functools.lru_cache(maxsize=4096)
+def _inverse(order: Order) -> Order:
+    inverse = [0] * len(order)
+    for pos, index in enumerate(order):
+        inverse[index] = pos
+    return tuple(inverse)
+
+
+def _is_correct(choice: "Choice") -> bool:
+    correct = choice.correct
+    return correct is True or (not isinstance(correct, bool) and (correct or 0) > 0)
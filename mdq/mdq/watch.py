@@ -0,0 +1,349 @@
+"""
+Watch a question bank and re-parse files as they change.
+
+The watcher keeps the parsed models of all sources in memory. When files are
+saved, events are collected until the tree is quiet for a short while, so a
+burst of saves (or an editor writing a file in several steps) triggers a
+single update, and only the touched files are parsed again.
+
+Changes are detected with inotify on Linux and by polling file metadata on
+other platforms.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Literal, Protocol
+
+from .compiler import find_sources
+from .errors import error_span
+from .utils import source_kind
+
+if TYPE_CHECKING:
+    from .models import Exam, Question
+
+type Backend = Literal["auto", "inotify", "poll"]
+
+#: Seconds without events that close a burst of changes.
+DEBOUNCE = 0.05
+
+#: Seconds between scans of the polling backend.
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Diagnostic:
+    """
+    Error found while parsing a source file.
+
+    ``span`` is the range of source lines related to the error as a
+    (start, end) pair of 0-based line numbers, with the end excluded, or None
+    if the location is not known.
+    """
+
+    path: str
+    message: str
+    error: str
+    span: tuple[int, int] | None = None
+    severity: Literal["error", "warning"] = "error"
+
+    @classmethod
+    def from_exception(cls, path: Path, ex: Exception) -> "Diagnostic":
+        span = error_span(ex)
+        return cls(
+            path=str(path),
+            message=str(ex),
+            error=type(ex).__name__,
+            span=None if span is None else tuple(span),
+        )
+
+
+@dataclass
+class Update:
+    """
+    Result of processing a burst of changes.
+    """
+
+    parsed: list[Path] = field(default_factory=list)
+    removed: list[Path] = field(default_factory=list)
+    diagnostics: list[Diagnostic] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def __bool__(self) -> bool:
+        return bool(self.parsed or self.removed)
+
+    def to_json(self) -> str:
+        """
+        Machine-readable representation as a single line of JSON.
+        """
+        return json.dumps(
+            {
+                "parsed": list(map(str, self.parsed)),
+                "removed": list(map(str, self.removed)),
+                "diagnostics": [asdict(d) for d in self.diagnostics],
+                "elapsed_ms": round(self.elapsed * 1000, 3),
+            }
+        )
+
+
+class Watcher:
+    """
+    Keep the parsed models of a directory tree up to date.
+
+    Call scan() to parse all sources, and then iterate over updates() to
+    process changes as they happen. Models of valid sources are available in
+    ``models``, and diagnostics of invalid ones in ``diagnostics``. A source
+    that fails to parse keeps no model until it is fixed.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        debounce: float = DEBOUNCE,
+        backend: Backend = "auto",
+    ) -> None:
+        self.path = Path(path)
+        self.debounce = debounce
+        self.models: dict[Path, "Question | Exam"] = {}
+        self.diagnostics: dict[Path, Diagnostic] = {}
+        self._backend_name = backend
+        self._backend: "ChangeBackend | None" = None
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def scan(self) -> Update:
+        """
+        Parse all sources under path.
+
+        Changes start being tracked before sources are read, so no save is
+        lost between the scan and the first update.
+        """
+        if self._backend is None:
+            self._backend = open_backend(self.path, self._backend_name)
+        return self.refresh(find_sources(self.path))
+
+    def refresh(self, paths) -> Update:
+        """
+        Re-parse the given sources, or forget them if they no longer exist.
+        """
+        start = time.perf_counter()
+        update = Update()
+        for path in sorted(set(map(Path, paths))):
+            if not source_kind(path.name):
+                continue
+            if not path.is_file():
+                known = path in self.models or path in self.diagnostics
+                self.models.pop(path, None)
+                self.diagnostics.pop(path, None)
+                if known:
+                    update.removed.append(path)
+                continue
+            update.parsed.append(path)
+            if diagnostic := self.parse(path):
+                update.diagnostics.append(diagnostic)
+        update.elapsed = time.perf_counter() - start
+        return update
+
+    def parse(self, path: Path) -> Diagnostic | None:
+        """
+        Parse a single source and store its model or diagnostic.
+        """
+        from .parser import parse_exam, parse_question
+
+        parse = parse_exam if source_kind(path.name) == "exam" else parse_question
+        try:
+            self.models[path] = parse(path)
+        except Exception as ex:
+            self.models.pop(path, None)
+            diagnostic = self.diagnostics[path] = Diagnostic.from_exception(path, ex)
+            return diagnostic
+        self.diagnostics.pop(path, None)
+        return None
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """
+        Wait for a burst of changes and return the paths that were touched.
+
+        Return an empty set if nothing changes within timeout seconds.
+        """
+        if self._backend is None:
+            raise RuntimeError("call scan() before waiting for changes")
+        changed = self._backend.read(timeout)
+        while changed and (more := self._backend.read(self.debounce)):
+            changed |= more
+        return changed
+
+    def updates(self, timeout: float | None = None) -> Iterator[Update]:
+        """
+        Yield an update for each burst of changes to the sources.
+
+        Stop if nothing changes within timeout seconds, or run forever if no
+        timeout is given.
+        """
+        while changed := self.wait(timeout):
+            if update := self.refresh(changed):
+                yield update
+
+    def close(self) -> None:
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+
+def open_backend(path: Path, backend: Backend = "auto") -> "ChangeBackend":
+    """
+    Start tracking changes under path.
+    """
+    if backend == "poll" or (backend == "auto" and not sys.platform.startswith("linux")):
+        return PollingBackend(path)
+    try:
+        return InotifyBackend(path)
+    except OSError:
+        if backend == "inotify":
+            raise
+        return PollingBackend(path)
+
+
+class ChangeBackend(Protocol):
+    def read(self, timeout: float | None) -> set[Path]:
+        """
+        Wait up to timeout seconds and return the paths that changed.
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+class PollingBackend:
+    """
+    Detect changes by comparing the modification time and size of sources.
+
+    Scanning a large tree takes a few milliseconds, which is acceptable for
+    editing, but the inotify backend is preferred where it is available.
+    """
+
+    def __init__(self, path: Path, interval: float = POLL_INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self._state = self._snapshot()
+
+    def read(self, timeout: float | None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._snapshot()
+            changed = {
+                path
+                for path in state.keys() | self._state.keys()
+                if state.get(path) != self._state.get(path)
+            }
+            self._state = state
+            if changed:
+                return changed
+            if deadline is not None and (left := deadline - time.monotonic()) <= 0:
+                return changed
+            time.sleep(self.interval if deadline is None else min(self.interval, left))
+
+    def close(self) -> None:
+        pass
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        state = {}
+        for path in find_sources(self.path):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+
+# Constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """
+    Detect changes with the Linux inotify API.
+
+    Every directory of the tree is watched, including directories created
+    after the watcher starts.
+    """
+
+    def __init__(self, path: Path) -> None:
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, Path] = {}
+        self.path = path
+        if path.is_file():
+            self._watch(path.parent)
+        else:
+            self._watch_tree(path)
+
+    def read(self, timeout: float | None) -> set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        data = os.read(self._fd, 64 * 1024)
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, size = INOTIFY_EVENT.unpack_from(data, pos)
+            pos += INOTIFY_EVENT.size
+            name = data[pos : pos + size].rstrip(b"\0").decode(errors="surrogateescape")
+            pos += size
+            if (parent := self._dirs.get(wd)) is None or not name:
+                continue
+            path = parent / name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith("."):
+                    self._watch_tree(path)
+                    changed.update(find_sources(path))
+            elif source_kind(name):
+                changed.add(path)
+        if self.path.is_file():
+            changed &= {self.path}
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _watch_tree(self, path: Path) -> None:
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            self._watch(Path(root))
+
+    def _watch(self, path: Path) -> None:
+        wd = self._add_watch(self._fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+        self._dirs[wd] = path
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from mdq.bank import Bank, BankWriter
+from mdq.models import Essay
+
+
+def question_json(id):
+    return Essay(id=id, title=id.title(), stem="Why?").model_dump_json(by_alias=True)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_bank_roundtrip(tmp_path, compress):
+    path = tmp_path / "bank.mdqb"
+    with BankWriter(path, compress=compress) as writer:
+        for id in ["c", "a", "b"]:
+            writer.add(f"week1/{id}", question_json(id))
+
+    with Bank(path) as bank:
+        assert len(bank) == 3
+        assert list(bank) == ["week1/a", "week1/b", "week1/c"]
+        assert bank["week1/b"].id == "b"
+        assert "week1/d" not in bank
+        assert bank.get("week1/d") is None
+        with pytest.raises(KeyError):
+            bank["missing"]
+
+
+def test_bank_sample(tmp_path):
+    path = tmp_path / "bank.mdqb"
+    with BankWriter(path) as writer:
+        for i in range(20):
+            writer.add(f"q{i}", question_json(f"q{i}"))
+
+    with Bank(path) as bank:
+        sample = bank.sample(5, random.Random(0))
+        assert len({q.id for q in sample}) == 5
+
+
+def test_bank_rejects_duplicate_keys(tmp_path):
+    path = tmp_path / "bank.mdqb"
+    with BankWriter(path) as writer:
+        writer.add("q", question_json("q"))
+        with pytest.raises(ValueError):
+            writer.add("q", question_json("q"))
+        writer.add("r", question_json("r"))
+
+    with Bank(path) as bank:
+        assert list(bank) == ["q", "r"]
+
+
+def test_bank_rejects_other_files(tmp_path):
+    path = tmp_path / "bank.mdqb"
+    path.write_bytes(b"not a bank, just some bytes with enough length")
+    with pytest.raises(ValueError):
+        Bank(path)
@@ -0,0 +1,74 @@
+from mdq.cache import ParseCache
+from mdq.models import MultipleChoice
+from mdq.parser import parse_question
+
+
+def make_question(id="q1", text="42"):
+    return MultipleChoice(
+        id=id,
+        stem="What is the answer?",
+        choices=[{"text": "0"}, {"text": text, "correct": True}],
+    )
+
+
+def test_cache_roundtrip():
+    cache = ParseCache(":memory:")
+    key = cache.key("question", "source", None, None, "q1", None)
+    assert cache.get(key) is None
+
+    cache.put(key, make_question())
+    assert cache.get(key) == make_question()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_key_depends_on_options():
+    assert ParseCache.key("question", "src", "a") != ParseCache.key("question", "src", "b")
+    assert ParseCache.key("question", "src", None) != ParseCache.key("question", "src", "")
+    assert ParseCache.key("question", "src") != ParseCache.key("exam", "src")
+
+
+def test_parse_question_uses_cache():
+    cache = ParseCache(":memory:")
+    src = "not even a valid question"
+    cache.put(cache.key("question", src, None, None, None, None), make_question())
+    assert parse_question(src, cache=cache) == make_question()
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ParseCache(":memory:")
+    for i in range(3):
+        cache.put(f"key-{i}", make_question(f"q{i}"))
+    cache.get("key-0")
+
+    cache.max_size = cache.size * 2 // 3
+    cache.evict()
+    assert "key-0" in cache
+    assert "key-1" not in cache
+    assert len(cache) == 2
+
+
+def test_cache_tracks_size_on_put():
+    cache = ParseCache(":memory:")
+    cache.put("key", make_question())
+    cache.put("key", make_question(text="a much longer answer"))
+    cache.put("other", make_question("q2"))
+    assert cache._size == cache.size
+
+    cache.clear()
+    assert cache._size == cache.size == 0
+
+
+def test_cache_evicts_on_put():
+    cache = ParseCache(":memory:")
+    cache.put("key-0", make_question("q0"))
+    cache.max_size = cache.size * 2
+    for i in range(1, 4):
+        cache.put(f"key-{i}", make_question(f"q{i}"))
+    assert len(cache) == 2
+    assert cache.size <= cache.max_size
+
+
+def test_cache_key_depends_on_parser_version(monkeypatch):
+    key = ParseCache.key("question", "src")
+    monkeypatch.setattr("mdq.cache.PARSER_VERSION", -1)
+    assert ParseCache.key("question", "src") != key
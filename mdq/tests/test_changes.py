@@ -0,0 +1,82 @@
+import pytest
+
+import mdq
+from mdq.changes import ANSWER_KEY, CHOICES, GRADING, ORDER, TEXT, TYPE, diff_questions
+from mdq.models import Essay, Exam, MultipleChoice
+
+
+def make_question(id="q1", choices=("a", "b", "c"), correct="a", **kwargs):
+    kwargs.setdefault("stem", "Pick one")
+    return MultipleChoice(
+        id=id,
+        title="Question",
+        choices=[{"text": text, "correct": text == correct} for text in choices],
+        **kwargs,
+    )
+
+
+def make_exam(*questions, **kwargs):
+    return Exam(id="exam", title="Exam", questions=list(questions), **kwargs)
+
+
+def test_identical_exams_have_no_changes():
+    exam = make_exam(make_question("q1"), make_question("q2"))
+    assert not mdq.diff(exam, exam.model_copy(deep=True))
+
+
+def test_added_removed_and_reordered_questions():
+    old = make_exam(make_question("q1"), make_question("q2"), make_question("q3"))
+    new = make_exam(make_question("q3"), make_question("q1"), make_question("q4"))
+    result = mdq.diff(old, new)
+    assert result.added == ("q4",)
+    assert result.removed == ("q2",)
+    assert result.changed == ()
+    assert result.reordered
+
+
+def test_stem_edit_does_not_require_regrade():
+    [change] = mdq.diff(
+        make_exam(make_question()), make_exam(make_question(stem="Pick the best"))
+    ).changed
+    assert change.changes == {TEXT}
+    assert change.fields == ("stem",)
+    assert not change.regrade
+
+
+def test_reordered_choices_are_remapped():
+    change = diff_questions(make_question(), make_question(choices=("c", "a", "b")))
+    assert change.changes == {ORDER}
+    assert change.choice_map == (1, 2, 0)
+    assert not change.regrade
+
+
+def test_answer_key_changes():
+    change = diff_questions(make_question(), make_question(correct="b"))
+    assert change.changes == {ANSWER_KEY}
+    assert change.regrade
+
+    change = diff_questions(make_question(), make_question(choices=("b", "a", "c"), correct="b"))
+    assert change.changes == {ORDER, ANSWER_KEY}
+
+
+def test_added_choices_and_grading_changes():
+    change = diff_questions(make_question(), make_question(choices=("a", "b", "c", "d")))
+    assert change.changes == {CHOICES}
+    assert change.choice_map == (0, 1, 2)
+
+    change = diff_questions(make_question(), make_question(penalty=25))
+    assert change.changes == {GRADING}
+    assert change.regrade
+
+
+def test_type_change():
+    change = diff_questions(make_question(), Essay(id="q1", title="Question", stem="Pick one"))
+    assert change.changes == {TYPE}
+
+
+def test_header_changes_and_repeated_ids():
+    old = make_exam(make_question(), tags={"a", "b"})
+    assert mdq.diff(old, make_exam(make_question(), tags={"b", "a"})).header == ()
+    assert mdq.diff(old, make_exam(make_question(), tags={"c"})).header == ("tags",)
+    with pytest.raises(ValueError):
+        mdq.diff(make_exam(make_question(), make_question()), old)
@@ -0,0 +1,63 @@
+import pytest
+
+from mdq.checks import Checker, analyze, check
+from mdq.models import UnitTest
+
+SOURCE = """
+import numpy as np
+from os import system as run
+import importlib
+
+subprocess = importlib.import_module("subprocess")
+values = [i for i in range(10) if i % 2]
+run("ls")
+print(np.linalg.norm(values), {1: 2})
+"""
+
+
+def test_analysis_resolves_imports():
+    analysis = analyze(SOURCE)
+    assert {"os.system", "numpy.linalg.norm", "print"} <= analysis.names
+    assert {"numpy", "numpy.linalg", "os", "subprocess"} <= analysis.modules
+    assert analysis.syntax["for"] == 1 and analysis.syntax["if"] == 1
+    assert analysis.syntax["import"] == 3
+    assert analysis.literals == {"list", "dict"}
+    assert analyze(SOURCE) is analysis
+
+
+def test_checker_reports_violations():
+    checker = Checker(
+        functions=["os.system", "builtins.eval"],
+        modules=["subprocess", "numpy.linalg"],
+        types=["dict"],
+        syntax={"for": 0, "if": 1},
+    )
+    violations = {(v.rule, v.name) for v in checker.check(SOURCE)}
+    assert violations == {
+        ("function", "os.system"),
+        ("module", "subprocess"),
+        ("module", "numpy.linalg"),
+        ("type", "dict"),
+        ("syntax", "for"),
+    }
+    assert [v.name for v in checker.check("import builtins\nbuiltins.eval('1')")] == ["eval"]
+    assert [v.rule for v in checker.check("def (")] == ["error"]
+    assert Checker().check("def (") == []
+
+
+def test_check_question_rules():
+    question = UnitTest(
+        id="q",
+        title="Q",
+        stem="?",
+        **{
+            "supported-languages": ["python"],
+            "answer-key": ["assert f() == 1"],
+            "forbidden-functions": {"python": ["sorted"]},
+            "forbidden-syntax": {"while": 0},
+        },
+    )
+    assert check(question, "def f(): return sorted([1])[0]")[0].name == "sorted"
+    assert check(question, "def f(): return 1") == []
+    with pytest.raises(ValueError):
+        check(question, "", language="javascript")
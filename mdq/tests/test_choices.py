@@ -0,0 +1,68 @@
+from itertools import islice
+
+import pytest
+
+from mdq import iter_exam, parse_exam, parse_question
+from mdq.errors import DuplicateQuestion, IncompleteQuestion
+from mdq.models import MultipleChoice, MultipleSelection, TrueFalse
+
+
+def test_parse_multiple_choice_example(mdq):
+    question = parse_question(mdq("multiple-choice-1"))
+    assert isinstance(question, MultipleChoice)
+    assert question.id == "multiple-choice-1"
+    assert question.stem == "What is the correct answer?"
+    assert [c.text for c in question.choices] == [
+        "0", "1", "[Google](https://www.google.com)", "42",
+    ]
+    assert [c.correct for c in question.choices] == [False, False, False, True]
+
+
+def test_parse_choice_exam(mdq):
+    exam = parse_exam(mdq("exam-b", exam=True))
+    capitals, primes, statements, sums = exam.questions
+
+    assert isinstance(capitals, MultipleChoice)
+    assert capitals.id == "capitals"
+    assert capitals.title == "Capitals"
+    assert [c.correct for c in capitals.choices] == [False, True, 20.0, False]
+    assert capitals.choices[2].feedback == "Close, but not the capital."
+
+    assert isinstance(primes, MultipleSelection)
+    assert [c.correct for c in primes.choices] == [True, True, False, True]
+
+    assert isinstance(statements, TrueFalse)
+    assert statements.id == "q3"
+    assert [c.correct for c in statements.choices] == [True, False, True]
+
+    assert sums.id == "q4"
+    assert [q.id for q in exam.questions] == [q.id for q in list(iter_exam(mdq("exam-b", exam=True)))[1:]]
+
+
+def test_question_ids_follow_position():
+    src = "# E\n\n---\n\n## A\n\nPick.\n\n* [x] a\n* b\n\n## B\n\nPick.\n\n* a\n* [x] b\n"
+    exam = parse_exam(src)
+    assert [q.id for q in exam.questions] == ["q1", "q2"]
+    assert [q.title for q in exam.questions] == ["A", "B"]
+
+
+def test_repeated_question_ids_are_rejected():
+    src = "# E\n\n---\n\n## [a] A\n\nPick.\n\n* [x] a\n* b\n\n## [a] B\n\nPick.\n\n* a\n* [x] b\n"
+    with pytest.raises(DuplicateQuestion):
+        parse_exam(src)
+    with pytest.raises(DuplicateQuestion):
+        list(iter_exam(src))
+
+
+def test_epilogue_after_choices():
+    question = parse_question("## [q] Q\n\nPick.\n\n* [x] a\n* [ ] b\n\nAfter the list.\n")
+    assert question.type == "multiple-selection"
+    assert question.epilogue == "After the list."
+
+
+def test_unsupported_questions_fail_loudly(mdq):
+    # Associative and short answer questions (q5 and q6) are not parsed yet.
+    questions = iter_exam(mdq("exam-a", exam=True))
+    assert [q.id for q in islice(questions, 5)] == ["exam-a", "q1", "q2", "q3", "q4"]
+    with pytest.raises(IncompleteQuestion):
+        next(questions)
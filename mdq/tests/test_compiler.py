@@ -0,0 +1,206 @@
+import hashlib
+import json
+from pathlib import Path
+
+from mdq import compiler
+from mdq.bank import Bank
+from mdq.compiler import CompileResult, compile_tree, find_sources
+from mdq.loader import load_json
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def fake_compile_file(path, cache=None, incremental=False):
+    if "broken" in path.name:
+        return CompileResult(path, "question", error="ParseError: broken")
+    return CompileResult(path, "question", data=json.dumps({"id": path.name}))
+
+
+def test_find_sources_skips_non_mdq_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.q.md").write_text("")
+    (tmp_path / "sub" / "b.e.md").write_text("")
+    (tmp_path / "README.md").write_text("")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "c.q.md").write_text("")
+
+    assert find_sources(tmp_path) == [tmp_path / "a.q.md", tmp_path / "sub" / "b.e.md"]
+
+
+def test_compile_tree_reports_errors_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler, "compile_file", fake_compile_file)
+    for name in ["a.q.md", "broken.q.md", "c.q.md"]:
+        (tmp_path / name).write_text("")
+
+    output = tmp_path / "out" / "bank.jsonl"
+    results = list(compile_tree(tmp_path, workers=1, output=output))
+
+    assert [r.ok for r in results] == [True, False, True]
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [line["path"] for line in lines] == ["a.q.md", "c.q.md"]
+    assert lines[0]["data"] == {"id": "a.q.md"}
+
+
+def test_compile_tree_writes_output_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler, "compile_file", fake_compile_file)
+    (tmp_path / "src" / "week1").mkdir(parents=True)
+    (tmp_path / "src" / "week1" / "intro.q.md").write_text("")
+
+    list(compile_tree(tmp_path / "src", workers=1, output=tmp_path / "out"))
+
+    assert (tmp_path / "out" / "week1" / "intro.json").exists()
+
+
+def test_compile_tree_incremental(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler, "compile_file", fake_compile_file)
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    for name in ["a.q.md", "b.q.md"]:
+        (src / name).write_text(name)
+
+    def build():
+        results = compile_tree(
+            src, workers=1, output=out, manifest=out / "manifest.json", cache=tmp_path / "cache"
+        )
+        return [r.path.name for r in results]
+
+    assert build() == ["a.q.md", "b.q.md"]
+    assert build() == []
+
+    (src / "b.q.md").write_text("changed")
+    (src / "a.q.md").unlink()
+    assert build() == ["b.q.md"]
+    assert not (out / "a.json").exists()
+
+
+def test_compile_tree_incremental_without_cache(tmp_path, monkeypatch):
+    caches = []
+
+    def compile_file(path, cache=None, incremental=False):
+        caches.append(cache)
+        return fake_compile_file(path, cache, incremental)
+
+    monkeypatch.setattr(compiler, "compile_file", compile_file)
+    monkeypatch.setattr("mdq.cache.default_cache_path", lambda: tmp_path / "default")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.q.md").write_text("a")
+
+    out = tmp_path / "out"
+    list(compile_tree(tmp_path / "src", workers=1, output=out, manifest=out / "manifest.json"))
+
+    assert caches == [None]
+    assert not (tmp_path / "default").exists()
+
+
+def test_compile_tree_writes_bank(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler, "compile_file", fake_compile_file)
+    (tmp_path / "src" / "week1").mkdir(parents=True)
+    (tmp_path / "src" / "week1" / "intro.q.md").write_text("")
+    (tmp_path / "src" / "broken.q.md").write_text("")
+
+    output = tmp_path / "bank.mdqb"
+    list(compile_tree(tmp_path / "src", workers=1, output=output))
+
+    with Bank(output) as bank:
+        assert list(bank) == ["week1/intro"]
+        assert json.loads(bank.data_at(0)) == {"id": "intro.q.md"}
+
+
+def test_bank_entries_split_exams(tmp_path):
+    data = json.dumps({"id": "exam", "questions": [{"id": "q1"}, {"id": "q2"}]})
+    result = CompileResult(tmp_path / "week1" / "exam.e.md", "exam", data=data)
+    entries = list(compiler.bank_entries(result, tmp_path))
+    assert [key for key, _ in entries] == ["week1/exam/q1", "week1/exam/q2"]
+
+
+def test_compile_tree_bank_roundtrip(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "exam.e.md").write_text((REPO_DIR / "examples" / "exam-b.md").read_text())
+    (src / "pick.q.md").write_text("Pick one.\n\n* [x] a\n* b\n")
+
+    output = tmp_path / "bank.mdqb"
+    results = list(compile_tree(src, workers=1, output=output))
+    assert [r.error for r in results] == [None, None]
+
+    with Bank(output) as bank:
+        assert list(bank) == [
+            "exam/capitals", "exam/primes", "exam/q3", "exam/q4", "pick",
+        ]
+        assert bank["exam/capitals"].choices[1].text == "Paris"
+        assert bank["pick"].title == ""
+        assert [c.correct for c in bank["pick"].choices] == [True, False]
+
+
+def test_compile_tree_bank_reports_duplicate_keys(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "pick.mdq").write_text("Pick one.\n\n* [x] a\n* b\n")
+    (src / "pick.q.md").write_text("Pick another.\n\n* a\n* [x] b\n")
+
+    output = tmp_path / "bank.mdqb"
+    results = list(compile_tree(src, workers=1, output=output))
+    assert results[0].ok
+    assert "duplicate key in bank: pick" in results[1].error
+
+    with Bank(output) as bank:
+        assert bank["pick"].stem == "Pick one."
+
+
+def example_tree(path):
+    (path / "week1").mkdir(parents=True)
+    for name, dest in [("exam-b.md", "week1/midterm.e.md"), ("multiple-choice-1.q.md", "mc.q.md")]:
+        (path / dest).write_text((REPO_DIR / "examples" / name).read_text())
+    return path
+
+
+def test_compile_examples_to_jsonl(tmp_path):
+    src = example_tree(tmp_path / "src")
+    output = tmp_path / "bank.jsonl"
+    results = list(compile_tree(src, workers=2, output=output))
+    assert [r.error for r in results] == [None, None]
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(line["path"], line["kind"]) for line in lines] == [
+        ("mc.q.md", "question"), ("week1/midterm.e.md", "exam"),
+    ]
+    assert lines[0]["data"]["type"] == "multiple-choice"
+    assert [q["id"] for q in lines[1]["data"]["questions"]] == ["capitals", "primes", "q3", "q4"]
+
+
+def test_compile_examples_to_directory(tmp_path):
+    src = example_tree(tmp_path / "src")
+    output = tmp_path / "out"
+    assert all(r.ok for r in compile_tree(src, workers=1, output=output))
+
+    exam = load_json((output / "week1" / "midterm.json").read_text(), kind="exam")
+    assert [q.type for q in exam.questions] == [
+        "multiple-choice", "multiple-selection", "true-false", "fill-in",
+    ]
+    question = load_json((output / "mc.json").read_text())
+    assert question.id == "mc"
+
+
+def test_compile_examples_to_bank(tmp_path):
+    src = example_tree(tmp_path / "src")
+    output = tmp_path / "bank.mdqb"
+    assert all(r.ok for r in compile_tree(src, workers=2, output=output))
+
+    with Bank(output) as bank:
+        assert len(bank) == 5
+        assert bank["mc"].choices[3].correct is True
+        assert bank["week1/midterm/q4"].type == "fill-in"
+
+
+def test_compile_file_records_parsed_source(tmp_path):
+    path = tmp_path / "pick.q.md"
+    path.write_text("Pick one.\n\n* [x] a\n* b\n")
+    result = compiler.compile_file(path, cache=tmp_path / "cache", incremental=True)
+    assert result.ok
+
+    # The hash comes from the bytes that were parsed, even if the file
+    # changes before the manifest is updated.
+    path.write_text("Pick another.\n\n* [x] a\n* b\n")
+    expected = hashlib.blake2b(b"Pick one.\n\n* [x] a\n* b\n", digest_size=20)
+    assert result.source.hash == expected.hexdigest()
+    assert json.loads(result.data)["id"] == "pick"
@@ -0,0 +1,74 @@
+import sys
+
+import pytest
+
+from mdq.executor import Executor, Job, Limits, TestCase, code_io_job, run_jobs
+from mdq.models import CodeIo
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="requires fork()")
+
+
+def run(source, *cases, **kwargs):
+    job = Job("job", source, tuple(cases) or (TestCase(),), timeout=kwargs.pop("timeout", None))
+    return run_jobs([job], workers=1, **kwargs)
+
+
+def test_programs_receive_input_and_stream_results():
+    jobs = [
+        Job(f"job-{i}", "print(input().upper())", (TestCase("a"), TestCase("b")))
+        for i in range(10)
+    ]
+    with Executor(workers=2, batch_size=3) as executor:
+        results = list(executor.run(jobs))
+        assert len(list(executor.run(jobs[:1]))) == 2
+    assert len(results) == 20
+    assert {r.stdout for r in results} == {"A\n", "B\n"}
+    assert all(r.ok for r in results)
+
+
+def test_errors_and_exit_codes():
+    [syntax] = run("def (")
+    assert syntax.status == "error" and "SyntaxError" in syntax.stderr
+    [exit] = run("raise SystemExit(3)")
+    assert exit.status == "error" and exit.returncode == 3
+    [error] = run("1 / 0")
+    assert "ZeroDivisionError" in error.stderr
+
+
+def test_limits():
+    [loop] = run("while True: pass", timeout=0.2)
+    assert loop.status == "timeout"
+    [spam] = run("while True: print('x' * 100)", limits=Limits(output=1000))
+    assert spam.status == "output-limit"
+    [memory] = run("x = bytearray(2**30)", limits=Limits(memory=256 * 2**20))
+    assert "MemoryError" in memory.stderr
+
+
+def test_sandbox_blocks_network_and_processes():
+    [net] = run("import socket; socket.create_connection(('1.1.1.1', 80), timeout=1)")
+    assert net.status == "error"
+    [spawn] = run("import os; os.system('echo hi')")
+    assert "PermissionError" in spawn.stderr
+
+
+def test_unit_tests_and_code_io_jobs():
+    ok, fail = run(
+        "def add(a, b): return a + b",
+        TestCase(test="assert add(1, 2) == 3"),
+        TestCase(test="assert add(1, 2) == 4"),
+    )
+    assert ok.ok and not fail.ok
+
+    question = CodeIo(
+        id="q",
+        title="Q",
+        stem="?",
+        timeout=2,
+        **{
+            "supported-languages": ["python"],
+            "answer-key": [{"input": "1", "output": "2"}, {"inputs": ["2", "3"]}],
+        },
+    )
+    job = code_io_job(question, "print(int(input()) * 2)", id="q")
+    assert job.timeout == 2
+    assert [r.stdout for r in run_jobs([job], workers=1)] == ["2\n", "4\n", "6\n"]
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from mdq import parse_exam, parse_question
+from mdq.errors import InvalidBlank
+from mdq.fillin import FillInMatcher, compile_matcher, parse_fill_in, parse_tolerance
+from mdq.models import FillIn
+
+SOURCE = """\
+## Sums
+
+2 + 2 = [^sum], which is an [^parity] number. Light travels [^speed] in [^period].
+
+[^sum]: = 4
+[^parity]:
+  * odd
+  * even ✅
+[^speed]: /^(300|3\\s*x\\s*10\\^5)\\s*km\\/s$/
+[^period]: a second | one second | 1 s
+"""
+
+
+def make_question():
+    return FillIn(id="q", title="Q", stem="?", body=parse_fill_in(SOURCE.split("\n", 2)[2]))
+
+
+def test_parse_blanks():
+    body = parse_fill_in(SOURCE.split("\n", 2)[2])
+    assert [part.type for part in body] == [
+        "static", "numeric", "static", "selection", "static", "text", "static", "text", "static",
+    ]
+    assert body[0].text == "2 + 2 = "
+    assert body[1].answer_key == 4
+    assert [c.correct for c in body[3].choices] == [None, True]
+    assert body[5].answer_key.startswith("/^(300")
+    assert body[7].answer_key == ["a second", "one second", "1 s"]
+
+
+def test_parse_numeric_blanks():
+    (_, blank) = parse_fill_in("x = [^x]\n\n[^x]: = 9,8 ± 0.5 m/s²")
+    assert (blank.answer_key, blank.tolerance, blank.unit) == (9.8, 0.5, "m/s²")
+    (_, blank) = parse_fill_in("x = [^x]\n\n[^x]: = 200 ±5%")
+    assert blank.tolerance == "±5%"
+    assert parse_tolerance(blank.tolerance, blank.answer_key) == 10
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "a [^x]",
+        "a [^x] [^x]\n\n[^x]: a",
+        "a [^x]\n\n[^x]: a\n[^y]: b",
+        "a [^x]\n\n[^x]: a\n[^x]: b",
+        "a [^x]\n\n[^x]:\n  * a\n  * b",
+        "a [^x]\n\n[^x]: = ten",
+    ],
+)
+def test_invalid_blanks(src):
+    with pytest.raises(InvalidBlank):
+        parse_fill_in(src)
+
+
+def test_parser_infers_fill_in_questions():
+    question = parse_question(SOURCE, id="sums")
+    assert isinstance(question, FillIn)
+    assert (question.id, question.title) == ("sums", "Sums")
+    assert question.stem.startswith("2 + 2 = [^sum]")
+    assert question.body == make_question().body
+
+
+def test_blank_definitions_do_not_start_a_question():
+    # Footnote definitions are moved to the end of the exam token stream.
+    exam = parse_exam("# Exam\n\n---\n\n" + SOURCE)
+    assert [type(q) for q in exam.questions] == [FillIn]
+    assert exam.questions[0].body == make_question().body
+
+
+def test_match_single_response():
+    matcher = FillInMatcher.from_question(make_question())
+    assert matcher.match(["4.0", "1", "300 km/s", "  One   SECOND "]) == [True] * 4
+    assert matcher.match(["5", "0", "299 km/s", "a minute"]) == [False] * 4
+    assert matcher.match(["4"]) == [True, False, False, False]
+
+
+def test_match_batch():
+    matcher = compile_matcher(make_question())
+    assert compile_matcher(make_question()) is matcher
+
+    responses = [
+        ["4", 1, "3 x 10^5 km/s", "1 s"],
+        ["4,0", "1", "300 m/s", "one second"],
+        ["four", None, "", "1 S"],
+        [],
+    ]
+    matches = matcher.match_batch(responses)
+    assert matches.tolist() == [
+        [True, True, True, True],
+        [True, True, False, True],
+        [False, False, False, True],
+        [False, False, False, False],
+    ]
+    assert np.allclose(matcher.score_batch(responses), [100, 75, 25, 0])
+
+
+def test_numeric_tolerance_and_units():
+    question = FillIn(
+        id="q",
+        title="Q",
+        stem="?",
+        body=[{"type": "numeric", "answer-key": 0.3, "tolerance": "±10%", "unit": "m"}],
+    )
+    matcher = compile_matcher(question)
+    answers = [["0.1 + 0.2"], [str(0.1 + 0.2)], ["0,33 m"], ["0.34"], ["-0.3"]]
+    assert matcher.match_batch(answers)[:, 0].tolist() == [False, True, True, False, False]
+
+
+def test_manual_blanks_are_not_scored():
+    question = FillIn(
+        id="q",
+        title="Q",
+        stem="?",
+        body=[{"type": "text"}, {"type": "text", "answer-key": "Yes", "case-sensitive": True}],
+    )
+    matcher = compile_matcher(question)
+    assert matcher.manual
+    assert matcher.score_batch([["anything", "Yes"], ["", "yes"]]).tolist() == [100, 0]
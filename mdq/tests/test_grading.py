@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from mdq.grading import encode_responses, grade, grade_batch
+from mdq.models import MultipleChoice, MultipleSelection, TrueFalse
+from mdq.models.response import MultipleChoiceResponse, TrueFalseResponse
+
+
+def choices(*values):
+    return [{"text": f"choice {i}", "correct": v} for i, v in enumerate(values)]
+
+
+def selections(*ids):
+    return [MultipleChoiceResponse(question_id="q", selected_choice_ids=list(s)) for s in ids]
+
+
+def test_multiple_choice():
+    question = MultipleChoice(
+        id="q", stem="?", choices=choices(False, True, 50.0), penalty=25
+    )
+    grades = grade_batch(question, selections([1], [0], [2], [], [0, 1]))
+    assert grades.scores.tolist() == [100, -25, 50, 0, 0]
+    assert grades.penalties.tolist() == [0, 25, 0, 0, 0]
+    assert grades.selected.tolist() == [2, 2, 1]
+    assert grades.correct.tolist() == [0, 1, 1]
+
+
+def test_multiple_choice_clips_to_grading_interval():
+    question = MultipleChoice(
+        id="q",
+        stem="?",
+        choices=choices(False, True),
+        penalty=25,
+        grading={"min_value": 0},
+    )
+    assert grade(question, selections([0])[0]) == 0
+
+
+def test_multiple_selection():
+    question = MultipleSelection(id="q", stem="?", choices=choices(True, False, True, False))
+    grades = grade_batch(question, selections([0, 2], [0], [1, 3]))
+    assert grades.scores.tolist() == [100, 75, 0]
+    assert grades.correct.tolist() == [2, 2, 1, 2]
+
+
+def test_true_false():
+    question = TrueFalse(
+        id="q",
+        stem="?",
+        choices=choices(True, False),
+        grading={"correct_grade": 100, "penalty_for_incorrect": 50},
+    )
+    responses = [
+        TrueFalseResponse(question_id="q", answer={0: True, 1: False}),
+        TrueFalseResponse(question_id="q", answer={0: False}),
+        TrueFalseResponse(question_id="q", answer={}),
+    ]
+    grades = grade_batch(question, responses)
+    assert grades.scores.tolist() == [100, -25, 0]
+    assert grades.answered.tolist() == [2, 1]
+    assert grades.selected.tolist() == [1, 0]
+
+
+def test_invalid_choice():
+    question = MultipleChoice(id="q", stem="?", choices=choices(False, True))
+    with pytest.raises(ValueError):
+        grade_batch(question, selections([1], [5]))
+
+
+def test_empty_batch():
+    question = MultipleChoice(id="q", stem="?", choices=choices(False, True))
+    grades = grade_batch(question, [])
+    assert len(grades) == 0
+    assert np.array_equal(grades.selected, [0, 0])
+
+
+def test_regrade_encoded_responses():
+    question = MultipleChoice(id="q", stem="?", choices=choices(False, True))
+    encoded = encode_responses(question, selections([0], [1], [1]))
+    assert grade_batch(question, encoded).scores.tolist() == [0, 100, 100]
+
+    question.choices[0].correct = True
+    question.choices[1].correct = False
+    assert grade_batch(question, encoded).scores.tolist() == [100, 0, 0]
@@ -0,0 +1,42 @@
+from mdq.hashing import CACHE_KEY, digest
+from mdq.models import Exam, FillIn, MultipleChoice
+
+
+def make_question(**kwargs):
+    choices = [{"text": "a", "correct": True}, {"text": "b"}]
+    return MultipleChoice(id="q", title="Q", stem="?", choices=choices, **kwargs)
+
+
+def test_equivalent_models_have_the_same_hash():
+    question = make_question()
+    assert question.content_hash() == make_question(weight=100.0, format=None).content_hash()
+    assert question.content_hash() != make_question(penalty=10).content_hash()
+    assert question.content_hash() == question.model_copy(deep=True).content_hash()
+
+
+def test_hash_ignores_dict_and_set_order():
+    a = Exam(id="e", title="E", tags={"x", "y", "z"}, questions=[make_question()])
+    b = Exam(id="e", title="E", tags={"z", "y", "x"}, questions=[make_question()])
+    assert a.content_hash() == b.content_hash()
+    assert digest({"a": 1, "b": 2}) == digest({"b": 2, "a": 1})
+    assert digest(["a", "b"]) != digest(["b", "a"])
+    assert digest(["ab"]) != digest(["a", "b"])
+
+
+def test_hash_is_cached_and_cleared_on_assignment():
+    question = make_question()
+    first = question.content_hash()
+    assert question.__dict__[CACHE_KEY]
+    assert question == make_question()
+    assert "__content_digest__" not in question.model_dump()
+
+    question.stem = "!"
+    assert question.content_hash() != first
+    assert question.model_copy(update={"stem": "?"}).content_hash() == first
+
+
+def test_nested_models_affect_the_hash():
+    body = [{"type": "static", "text": "1 + 1 ="}, {"type": "numeric", "answer-key": 2}]
+    question = FillIn(id="f", title="F", stem="?", body=body)
+    other = FillIn(id="f", title="F", stem="?", body=[body[0], {**body[1], "answer-key": 3}])
+    assert question.content_hash() != other.content_hash()
@@ -0,0 +1,80 @@
+import os
+
+from mdq.incremental import Manifest, find_media
+from mdq.parser import split_exam
+
+EXAM = """\
+# Exam
+
+---
+
+## [q1] First
+
+```md
+## not a question
+```
+
+What?
+
+## [q2] Second
+
+Why?
+
+---
+
+Good luck!
+"""
+
+
+def test_split_exam():
+    sections = split_exam(EXAM)
+    assert sections.header == "# Exam\n\n---\n\n"
+    assert [s.splitlines()[0] for s in sections.questions] == [
+        "## [q1] First",
+        "## [q2] Second",
+    ]
+    assert "## not a question" in sections.questions[0]
+    assert sections.epilogue == "---\n\nGood luck!\n"
+    assert "".join([sections.header, *sections.questions, sections.epilogue]) == EXAM
+
+
+def test_find_media():
+    src = "![plot](img/plot.png) ![remote](https://x.org/a.png) ![again](img/plot.png)"
+    assert find_media(src) == ["img/plot.png"]
+
+
+def test_manifest_detects_changes(tmp_path):
+    src = tmp_path / "exam.e.md"
+    img = tmp_path / "plot.png"
+    src.write_text("![plot](plot.png)")
+    img.write_bytes(b"png")
+
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(src, tmp_path, "exam")
+    manifest.save()
+    manifest = Manifest.load(tmp_path / "manifest.json")
+    assert manifest.is_fresh(src, tmp_path)
+
+    # Touching the file without changing it keeps it fresh
+    os.utime(src, ns=(0, 0))
+    assert manifest.is_fresh(src, tmp_path)
+
+    img.write_bytes(b"new png")
+    assert not manifest.is_fresh(src, tmp_path)
+
+    assert manifest.prune([], tmp_path) == ["exam.e.md"]
+
+
+def test_manifest_rebuilds_when_missing_media_appears(tmp_path):
+    src = tmp_path / "exam.e.md"
+    src.write_text("![plot](plot.png)")
+
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(src, tmp_path, "exam")
+    manifest.save()
+    manifest = Manifest.load(tmp_path / "manifest.json")
+    assert manifest.entries["exam.e.md"].media == {"plot.png": None}
+    assert manifest.is_fresh(src, tmp_path)
+
+    (tmp_path / "plot.png").write_bytes(b"png")
+    assert not manifest.is_fresh(src, tmp_path)
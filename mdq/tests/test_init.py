@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import mdq
+
+
+def test_import_does_not_load_parser_or_models():
+    code = "import sys, mdq; print(' '.join(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    modules = set(out.stdout.split())
+    assert "mdq.parser" not in modules
+    assert "markdown_it" not in modules
+    assert "pydantic" not in modules
+
+
+def test_enums_compare_to_strings():
+    assert mdq.QuestionType.MULTIPLE_CHOICE == "multiple-choice"
+    assert mdq.Format.MARKDOWN == "md"
+
+
+def test_lazy_names():
+    from mdq.parser import parse_question
+
+    assert mdq.parse_question is parse_question
+    assert mdq.Exam.model_fields["questions"]
+    assert "compile_tree" in dir(mdq)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pydantic import ValidationError
+
+from mdq import loader
+from mdq.loader import load_json
+from mdq.models import Essay, Exam, MultipleChoice
+
+
+def make_exam():
+    return Exam(
+        id="exam",
+        title="Exam",
+        questions=[
+            MultipleChoice(
+                id="q1",
+                title="Answer",
+                stem="What is the answer?",
+                choices=[{"text": "0"}, {"text": "42", "correct": True}],
+            ),
+            Essay(id="q2", title="Essay", stem="Why?"),
+        ],
+    )
+
+
+def test_load_question_dispatches_on_type():
+    question = make_exam().questions[1]
+    data = question.model_dump_json(by_alias=True, exclude_unset=True).encode()
+    assert b'"type":"essay"' in data
+    assert load_json(data) == question
+    assert load_json(data, "essay") == question
+
+
+def test_load_exam():
+    exam = make_exam()
+    assert load_json(exam.model_dump_json(by_alias=True), "exam") == exam
+
+
+def test_load_invalid_data():
+    with pytest.raises(ValidationError):
+        load_json(b'{"id": "q", "stem": "s", "type": "unknown"}')
+    with pytest.raises(ValueError):
+        load_json(b"{}", "not-a-kind")
+
+
+def test_trusted_loads_return_copies():
+    data = make_exam().model_dump_json(by_alias=True)
+    first = load_json(data, "exam", trusted=True)
+    first.title = "Changed"
+
+    second = load_json(data, "exam", trusted=True)
+    assert second is not first
+    assert second.title == "Exam"
+    assert second.questions is first.questions
+
+
+def test_trusted_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(loader, "TRUSTED_CACHE_SIZE", 2)
+    data = [Essay(id=f"q{i % 5}", title="Q", stem="Why?").model_dump_json() for i in range(1000)]
+    with ThreadPoolExecutor(8) as pool:
+        questions = list(pool.map(lambda d: load_json(d, "essay", trusted=True), data))
+    assert [q.id for q in questions] == [f"q{i % 5}" for i in range(1000)]
+    assert len(loader._trusted) <= 2
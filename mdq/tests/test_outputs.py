@@ -0,0 +1,66 @@
+import pytest
+
+from mdq import outputs
+from mdq.executor import code_io_job, run_jobs
+from mdq.models import CodeIo
+from mdq.models.shared import Conf
+from mdq.outputs import OutputCache, compare_output, expected_outputs
+
+REFERENCE = "print(int(input()) * 2)"
+
+
+def make_question(inputs=("2", "3"), stem="Double it"):
+    return CodeIo(
+        id="double",
+        title="Double",
+        stem=stem,
+        **{
+            "supported-languages": ["python"],
+            "answer-key": [{"input": "1", "output": "2\n"}, {"inputs": list(inputs)}],
+        },
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = OutputCache(tmp_path / "outputs.sqlite3")
+    yield cache
+    cache.close()
+
+
+def test_expected_outputs_are_computed_once(cache, monkeypatch):
+    question = make_question()
+    assert expected_outputs(question, REFERENCE, cache=cache) == ["2\n", "4\n", "6\n"]
+    assert len(cache) == 2
+
+    def fail(*args):
+        raise AssertionError("reference should not run")
+
+    monkeypatch.setattr(outputs, "_run_reference", fail)
+    assert expected_outputs(question, REFERENCE, cache=cache) == ["2\n", "4\n", "6\n"]
+
+
+def test_outputs_are_invalidated_when_the_question_changes(cache):
+    expected_outputs(make_question(), REFERENCE, cache=cache)
+    expected_outputs(make_question(inputs=["5"], stem="Twice"), REFERENCE, cache=cache)
+    assert len(cache) == 1
+
+
+def test_reference_failures_are_reported(cache):
+    with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+        expected_outputs(make_question(), "1 / 0", cache=cache)
+    assert len(cache) == 0
+
+
+def test_grading_compares_with_cached_outputs(cache):
+    question = make_question()
+    expected = expected_outputs(question, REFERENCE, cache=cache)
+    results = run_jobs([code_io_job(question, "print(2 * int(input()))", id="s")], workers=1)
+    assert all(compare_output(r.stdout, out) for r, out in zip(results, expected))
+
+
+def test_compare_output_options():
+    assert compare_output("abc\n\n", "abc")
+    assert not compare_output("abc  \nx", "abc\nx")
+    assert compare_output("abc  \nx", "abc\nx", Conf(**{"match-spaces": True}))
+    assert compare_output("Ação", "acao", Conf(**{"ignore-accents": True, "case-sensitive": False}))
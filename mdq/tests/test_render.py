@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from mdq import render
+from mdq.models import MultipleChoice
+
+
+def test_render_escapes_raw_html():
+    html = render.render("**bold** <script>alert(1)</script>")
+    assert "<strong>bold</strong>" in html
+    assert "<script>" not in html
+
+
+def test_render_plain_text():
+    assert render.render("a < b", "text") == "<p>a &lt; b</p>\n"
+
+
+def test_render_is_cached():
+    text = "A *cached* paragraph"
+    assert render.render(text) is render.render(text)
+
+
+def test_render_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(render, "RENDER_CACHE_SIZE", 4)
+    texts = [f"text {i % 8}" for i in range(2000)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda text: render.render(text, "text"), texts))
+    assert results == [f"<p>{text}</p>\n" for text in texts]
+    assert len(render._cache) <= 4
+
+
+def test_render_fields():
+    question = MultipleChoice(
+        id="q",
+        title="Q",
+        stem="What is *x*?",
+        choices=[{"text": "one", "feedback": "nope"}, {"text": "two", "correct": True}],
+    )
+    data = question.model_dump(by_alias=True)
+    html = render.render_fields(data)
+    assert set(html) == {"stem", "choices.0.text", "choices.0.feedback", "choices.1.text"}
+    assert html["stem"] == "<p>What is <em>x</em>?</p>\n"
+
+
+def test_fields_hash_depends_on_text_and_format():
+    data = {"stem": "a", "choices": [{"text": "b"}]}
+    assert render.fields_hash(data) == render.fields_hash({**data, "title": "ignored"})
+    assert render.fields_hash(data) != render.fields_hash({**data, "stem": "c"})
+    assert render.fields_hash(data) != render.fields_hash(data, "text")
@@ -0,0 +1,40 @@
+from mdq.parser import QuestionParser, first_child, read_tokens
+
+SRC = """\
+## [q1] Title
+
+Preamble
+
+* [x] 1
+  > Good
+* [ ] 2
+"""
+
+
+def test_token_stream_blocks():
+    stream = read_tokens(SRC)
+    blocks = list(stream.blocks())
+    assert [b.type for b in blocks] == ["heading", "paragraph", "bullet_list"]
+    assert [b.content for b in blocks[:2]] == ["[q1] Title", "Preamble"]
+    assert blocks[2].map == (4, 7)
+    assert blocks[2].source() == "* [x] 1\n  > Good\n* [ ] 2"
+    assert [item.type for item in blocks[2].children] == ["list_item", "list_item"]
+    assert not stream[len(stream)]
+
+
+def test_first_child():
+    heading, _, ul = read_tokens(SRC).blocks()
+    paragraph = first_child(ul.children[0], type="paragraph")
+    assert first_child(paragraph, type="inline").content == "[x] 1"
+    assert first_child(heading, type="paragraph") is None
+
+
+def test_parser_cursor():
+    parser = QuestionParser(SRC, read_tokens(SRC))
+    assert parser.match(tag="h2").content == "[q1] Title"
+    assert parser.match(tag="h2") is None
+    assert parser.expect(type="paragraph").content == "Preamble"
+    ul = parser.read()
+    assert parser.empty() and not parser.peek()
+    parser.push_node(ul)
+    assert parser.peek() == ul
@@ -0,0 +1,39 @@
+import pytest
+
+from mdq.parser import read_tokens
+from mdq.types import ItemMark, ItemMarks, MarkKind, QuestionType, scan_item_mark
+
+
+@pytest.mark.parametrize(
+    "src",
+    ["[x] a", "[X](link)", "[t] a", "[ T] a", "[]a", "[50%] a", "plain", "  [f] x", "[f]"],
+)
+def test_scan_item_mark_matches_item_mark_parse(src):
+    kind, value = scan_item_mark(src)
+    assert kind.item_mark(value) == ItemMark.parse(src)
+
+
+def scan(src):
+    stream = read_tokens(src)
+    return ItemMarks.scan(stream, 0)
+
+
+def test_scan_list():
+    marks = scan("* [x] a\n* b\n* [25%] c\n")
+    assert list(marks.kinds) == [MarkKind.CHECKED, MarkKind.NONE, MarkKind.PERCENT]
+    assert marks[2] == ItemMark("select", 25.0)
+    assert marks.question_type() == QuestionType.MULTIPLE_CHOICE
+
+
+@pytest.mark.parametrize(
+    "src, expected",
+    [
+        ("* [x] a\n* [] b\n", QuestionType.MULTIPLE_SELECTION),
+        ("* [T] a\n* [F] b\n", QuestionType.TRUE_FALSE),
+        ("* a\n* b\n", None),
+        ("* [T] a\n* [x] b\n", None),
+        ("* \n* [x] b\n", QuestionType.MULTIPLE_CHOICE),
+    ],
+)
+def test_question_type(src, expected):
+    assert scan(src).question_type() == expected
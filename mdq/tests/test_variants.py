@@ -0,0 +1,82 @@
+import pytest
+
+from mdq import generate_variants
+from mdq.models import Essay, Exam, MultipleChoice, TrueFalse
+from mdq.variants import PermutationTable
+
+
+def make_exam(shuffle=True):
+    choices = [
+        {"text": "a", "correct": True},
+        {"text": "b"},
+        {"text": "c"},
+        {"text": "none of the above", "fixed": True},
+    ]
+    return Exam(
+        id="exam",
+        title="Exam",
+        shuffle=shuffle,
+        questions=[
+            MultipleChoice(id="mc", title="MC", stem="?", choices=choices),
+            TrueFalse(
+                id="tf",
+                title="TF",
+                stem="?",
+                shuffle=False,
+                choices=[{"text": "x", "correct": True}, {"text": "y"}],
+            ),
+            Essay(id="essay", title="Essay", stem="?"),
+        ],
+    )
+
+
+@pytest.fixture
+def exam():
+    return make_exam()
+
+
+def test_variants_are_deterministic(exam):
+    seeds = ["alice", "bob", 42]
+    assert generate_variants(exam, seeds) == generate_variants(exam, seeds)
+    assert len({v.questions for v in generate_variants(exam, range(50))}) > 1
+
+
+def test_variants_respect_shuffle_and_fixed_choices(exam):
+    for variant in generate_variants(exam, range(100)):
+        assert sorted(variant.questions) == [0, 1, 2]
+        mc, tf, essay = variant.choices
+        assert sorted(mc) == [0, 1, 2, 3] and mc[3] == 3
+        assert tf is None and essay is None
+
+    variant = generate_variants(make_exam(shuffle=False), [1])[0]
+    assert variant.choices == (None, None, None)
+
+
+def test_variant_answer_key_and_remapping(exam):
+    for variant in generate_variants(exam, range(20), shuffle_questions=False):
+        order = variant.choice_order(0)
+        question, displayed = next(variant.display(exam))
+        assert question is exam.questions[0]
+        assert [c.text for c in displayed] == [exam.questions[0].choices[i].text for i in order]
+
+        [mc_key, tf_key, essay_key] = variant.answer_key(exam)
+        assert mc_key == (order.index(0),)
+        assert tf_key == (0,)
+        assert essay_key is None
+        assert variant.to_original(0, mc_key) == [0]
+        assert variant.to_display(0, [0]) == list(mc_key)
+
+
+def test_variants_share_permutation_tables(exam):
+    variants = generate_variants(exam, range(1000))
+    orders = {id(v.choices[0]) for v in variants}
+    assert len(orders) <= 6
+
+
+def test_large_permutation_tables_are_generated_on_demand():
+    import random
+
+    table = PermutationTable(12, fixed=[0])
+    assert table.orders is None
+    order = table.draw(random.Random(0))
+    assert order[0] == 0 and sorted(order) == list(range(12))
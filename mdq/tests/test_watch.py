@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from mdq import parser
+from mdq.errors import error_span
+from mdq.loader import load_json
+from mdq.parser import parse_question
+from mdq.watch import Watcher
+
+BROKEN = """# [q1] Question
+
+What is the answer?
+
+* [x] Yes
+* No
+
+Some trailing text
+"""
+
+
+def make_question(id, answer="Yes"):
+    choices = [{"text": answer, "correct": True}, {"text": "No", "correct": False}]
+    data = {"type": "multiple-choice", "id": id, "title": "Q", "stem": "?"}
+    return json.dumps({**data, "choices": choices})
+
+
+def fake_parse_question(path):
+    # Sources are stored as JSON, except for the broken ones, which go through
+    # the real parser to produce errors with source locations.
+    src = path.read_text()
+    return load_json(src) if src.startswith("{") else parse_question(src)
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "parse_question", fake_parse_question)
+    (tmp_path / "q1.q.md").write_text(make_question("q1"))
+    (tmp_path / "q2.q.md").write_text(make_question("q2"))
+    with Watcher(tmp_path, backend="poll", debounce=0.01) as watcher:
+        yield watcher
+
+
+def test_error_span_points_to_source_lines():
+    with pytest.raises(Exception) as info:
+        parse_question(BROKEN)
+    start, end = error_span(info.value)
+    assert BROKEN.splitlines()[start:end] == ["Some trailing text"]
+
+
+def test_watcher_scan_parses_all_sources(watcher, tmp_path):
+    update = watcher.scan()
+    assert update.parsed == [tmp_path / "q1.q.md", tmp_path / "q2.q.md"]
+    assert watcher.models[tmp_path / "q2.q.md"].id == "q2"
+    assert not watcher.diagnostics
+
+
+def test_watcher_reparses_only_touched_files(watcher, tmp_path):
+    watcher.scan()
+    untouched = watcher.models[tmp_path / "q2.q.md"]
+    (tmp_path / "q1.q.md").write_text(make_question("q1", "Sure"))
+
+    update = next(watcher.updates(timeout=1))
+    assert update.parsed == [tmp_path / "q1.q.md"]
+    assert watcher.models[tmp_path / "q2.q.md"] is untouched
+    assert watcher.models[tmp_path / "q1.q.md"].choices[0].text == "Sure"
+
+
+def test_watcher_reports_diagnostics_and_removals(watcher, tmp_path):
+    watcher.scan()
+    (tmp_path / "q1.q.md").write_text(BROKEN)
+    (tmp_path / "q2.q.md").unlink()
+
+    update = next(watcher.updates(timeout=1))
+    assert update.removed == [tmp_path / "q2.q.md"]
+    assert tmp_path / "q1.q.md" not in watcher.models
+
+    data = json.loads(update.to_json())
+    [diagnostic] = data["diagnostics"]
+    assert diagnostic["path"] == str(tmp_path / "q1.q.md")
+    assert diagnostic["span"] == [7, 8]
+    assert diagnostic["severity"] == "error"
@@ -1,7 +1,7 @@
 from datetime import datetime
 from django.http import JsonResponse
 from django.conf import settings
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 
 from ninja.errors import ValidationError
 from ninja.security.base import AuthBase
@@ -76,3 +76,16 @@ def does_not_exist_error(request, exc: Exception) -> JsonResponse:
         },
         status=404,
     )
+
+
+@rpc.exception_handler(PermissionDenied)
+@rest.exception_handler(PermissionDenied)
+def permission_denied_error(request, exc: Exception) -> JsonResponse:
+    return JsonResponse(
+        {
+            "error": "permission-denied",
+            "code": 403,
+            "message": f"Permission denied: {exc}",
+        },
+        status=403,
+    )
@@ -1,12 +1,15 @@
 from typing import Any, TypeVar
 
-from django.db.models import Model, QuerySet
+from django.db.models import F, Model, QuerySet
+from django.http import StreamingHttpResponse
 from django.utils.translation import gettext as _
 from ninja import Router, Schema
 from ninja.errors import ValidationError
 from ninja.pagination import paginate
 
 from ...types import AuthenticatedRequest as HttpRequest
+from ...submissions import gradebook
+from ...submissions.models import Graded
 from ...types import PaginatedView, redacted
 from .. import models, util
 from ..rules import Perms
@@ -97,6 +100,62 @@ def view_classroom(request: HttpRequest, id: str):
     return public_classroom(classroom)
 
 
+@router.get("/{id}/grades", response=list[schemas.ExamGrade])
+def classroom_grades(request: HttpRequest, id: str):
+    """
+    Grades of all students in all exams of a classroom.
+
+    Only the instructor and the staff of the classroom can see it.
+    """
+    classroom = get_staff_queryset(request).get(**util.public_id_params(id))
+    return (
+        Graded.objects.filter(role=Graded.For.EXAM, exam__classroom=classroom)
+        .order_by("student__username", "exam__slug")
+        .values(
+            "awarded_points",
+            "final_grade",
+            student_username=F("student__username"),
+            exam_slug=F("exam__slug"),
+        )
+    )
+
+
+@router.get("/{id}/gradebook")
+def classroom_gradebook(
+    request: HttpRequest, id: str, format: gradebook.Format = "csv"
+) -> StreamingHttpResponse:
+    """
+    Export the student x question grade matrix of a classroom.
+
+    Formats are "csv", "parquet" and "arrow". The last two are only available
+    if pyarrow is installed.
+    """
+    classroom = get_staff_queryset(request).get(**util.public_id_params(id))
+    if format != "csv" and not gradebook.has_pyarrow():
+        raise ValidationError(
+            [
+                {
+                    "error": "gradebook-format",
+                    "message": _("Format not available: %s") % format,
+                }
+            ]
+        )
+    content_type, extension = gradebook.FORMATS[format]
+    response = StreamingHttpResponse(
+        gradebook.export_gradebook(classroom, format), content_type=content_type
+    )
+    filename = f"{classroom.slug.replace('/', '-')}-gradebook{extension}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def get_staff_queryset(
+    request: HttpRequest,
+) -> QuerySet[models.Classroom, models.Classroom]:
+    user = request.user
+    return (user.classrooms_as_instructor.all() | user.classrooms_as_staff.all()).distinct()
+
+
 @router.post("/", response={201: schemas.Classroom})
 def create_classroom(request: HttpRequest, classroom: schemas.ClassroomCreate):
     """
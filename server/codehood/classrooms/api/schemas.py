@@ -1,6 +1,6 @@
 from typing import Annotated, Literal
 
-from ninja import Field, ModelSchema
+from ninja import Field, ModelSchema, Schema
 from pydantic import field_validator
 
 from ...users.api import User as UserSchema
@@ -70,3 +70,10 @@ class Classroom(ModelSchema):
         if isinstance(v, int):
             return models.Classroom.Status(v).name.lower()  # type: ignore
         return v
+
+
+class ExamGrade(Schema):
+    student: Annotated[str, Field(validation_alias="student_username")]
+    exam: Annotated[str, Field(validation_alias="exam_slug")]
+    awarded_points: float
+    final_grade: float
@@ -239,4 +239,4 @@ class Classroom(LoggingModel, StatusModel, TimeStampedModel):
 
         if user == self.instructor:
             raise ValidationError(_("Teacher cannot enroll as staff."))
-        self.students.add(user)
+        self.staff.add(user)
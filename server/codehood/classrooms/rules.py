@@ -34,3 +34,4 @@ class Perms(PermEnum):
     DELETE_CLASSROOM = class_instructor
     CHANGE_CLASSROOM = class_instructor
     ENROLL_IN_CLASSROOM = student
+    ADD_EXAM = class_instructor | class_staff
@@ -1,13 +1,18 @@
 from typing import Any
 
+from django.conf import settings
 from django.db.models import Count, F, QuerySet
 from django.db.models.functions import Now
 from django.utils.translation import gettext as _
-from ninja import Router
+from ninja import File, Form, Router, UploadedFile
+from ninja.errors import ValidationError
 from ninja.pagination import paginate
 
 from ..api import rest
+from ..classrooms.models import Classroom
+from ..classrooms.rules import Perms as ClassroomPerms
 from ..questions.models import Question as QuestionModel
+from ..submissions import ingest
 from ..types import (
     AuthenticatedRequest as HttpRequest,
 )
@@ -17,8 +22,8 @@ from ..types import (
     redacted,
 )
 from ..users.models import User
-from . import models
-from .schemas import Answer, Exam
+from . import importer, models
+from .schemas import Answer, Exam, ImportSummary, Receipt
 
 router = Router(tags=[_("Exams")])
 
@@ -59,17 +64,126 @@ def get_exam(request: HttpRequest, id: str, **kwargs) -> models.Exam:
     return exam
 
 
-@router.post("/{id}/answers")
+@router.post("/{id}/answers", response=str)
 def post_submission(request: HttpRequest, id: str, body: Answer):
     """
     Post an submission to an exam.
+
+    Return a receipt id. If submissions are written asynchronously, the
+    receipt tells when the submission is stored.
     """
     exam = get_exam(request, id, redacted=False)
     question = exam.questions.get(slug=body.id)
     if question.type != body.type:
         raise ValueError(f"Question type mismatch: {question.type} != {body.type}")
-    exam.submit_response(request, question, body.answer)
-    return body
+    if settings.SUBMISSIONS_ASYNC:
+        return exam.enqueue_response(request, question, body.answer)
+    submission = exam.submit_response(request, question, body.answer)
+    return ingest.make_receipt(submission)
+
+
+@router.get("/{id}/receipts/{receipt}", response=Receipt)
+def get_receipt(request: HttpRequest, id: str, receipt: str):
+    """
+    Tell if the submission of a receipt is stored, pending or missing.
+    """
+    status = ingest.receipt_status(receipt, student_id=request.user.pk)
+    return Receipt(receipt=receipt, status=status)
+
+
+@router.post("/import", response={201: ImportSummary})
+def import_exam(
+    request: HttpRequest,
+    file: UploadedFile = File(...),
+    attachments: list[UploadedFile] | None = File(None),
+    classroom: str | None = Form(None),
+    kind: models.Kind = Form(models.Kind.DRAFT),
+    prune: bool = Form(False),
+):
+    """
+    Create or update an exam from an mdq file (.e.md) or a compiled bank.
+
+    Files referenced by the media of questions can be uploaded as attachments.
+    """
+    if request.user.role != User.Role.INSTRUCTOR:
+        raise models.Exam.DoesNotExist
+    owner_classroom = None
+    if classroom is not None:
+        owner_classroom = Classroom.objects.get(public_id=classroom)
+        # Classrooms the user cannot see are reported as missing. Seeing a
+        # classroom without managing it is a permission error (403).
+        if not request.user.has_perm(ClassroomPerms.VIEW_CLASSROOM, owner_classroom):
+            raise Classroom.DoesNotExist
+
+    header, questions = read_upload(file)
+    result = run_import(
+        importer.import_exam,
+        request.user,
+        header,
+        questions,
+        classroom=owner_classroom,
+        kind=kind,
+        files=upload_files(attachments),
+        prune=prune,
+    )
+    return 201, import_summary(result)
+
+
+@router.post("/{id}/import", response=ImportSummary)
+def import_questions(
+    request: HttpRequest,
+    id: str,
+    file: UploadedFile = File(...),
+    attachments: list[UploadedFile] | None = File(None),
+    prune: bool = Form(False),
+):
+    """
+    Add or update the questions of an exam from an mdq file or a compiled bank.
+    """
+    exam = models.Exam.objects.get(owner=request.user, **id_to_params(id))
+    _, questions = read_upload(file)
+    result = run_import(
+        importer.import_questions,
+        exam,
+        questions,
+        files=upload_files(attachments),
+        prune=prune,
+    )
+    return import_summary(result)
+
+
+def read_upload(file: UploadedFile):
+    try:
+        return importer.read_exam(file, file.name or "")
+    except (ValueError, NotImplementedError) as ex:
+        raise import_error("invalid-exam", ex)
+
+
+def run_import(func, *args, **kwargs) -> importer.ImportResult:
+    try:
+        return func(*args, **kwargs)
+    except ValueError as ex:
+        raise import_error("invalid-import", ex)
+
+
+def import_error(code: str, ex: Exception) -> ValidationError:
+    message = getattr(ex, "message", None) or str(ex) or type(ex).__name__
+    return ValidationError([{"error": code, "message": message}])
+
+
+def upload_files(files: list[UploadedFile] | None) -> dict[str, UploadedFile]:
+    return {file.name: file for file in files or () if file.name}
+
+
+def import_summary(result: importer.ImportResult) -> ImportSummary:
+    return ImportSummary(
+        exam=result.exam.public_id,
+        created=result.created,
+        updated=result.updated,
+        unchanged=result.unchanged,
+        removed=result.removed,
+        attachments=result.attachments,
+    )
 
 
 def id_to_params(id: str) -> dict[str, str]:
@@ -159,6 +273,7 @@ class RedactedStudentQuestion(Redacted[QuestionModel]):
         obj.type
         self.tags: list[str] = []
         clean_sensible_question_data(obj.data, obj.type)
+        self.html = clean_sensible_html(obj.html)
         super().__init__(obj)
 
 
@@ -177,6 +292,13 @@ def clean_sensible_question_data(data: Any, type: QuestionModel.Type) -> Any:
             raise NotImplementedError
 
 
+def clean_sensible_html(html: dict[str, str]) -> dict[str, str]:
+    """
+    Remove rendered private fields before sending them to students.
+    """
+    return {k: v for k, v in html.items() if not k.endswith(".feedback")}
+
+
 def clean_choices(choices):
     for choice in choices:
         choice.pop("feedback", None)
@@ -0,0 +1,297 @@
+"""
+Import mdq exams and compiled question banks into the database.
+
+Questions are upserted by (exam, slug) with a fixed number of queries, no
+matter how many questions are imported: existing questions are loaded once,
+new ones are inserted with bulk_create() and changed ones are written with
+bulk_update(). Questions whose content did not change are not written at all.
+Everything happens inside a single transaction, so a failed import leaves the
+exam untouched.
+
+bulk_create() and bulk_update() do not call Question.save(), so the HTML of
+text fields is rendered explicitly before writing.
+"""
+
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import IO, Any, Iterable, Mapping, Sequence
+
+import mdq
+from django.core.exceptions import PermissionDenied
+from django.core.files import File
+from django.db import transaction
+from mdq.bank import BANK_EXTENSION
+from mdq.utils import humanize_slug, remove_extensions, slugify
+
+from ..classrooms.models import Classroom
+from ..classrooms.rules import Perms as ClassroomPerms
+from ..questions.models import WEIGHT_PER_POINT, Attatchment, Question
+from ..users.models import User
+from .models import Exam
+
+#: mdq fields stored in their own columns, mapped to the column names. All
+#: other fields are stored in Question.data. The mdq weight is stored in
+#: Question.points, scaled by WEIGHT_PER_POINT.
+COLUMNS = {
+    "id": "slug",
+    "type": "type",
+    "title": "title",
+    "stem": "stem",
+    "format": "format",
+    "preamble": "preamble",
+    "epilogue": "epilogue",
+    "comment": "comments",
+    "shuffle": "shuffle",
+}
+UPDATE_FIELDS = [
+    *(column for column in COLUMNS.values() if column != "slug"),
+    "points",
+    "data",
+    "html",
+    "html_hash",
+]
+
+#: Rows written per INSERT or UPDATE statement.
+BATCH_SIZE = 500
+
+
+@dataclass
+class ImportResult:
+    """
+    Summary of an import.
+
+    Attributes
+    ----------
+    exam:
+        The exam that received the questions.
+    created:
+        Slugs of new questions.
+    updated:
+        Slugs of existing questions that changed.
+    unchanged:
+        Slugs of existing questions that did not change.
+    removed:
+        Slugs of questions removed from the exam.
+    attachments:
+        Number of attatchment files written.
+    """
+
+    exam: Exam
+    created: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    attachments: int = 0
+
+
+def read_exam(
+    src: IO[bytes] | File, name: str
+) -> tuple[mdq.ExamHeader, list[mdq.Question]]:
+    """
+    Read an exam from an mdq source or from a compiled bank.
+
+    The file name tells the format. Banks have no exam header, so one is
+    derived from the name of the file.
+    """
+    if name.endswith(BANK_EXTENSION):
+        header = mdq.ExamHeader(
+            id=slugify(remove_extensions(name)),
+            title=humanize_slug(remove_extensions(name), title=True),
+        )
+        return header, read_bank(src)
+
+    data = src.read()
+    text = data.decode("utf-8") if isinstance(data, bytes) else data
+    header, *questions = mdq.iter_exam(text, filename=name)
+    return header, questions  # type: ignore[return-value]
+
+
+def read_bank(src: IO[bytes] | File) -> list[mdq.Question]:
+    """
+    Decode all questions of a compiled bank.
+    """
+    if path := getattr(src, "temporary_file_path", None):
+        with mdq.Bank(path(), trusted=True) as bank:
+            return [bank.question_at(pos) for pos in range(len(bank))]
+
+    # Banks are memory-mapped, so in-memory uploads must be written to disk.
+    with tempfile.NamedTemporaryFile(suffix=BANK_EXTENSION) as fd:
+        for chunk in (src if isinstance(src, File) else File(src)).chunks():
+            fd.write(chunk)
+        fd.flush()
+        with mdq.Bank(fd.name, trusted=True) as bank:
+            return [bank.question_at(pos) for pos in range(len(bank))]
+
+
+def question_fields(question: mdq.Question) -> dict[str, Any]:
+    """
+    Values of the Question columns for an mdq question.
+
+    Fields that are not set take the default of their columns. A question with
+    the default mdq weight of 100 is worth 1 point.
+    """
+    data = question.model_dump(mode="json", by_alias=True, exclude_none=True)
+    fields = {column: data.pop(name, None) for name, column in COLUMNS.items()}
+    for column, value in fields.items():
+        if value is None:
+            fields[column] = Question._meta.get_field(column).get_default()
+    weight = data.pop("weight", None)
+    fields["points"] = (
+        Question._meta.get_field("points").get_default()
+        if weight is None
+        else weight / WEIGHT_PER_POINT
+    )
+    fields["data"] = data
+    return fields
+
+
+@transaction.atomic
+def import_exam(
+    owner: User,
+    header: mdq.ExamHeader,
+    questions: Sequence[mdq.Question],
+    *,
+    classroom: Classroom | None = None,
+    kind: Exam.Kind = Exam.Kind.DRAFT,
+    files: Mapping[str, File] | None = None,
+    prune: bool = False,
+) -> ImportResult:
+    """
+    Create or update an exam and its questions.
+
+    Exams are identified by owner, classroom, kind and the id in the header.
+    Raises PermissionDenied if owner cannot add exams to the classroom and
+    ValueError if the classroom has an exam with the same id and kind that
+    belongs to someone else.
+    """
+    if classroom is not None:
+        if not owner.has_perm(ClassroomPerms.ADD_EXAM, classroom):
+            raise PermissionDenied(f"cannot add exams to classroom {classroom.public_id}")
+        taken = Exam.objects.filter(classroom=classroom, slug=header.id, kind=kind)
+        if taken.exclude(owner=owner).exists():
+            raise ValueError(f"exam {header.id} belongs to another user")
+
+    exam, _ = Exam.objects.update_or_create(
+        owner=owner,
+        classroom=classroom,
+        slug=header.id,
+        kind=kind,
+        defaults={
+            "title": header.title or humanize_slug(header.id, title=True),
+            "description": header.description or header.title or header.id,
+            "preamble": header.preamble or "",
+        },
+    )
+    if header.tags:
+        exam.tags.set(sorted(header.tags))
+    return import_questions(exam, questions, files=files, prune=prune)
+
+
+@transaction.atomic
+def import_questions(
+    exam: Exam,
+    questions: Sequence[mdq.Question],
+    *,
+    files: Mapping[str, File] | None = None,
+    prune: bool = False,
+) -> ImportResult:
+    """
+    Upsert questions into exam.
+
+    Files are stored as attatchments of the questions that reference them in
+    their media, matched by path or by file name. If prune is true, questions
+    that are not imported are removed from the exam.
+
+    Raises ValueError if two questions have the same id.
+    """
+    # Serializes concurrent imports into the same exam.
+    Exam.objects.select_for_update().only("pk").get(pk=exam.pk)
+
+    result = ImportResult(exam)
+    existing = {question.slug: question for question in exam.questions.all()}
+    rows: dict[str, Question] = {}
+    created: list[Question] = []
+    updated: list[Question] = []
+
+    for question in questions:
+        fields = question_fields(question)
+        slug = fields.pop("slug")
+        if slug in rows:
+            raise ValueError(f"repeated question id: {slug}")
+
+        if (row := existing.get(slug)) is None:
+            row = Question(exam=exam, slug=slug, **fields)
+            row.render_html()
+            created.append(row)
+            result.created.append(slug)
+        elif any(getattr(row, name) != value for name, value in fields.items()):
+            for name, value in fields.items():
+                setattr(row, name, value)
+            row.render_html()
+            updated.append(row)
+            result.updated.append(slug)
+        else:
+            result.unchanged.append(slug)
+        rows[slug] = row
+
+    Question.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    Question.objects.bulk_update(updated, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+
+    if prune and (removed := existing.keys() - rows.keys()):
+        exam.questions.filter(slug__in=removed).delete()
+        result.removed = sorted(removed)
+
+    if files:
+        if any(row.pk is None for row in created):
+            # Backends that cannot return ids from bulk inserts.
+            ids = dict(exam.questions.filter(slug__in=result.created).values_list("slug", "pk"))
+            for row in created:
+                row.pk = ids[row.slug]
+        result.attachments = import_attachments(
+            [(rows[q.id], q) for q in questions], files
+        )
+    return result
+
+
+def import_attachments(
+    questions: Iterable[tuple[Question, mdq.Question]], files: Mapping[str, File]
+) -> int:
+    """
+    Store files as attatchments of the questions that reference them.
+
+    Return the number of attatchments written.
+    """
+    by_name = {PurePosixPath(name).name: file for name, file in files.items()}
+    wanted: dict[tuple[int, str], tuple[Question, File, str]] = {}
+    for row, question in questions:
+        for media in question.media:
+            path = media.url
+            if (file := files.get(path) or by_name.get(PurePosixPath(path).name)) is None:
+                continue
+            wanted[row.pk, path] = (row, file, media.caption or "")
+    if not wanted:
+        return 0
+
+    existing = {
+        (attachment.question_id, attachment.path): attachment
+        for attachment in Attatchment.objects.filter(
+            question__in={row for row, _, _ in wanted.values()},
+            path__in={path for _, path in wanted},
+        )
+    }
+    created, updated = [], []
+    for key, (row, file, description) in wanted.items():
+        if (attachment := existing.get(key)) is None:
+            # FileField.pre_save() stores the file during bulk_create().
+            created.append(
+                Attatchment(question=row, path=key[1], file=file, description=description)
+            )
+        else:
+            attachment.file.save(PurePosixPath(key[1]).name, file, save=False)
+            attachment.description = description
+            updated.append(attachment)
+
+    Attatchment.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    Attatchment.objects.bulk_update(updated, ["file", "description"], batch_size=BATCH_SIZE)
+    return len(created) + len(updated)
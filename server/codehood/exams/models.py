@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Any, ClassVar
 
 from django.core.validators import MinLengthValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.models.functions import Now
 from django.utils import timezone
 from model_utils.managers import QueryManager
@@ -161,5 +161,26 @@ class Exam(TimeStampedModel):
 
         from ..submissions.models import Submission
 
+        from ..submissions.tasks import schedule_grading
+
         submission = Submission.new(request, question=question, exam=self, data=data)
+        if not submission.recycled:
+            transaction.on_commit(schedule_grading)
         return submission
+
+    def enqueue_response(
+        self, request: HttpRequest, question: Question, data: Any
+    ) -> str:
+        """
+        Queue a response to the exam to be written in the background.
+
+        Return a receipt id that tells if the response was stored.
+        """
+        if not self.is_accepting_responses:
+            raise RuntimeError("Exam is not accepting responses.")
+
+        from ..submissions import ingest
+        from ..submissions.models import Submission
+
+        submission = Submission.build(request, question=question, exam=self, data=data)
+        return ingest.enqueue(submission)
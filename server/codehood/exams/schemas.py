@@ -9,9 +9,13 @@ from ..questions.models import Question as QuestionModel
 class BaseQuestion(ModelSchema):
     class Meta:
         model = QuestionModel
-        exclude = ["exam", "slug", "tagged_items", "type", "data"]
+        exclude = ["exam", "slug", "tagged_items", "type", "data", "html_hash"]
 
     id: str = Field(..., alias="slug")
+    html: dict[str, str] = Field(
+        default_factory=dict,
+        description="Pre-rendered HTML of the text fields, keyed by field path.",
+    )
 
 
 class MultipleChoice(BaseQuestion):
@@ -84,3 +88,17 @@ class TrueFalseAnswer(RootModel):
 
 class EssayAnswer(RootModel):
     root: str
+
+
+class Receipt(Schema):
+    receipt: str
+    status: Literal["stored", "pending", "missing"]
+
+
+class ImportSummary(Schema):
+    exam: str = Field(..., description="Public id of the exam.")
+    created: list[str] = Field(..., description="Ids of new questions.")
+    updated: list[str] = Field(..., description="Ids of questions that changed.")
+    unchanged: list[str] = Field(..., description="Ids of questions that did not change.")
+    removed: list[str] = Field(..., description="Ids of questions removed from the exam.")
+    attachments: int = Field(..., description="Number of attatchment files stored.")
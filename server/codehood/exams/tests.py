@@ -0,0 +1,130 @@
+import io
+
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase
+
+from ..api import permission_denied_error
+from ..classrooms import fixtures as classroom_fixtures
+from ..users import fixtures as user_fixtures
+from . import api, importer
+from .models import Exam
+
+EXAM = """\
+# Midterm
+
+---
+
+## [capitals] Capitals
+
+What is the capital of France?
+
+* Lyon
+* [x] Paris
+
+## [primes] Primes
+
+Select the prime numbers.
+
+* [x] 2
+* [ ] 4
+* [x] 5
+
+## Statements
+
+Mark the true statements.
+
+* [T] 2 + 2 = 4
+* [F] 1 > 2
+"""
+
+
+def read(src: str, name: str = "midterm.e.md"):
+    return importer.read_exam(io.BytesIO(src.encode()), name)
+
+
+class ImportExamTestCase(TestCase):
+    def setUp(self):
+        # Fixtures are cached, but the database is rolled back after each test.
+        user_fixtures.user.cache_clear()
+        classroom_fixtures.discipline.cache_clear()
+        classroom_fixtures.classroom.cache_clear()
+        self.owner = user_fixtures.instructor()
+        self.other = user_fixtures.instructor(1)
+        self.classroom = classroom_fixtures.classroom(exams=0)
+
+    def test_import_multi_question_exam(self):
+        result = importer.import_exam(self.owner, *read(EXAM))
+
+        self.assertEqual(result.created, ["capitals", "primes", "q3"])
+        exam = result.exam
+        self.assertEqual((exam.slug, exam.title, exam.owner), ("midterm", "Midterm", self.owner))
+        types = dict(exam.questions.values_list("slug", "type"))
+        self.assertEqual(
+            types,
+            {"capitals": "multiple-choice", "primes": "multiple-selection", "q3": "true-false"},
+        )
+        capitals = exam.questions.get(slug="capitals")
+        self.assertEqual(capitals.points, 1.0)
+        self.assertEqual([c["correct"] for c in capitals.data["choices"]], [False, True])
+
+    def test_weight_is_scaled_to_points(self):
+        _, questions = read(EXAM)
+        question = questions[0].model_copy(update={"weight": 50})
+        self.assertEqual(importer.question_fields(question)["points"], 0.5)
+        self.assertNotIn("weight", importer.question_fields(question)["data"])
+
+    def test_reimport_updates_changed_questions(self):
+        first = importer.import_exam(self.owner, *read(EXAM))
+        changed = EXAM.replace("capital of France", "capital of the French Republic")
+        second = importer.import_exam(self.owner, *read(changed))
+
+        self.assertEqual(second.exam, first.exam)
+        self.assertEqual(second.created, [])
+        self.assertEqual(second.updated, ["capitals"])
+        self.assertEqual(second.unchanged, ["primes", "q3"])
+        self.assertEqual(Exam.objects.filter(slug="midterm").count(), 1)
+
+    def test_prune_removes_missing_questions(self):
+        importer.import_exam(self.owner, *read(EXAM))
+        header, questions = read(EXAM)
+        result = importer.import_exam(self.owner, header, questions[:1], prune=True)
+
+        self.assertEqual(result.removed, ["primes", "q3"])
+        self.assertEqual(list(result.exam.questions.values_list("slug", flat=True)), ["capitals"])
+
+    def test_drafts_of_different_owners_do_not_collide(self):
+        mine = importer.import_exam(self.owner, *read(EXAM)).exam
+        theirs = importer.import_exam(self.other, *read(EXAM)).exam
+
+        self.assertNotEqual(mine, theirs)
+        self.assertEqual(theirs.owner, self.other)
+        mine.refresh_from_db()
+        self.assertEqual(mine.owner, self.owner)
+
+    def test_classroom_exam_of_another_owner_is_not_replaced(self):
+        self.classroom.register_staff(self.other)
+        self.assertTrue(self.classroom.staff.contains(self.other))
+        self.assertFalse(self.classroom.students.contains(self.other))
+        importer.import_exam(self.owner, *read(EXAM), classroom=self.classroom)
+
+        with self.assertRaises(ValueError):
+            importer.import_exam(self.other, *read(EXAM), classroom=self.classroom)
+        exam = Exam.objects.get(classroom=self.classroom, slug="midterm")
+        self.assertEqual(exam.owner, self.owner)
+
+    def test_import_requires_classroom_permission(self):
+        with self.assertRaises(PermissionDenied):
+            importer.import_exam(self.other, *read(EXAM), classroom=self.classroom)
+        self.assertFalse(Exam.objects.filter(slug="midterm").exists())
+
+    def test_permission_errors_are_forbidden(self):
+        # The API reports them as 403, not as a missing classroom.
+        with self.assertRaises(PermissionDenied) as ctx:
+            api.run_import(importer.import_exam, self.other, *read(EXAM), classroom=self.classroom)
+        response = permission_denied_error(None, ctx.exception)
+        self.assertEqual(response.status_code, 403)
+
+    def test_repeated_question_ids_are_rejected(self):
+        src = EXAM.replace("## [primes] Primes", "## [capitals] Primes")
+        with self.assertRaises(ValueError):
+            importer.import_exam(self.owner, *read(src))
@@ -1,22 +1,16 @@
 from typing import Any
-from markdown_it import MarkdownIt
-from mdit_py_plugins.front_matter import front_matter_plugin
-from mdit_py_plugins.footnote import footnote_plugin
-from mdit_py_plugins.dollarmath import dollarmath_plugin
-from mdit_py_plugins.amsmath import amsmath_plugin
 
-md = (
-    MarkdownIt("commonmark", {"breaks": True, "html": True})
-    .use(front_matter_plugin)
-    .use(footnote_plugin)
-    .use(dollarmath_plugin)
-    .use(amsmath_plugin)
-    .enable("table")
-)
+from mdq import render as _render
+from mdq.parser import get_markdown
 
 
 def render(text: str, env: dict[str, Any] | None = None) -> str:
     """
-    Render the given text using MarkdownIt.
+    Render the given text to sanitized HTML.
+
+    Uses the same Markdown configuration as the mdq parser. Results are cached
+    by content, except when an env is given, since rendering may modify it.
     """
-    return md.render(text, env)
+    if env is None:
+        return _render.render(text)
+    return get_markdown(html=False).render(text, env)
@@ -13,6 +13,11 @@ from .. import yaml as _yaml
 from ..exams.models import Exam
 from ..types import TaggableManager, Tags
 
+#: mdq weight of a question worth one point. mdq questions default to a weight
+#: of 100 and questions created in codehood to 1 point, so both are worth the
+#: same.
+WEIGHT_PER_POINT = 100.0
+
 
 class Question(models.Model):
     """
@@ -103,6 +108,20 @@ class Question(models.Model):
             "internal representation in JSON. Only edit if you REALLY know what are you doing."
         ),
     )
+    html = models.JSONField(
+        _("rendered text"),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_("Sanitized HTML of each text field, keyed by field path."),
+    )
+    html_hash = models.CharField[str, str](
+        _("rendered text hash"),
+        max_length=32,
+        blank=True,
+        editable=False,
+        help_text=_("Hash of the text fields used to render the html field."),
+    )
     tags: Tags = TaggableManager()
     objects: models.Manager[Question]
 
@@ -117,6 +136,27 @@ class Question(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.render_html() and kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "html", "html_hash"}
+        super().save(*args, **kwargs)
+
+    def render_html(self, force: bool = False) -> bool:
+        """
+        Render text fields to HTML if they changed since the last render.
+
+        Return True if the html field was updated.
+        """
+        from mdq import render
+
+        data = self.as_json(tags=False)
+        digest = render.fields_hash(data)
+        if digest == self.html_hash and not force:
+            return False
+        self.html = render.render_fields(data)
+        self.html_hash = digest
+        return True
+
     def clean_fields(self, exclude=None):
         # Accept YAML strings in the data field
         if (
@@ -128,7 +168,7 @@ class Question(models.Model):
             self.data = _yaml.parse(self.data)
         super().clean_fields(exclude=exclude)
 
-    def as_json(self) -> dict:
+    def as_json(self, tags: bool = True) -> dict:
         """
         Returns the question as a JSON object.
         """
@@ -138,12 +178,12 @@ class Question(models.Model):
             "title": self.title,
             "stem": self.stem,
             "format": str(self.format),
-            "weight": self.points,
+            "weight": self.points * WEIGHT_PER_POINT,
             "preamble": self.preamble,
             "epilogue": self.epilogue,
             "comments": self.comments,
             "shuffle": self.shuffle,
-            "tags": [str(tag) for tag in self.tags.all()],
+            "tags": [str(tag) for tag in self.tags.all()] if tags else [],
             **self.data,
         }
 
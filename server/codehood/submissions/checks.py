@@ -0,0 +1,34 @@
+"""
+System checks for the submissions app.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+#: Cache backends that are not shared between processes.
+LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs) -> list[checks.CheckMessage]:
+    """
+    Receipts of queued submissions and the deduplication of grading tasks
+    only work across processes with a shared cache.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend not in LOCAL_CACHES:
+        return []
+    return [
+        checks.Warning(
+            f"The default cache ({backend}) is local to each process.",
+            hint=(
+                "Receipts of queued submissions and scheduled grading tasks are "
+                "tracked in the cache. Set CACHE_BACKEND to a shared backend, "
+                "like django.core.cache.backends.redis.RedisCache."
+            ),
+            id="submissions.W001",
+        )
+    ]
@@ -0,0 +1,218 @@
+"""
+Classroom gradebooks.
+
+A gradebook is a student x question matrix with the final grade of each
+student in each question of a classroom. Grades are read from the RESPONSE
+rows of the grade cache (see Graded) in a single query ordered by student,
+and rows are assembled while the query streams. Exports use constant memory
+no matter the size of the class.
+
+CSV is always available. Parquet and Arrow IPC streams require pyarrow.
+"""
+
+import csv
+import io
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, Literal
+
+from ..classrooms.models import Classroom
+from ..questions.models import Question
+from .models import Graded
+
+type Format = Literal["csv", "parquet", "arrow"]
+type Row = tuple[str, str, float, list[float | None]]
+
+#: Content type and file extension of each export format.
+FORMATS: dict[str, tuple[str, str]] = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", ".arrows"),
+}
+
+#: Rows fetched from the database at a time.
+CHUNK_SIZE = 2000
+
+#: Bytes of CSV buffered before they are sent.
+CSV_CHUNK_SIZE = 64 * 1024
+
+#: Students per Parquet row group or Arrow record batch.
+BATCH_SIZE = 1000
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def gradebook_columns(classroom: Classroom) -> dict[tuple[int, int], str]:
+    """
+    Map (exam id, question id) pairs to the names of the gradebook columns.
+
+    Columns are named "<kind>:<exam>/<question>" after the kind and slug of
+    the exam and the slug of the question, in the order exams were created.
+    Exam slugs are only unique among exams of the same kind, so a quiz and an
+    exam named "week-1" get different columns.
+    """
+    questions = (
+        Question.objects.filter(exam__classroom=classroom)
+        .order_by("exam__created", "exam_id", "pk")
+        .values_list("exam_id", "pk", "exam__kind", "exam__slug", "slug")
+    )
+    return {
+        (exam, question): f"{kind}:{exam_slug}/{slug}"
+        for exam, question, kind, exam_slug, slug in questions
+    }
+
+
+def gradebook_rows(
+    classroom: Classroom, columns: Iterable[tuple[int, int]]
+) -> Iterator[Row]:
+    """
+    Yield (username, name, total, grades) for each student of the classroom.
+
+    Grades are listed in the order of columns, with None for questions the
+    student did not answer.
+    """
+    index = {key: i for i, key in enumerate(columns)}
+    grades = (
+        Graded.objects.filter(role=Graded.For.RESPONSE, exam__classroom=classroom)
+        .order_by("student_id")
+        .values_list("student_id", "exam_id", "id", "final_grade")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    students = (
+        classroom.students.order_by("pk")
+        .values_list("pk", "username", "name")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    # Both queries are ordered by student id, so they are merged as they
+    # stream. Grades of users that left the classroom are skipped.
+    groups = groupby(grades, key=itemgetter(0))
+    current = next(groups, None)
+    for student, username, name in students:
+        while current is not None and current[0] < student:
+            current = next(groups, None)
+        row: list[float | None] = [None] * len(index)
+        if current is not None and current[0] == student:
+            for _, exam, question, grade in current[1]:
+                if (i := index.get((exam, question))) is not None:
+                    row[i] = grade
+            current = next(groups, None)
+        yield username, name, sum(grade or 0.0 for grade in row), row
+
+
+def export_gradebook(classroom: Classroom, format: Format = "csv") -> Iterator[bytes]:
+    """
+    Yield the gradebook of a classroom encoded in the given format.
+
+    Raises ImportError if the format requires pyarrow and it is not installed.
+    """
+    columns = gradebook_columns(classroom)
+    rows = gradebook_rows(classroom, columns)
+    header = ["student", "name", "total", *columns.values()]
+    match format:
+        case "csv":
+            return export_csv(header, rows)
+        case "parquet" | "arrow":
+            import pyarrow  # noqa: F401
+
+            return export_arrow(header, rows, format)
+        case _:
+            raise ValueError(f"invalid format: {format}")
+
+
+def export_csv(header: list[str], rows: Iterable[Row]) -> Iterator[bytes]:
+    sink = Sink()
+    writer = csv.writer(io.TextIOWrapper(sink, encoding="utf-8", write_through=True))
+    writer.writerow(header)
+    yield sink.drain()
+    for username, name, total, grades in rows:
+        writer.writerow([username, name, total, *("" if g is None else g for g in grades)])
+        if sink.size >= CSV_CHUNK_SIZE:
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_arrow(
+    header: list[str], rows: Iterable[Row], format: Literal["parquet", "arrow"]
+) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("student", pa.string()),
+            ("name", pa.string()),
+            *((name, pa.float64()) for name in header[2:]),
+        ]
+    )
+    sink = Sink()
+    writer: Any
+    if format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    batch: list[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            writer.write_batch(record_batch(schema, batch))
+            batch.clear()
+            yield sink.drain()
+    if batch:
+        writer.write_batch(record_batch(schema, batch))
+    writer.close()
+    yield sink.drain()
+
+
+def record_batch(schema, rows: list[Row]):
+    import pyarrow as pa
+
+    usernames, names, totals, grades = zip(*rows)
+    arrays = [
+        pa.array(usernames, pa.string()),
+        pa.array(names, pa.string()),
+        pa.array(totals, pa.float64()),
+        *(pa.array(column, pa.float64()) for column in zip(*grades)),
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class Sink(io.RawIOBase):
+    """
+    Write-only file that keeps written bytes until they are drained.
+
+    tell() reports the total number of bytes written, which Parquet writers
+    use to record the offsets of row groups.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        self.size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
@@ -0,0 +1,232 @@
+"""
+Automatic grading of submissions.
+
+Submissions waiting for grading are claimed in batches, grouped by question
+and graded by the grader registered for the question type. A grader is created
+once per question in each batch, so the answer key is parsed once no matter
+how many submissions it grades. Feedback for the whole batch is written with
+a single bulk_create() and the grade cache is updated with Graded.add_feedback().
+
+Choice questions are graded by mdq.grading.grade_batch(), which scores all
+submissions to a question in a single vectorized pass with the same rules
+used by mdq itself.
+
+Scores are percentages in the 0-100 range. The awarded points are the score
+applied to the points of the question.
+
+Question types without a grader, like essays, are graded manually and their
+submissions are never claimed.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Any, ClassVar, Sequence
+
+from django.db import transaction
+from mdq import grading as mdq_grading
+from mdq import models as mdq_models
+from mdq.models.response import MultipleChoiceResponse, TrueFalseResponse
+
+from ..questions.models import Question
+from .models import Feedback, Graded, Submission
+
+Type = Question.Type
+
+#: Errors raised by graders for answers that are not valid.
+INVALID_ANSWER_ERRORS = (ValueError, TypeError, KeyError, AttributeError)
+
+
+@dataclass
+class Grade:
+    """
+    Result of grading a single submission.
+
+    Attributes
+    ----------
+    score:
+        Score as a percentage.
+    data:
+        Feedback shown to the student.
+    """
+
+    score: float
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+INVALID_ANSWER = Grade(0.0, {"error": "invalid-answer"})
+
+
+class Grader(ABC):
+    """
+    Grades submissions to a single question.
+    """
+
+    types: ClassVar[tuple[Question.Type, ...]] = ()
+
+    def __init__(self, question: Question) -> None:
+        self.question = question
+
+    @abstractmethod
+    def grade_all(self, answers: Sequence[Any]) -> list[Grade]:
+        """
+        Grade the data of many submissions.
+
+        Answers that are not valid get INVALID_ANSWER.
+        """
+        raise NotImplementedError
+
+
+GRADERS: dict[str, type[Grader]] = {}
+
+
+def register[G: type[Grader]](cls: G) -> G:
+    """
+    Register a grader for its question types.
+    """
+    for kind in cls.types:
+        GRADERS[kind] = cls
+    return cls
+
+
+def choice_value(choice: dict[str, Any]) -> bool | float | None:
+    """
+    Value of a choice, as stored in the "correct" field of mdq choices.
+
+    Choices imported from mdq store it in the "correct" field. Older choices
+    use "grade" or, in true/false questions, "answer".
+    """
+    for key in ("correct", "grade", "answer"):
+        if (value := choice.get(key)) is not None:
+            return value
+    return None
+
+
+def choice_ids(choices: list[dict[str, Any]]) -> list[str]:
+    """
+    Identifier of each choice used in answers.
+    """
+    return [str(choice.get("id", i)) for i, choice in enumerate(choices)]
+
+
+def choice_question(question: Question) -> mdq_grading.ChoiceQuestion:
+    """
+    The mdq model of a choice question, with the fields used for grading.
+    """
+    data = question.data
+    model = CHOICE_MODELS[question.type]
+    fields = {name: data[name] for name in ("penalty", "grading") if data.get(name) is not None}
+    choices = [
+        {"text": choice.get("text") or str(i), "correct": choice_value(choice)}
+        for i, choice in enumerate(data["choices"])
+    ]
+    return model.model_validate(
+        {
+            "id": question.slug,
+            "title": question.title or question.slug,
+            "stem": question.stem,
+            "choices": choices,
+            **fields,
+        }
+    )
+
+
+@register
+class ChoiceGrader(Grader):
+    """
+    Grades multiple choice, multiple selection and true/false questions.
+
+    Answers are lists of the ids of the selected choices or, in true/false
+    questions, a mapping from ids to the marked values.
+    """
+
+    types = (Type.MULTIPLE_CHOICE, Type.MULTIPLE_SELECTION, Type.TRUE_FALSE)
+
+    def __init__(self, question: Question) -> None:
+        super().__init__(question)
+        self.model = choice_question(question)
+        self.positions = {id: i for i, id in enumerate(choice_ids(question.data["choices"]))}
+
+    def response(self, data: Any) -> mdq_grading.ChoiceResponse:
+        """
+        Convert the data of a submission to an mdq response.
+
+        Raises KeyError if it refers to a choice that does not exist.
+        """
+        # Responses are built without validation: positions are checked here
+        # and grade_batch() only reads the choices.
+        if self.question.type == Type.TRUE_FALSE:
+            answer = {self.positions[str(id)]: bool(value) for id, value in data.items()}
+            return TrueFalseResponse.model_construct(question_id=self.question.slug, answer=answer)
+        selected = sorted({self.positions[str(id)] for id in data})
+        return MultipleChoiceResponse.model_construct(
+            question_id=self.question.slug, selected_choice_ids=selected
+        )
+
+    def grade_all(self, answers: Sequence[Any]) -> list[Grade]:
+        grades: list[Grade] = [INVALID_ANSWER] * len(answers)
+        valid, responses = [], []
+        for i, data in enumerate(answers):
+            try:
+                responses.append(self.response(data))
+            except INVALID_ANSWER_ERRORS:
+                continue
+            valid.append(i)
+        if not responses:
+            return grades
+
+        result = mdq_grading.grade_batch(self.model, responses)
+        for i, score, penalty in zip(valid, result.scores.tolist(), result.penalties.tolist()):
+            data: dict[str, Any] = {"penalty": penalty}
+            if self.question.type != Type.TRUE_FALSE:
+                data["selected"] = [str(id) for id in answers[i]]
+            grades[i] = Grade(score, data)
+        return grades
+
+
+CHOICE_MODELS: dict[str, type[mdq_grading.ChoiceQuestion]] = {
+    Type.MULTIPLE_CHOICE: mdq_models.MultipleChoice,
+    Type.MULTIPLE_SELECTION: mdq_models.MultipleSelection,
+    Type.TRUE_FALSE: mdq_models.TrueFalse,
+}
+
+
+@transaction.atomic
+def grade_waiting(limit: int = 500) -> int:
+    """
+    Grade a batch of at most limit submissions waiting for grading.
+
+    Rows are locked while they are graded and rows locked by other workers
+    are skipped, so concurrent workers never grade the same submission.
+    Return the number of graded submissions.
+    """
+    submissions = list(
+        Submission.objects.filter(waiting_for_grading=True, type__in=list(GRADERS))
+        .select_for_update(skip_locked=True)
+        .only("id", "question_id", "data")
+        .order_by("question_id", "id")[:limit]
+    )
+    if not submissions:
+        return 0
+
+    questions = Question.objects.in_bulk({s.question_id for s in submissions})
+    feedback = []
+    for question_id, group in groupby(submissions, key=lambda s: s.question_id):
+        question = questions[question_id]
+        batch = list(group)
+        grades = GRADERS[question.type](question).grade_all([s.data for s in batch])
+        for submission, grade in zip(batch, grades):
+            feedback.append(
+                Feedback(
+                    submission=submission,
+                    data={"score": grade.score, **grade.data},
+                    awarded_points=question.points * grade.score / 100,
+                )
+            )
+
+    Feedback.objects.bulk_create(feedback)
+    Graded.add_feedback(feedback)
+    Submission.objects.filter(pk__in=[s.pk for s in submissions]).update(
+        waiting_for_grading=False
+    )
+    return len(submissions)
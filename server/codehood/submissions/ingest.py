@@ -0,0 +1,333 @@
+"""
+Asynchronous ingestion of submissions.
+
+Submissions arrive in bursts at the start and at the end of exams. When
+settings.SUBMISSIONS_ASYNC is enabled, the request only validates and hashes
+the answer and hands the unsaved row to a background writer, which upserts
+queued submissions in batches with bulk_create(). Repeated answers hit the
+unique_submission_per_exam_and_question constraint and only refresh the
+modification time of the existing row, just like Submission.new() recycles
+them.
+
+Every submission gets a receipt: a signed reference to the (exam, question,
+student, hash) tuple that identifies its row. Clients use it to confirm that a
+queued submission was stored. Queued submissions are marked as pending in the
+Django cache, which must be shared by all processes (see settings.CACHES) for
+a receipt to be checked by a process other than the one that queued it.
+
+The queue is bounded. When it is full, submissions are written synchronously
+by the request, with the same retries and dead letter handling, so bursts slow
+down requests instead of growing the memory of the process.
+
+Errors never stop the writer thread: failed batches and grading tasks that
+cannot be scheduled are logged, and a new thread is started if it dies anyway.
+
+A batch that cannot be written after MAX_ATTEMPTS is retried one submission
+at a time, so a single bad row does not take the whole batch down. Rows that
+still fail are appended to settings.SUBMISSIONS_DEAD_LETTER, a JSON Lines
+file that the replay_submissions command writes back to the database. Their
+receipts are reported as missing.
+
+Each written batch schedules a grading task (see codehood.submissions.tasks).
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Literal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+
+from .models import Submission, SubmissionEncoder
+from .tasks import schedule_grading
+
+log = logging.getLogger(__name__)
+
+type Status = Literal["stored", "pending", "missing"]
+type Key = tuple[int, int, int, str]
+
+RECEIPT_SALT = "codehood.submissions.receipt"
+PENDING_PREFIX = "codehood.submissions.pending:"
+
+#: Attempts to write a batch before writing it one submission at a time.
+MAX_ATTEMPTS = 5
+
+#: Seconds a queued submission is reported as pending, at most. It only
+#: matters if a process dies with submissions in its queue.
+PENDING_TIMEOUT = 300
+
+#: Fields saved in the dead letter file.
+DEAD_LETTER_FIELDS = ["exam_id", "question_id", "student_id", "type", "data", "ip_address"]
+
+
+def submission_key(submission: Submission) -> Key:
+    """
+    The values of the unique constraint that identifies a submission.
+    """
+    return (
+        submission.exam_id,
+        submission.question_id,
+        submission.student_id,
+        bytes(submission.hash).hex(),
+    )
+
+
+def make_receipt(submission: Submission) -> str:
+    """
+    Receipt id of a submission.
+    """
+    return signing.dumps(submission_key(submission), salt=RECEIPT_SALT, compress=True)
+
+
+def pending_key(key: Key) -> str:
+    """
+    Cache key that marks a submission as queued.
+    """
+    return PENDING_PREFIX + ":".join(map(str, key))
+
+
+def write_submissions(submissions: list[Submission]) -> None:
+    """
+    Insert submissions, refreshing the modification time of repeated answers.
+
+    Resubmitting an answer makes it the latest submission again, like
+    Submission.new() does for recycled submissions.
+    """
+    # An upsert cannot touch the same row twice, so repeated answers in the
+    # same batch are written once.
+    unique = {submission_key(s): s for s in submissions}
+    Submission.objects.bulk_create(
+        list(unique.values()),
+        update_conflicts=True,
+        unique_fields=["exam", "question", "student", "hash"],
+        update_fields=["modified"],
+    )
+
+
+def dead_letter(submissions: Iterable[Submission]) -> int:
+    """
+    Append submissions that could not be written to the dead letter file.
+
+    Return the number of saved submissions.
+    """
+    lines = []
+    for submission in submissions:
+        row: dict[str, Any] = {name: getattr(submission, name) for name in DEAD_LETTER_FIELDS}
+        row["hash"] = bytes(submission.hash).hex()
+        lines.append(json.dumps(row, cls=SubmissionEncoder) + "\n")
+    path = Path(settings.SUBMISSIONS_DEAD_LETTER)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _dead_letter_lock, path.open("a", encoding="utf-8") as fd:
+        fd.writelines(lines)
+    return len(lines)
+
+
+def read_dead_letter(path: Path) -> list[Submission]:
+    """
+    Read the submissions saved in a dead letter file.
+    """
+    submissions = []
+    with path.open(encoding="utf-8") as fd:
+        for line in fd:
+            if line.strip():
+                row = json.loads(line)
+                row["hash"] = bytes.fromhex(row["hash"])
+                submissions.append(Submission(**row))
+    return submissions
+
+
+def read_receipt(receipt: str) -> Key:
+    """
+    Decode a receipt id.
+
+    Raises signing.BadSignature if the receipt was not created by make_receipt().
+    """
+    exam, question, student, digest = signing.loads(receipt, salt=RECEIPT_SALT)
+    return exam, question, student, digest
+
+
+def receipt_status(receipt: str, student_id: int | None = None) -> Status:
+    """
+    Tell if the submission of a receipt was stored or is still in the queue.
+
+    Receipts of other students are reported as missing.
+    """
+    try:
+        key = read_receipt(receipt)
+    except signing.BadSignature:
+        return "missing"
+    exam, question, student, digest = key
+    if student_id is not None and student != student_id:
+        return "missing"
+    if is_pending(key):
+        return "pending"
+    stored = Submission.objects.filter(
+        exam_id=exam,
+        question_id=question,
+        student_id=student,
+        hash=bytes.fromhex(digest),
+    ).exists()
+    return "stored" if stored else "missing"
+
+
+def is_pending(key: Key) -> bool:
+    """
+    Tell if a submission is queued for writing by any process.
+    """
+    return cache.get(pending_key(key)) is not None
+
+
+class SubmissionWriter:
+    """
+    Background thread that writes queued submissions in batches.
+
+    A batch is written when it has batch_size submissions or when interval
+    seconds passed since its first submission arrived.
+    """
+
+    def __init__(
+        self, batch_size: int = 200, interval: float = 0.05, max_pending: int = 10_000
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue[Submission] = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, submission: Submission) -> str:
+        """
+        Queue submission for writing and return its receipt.
+        """
+        self._start()
+        # Marked before it is queued, so the writer always clears the mark.
+        key = pending_key(submission_key(submission))
+        cache.set(key, True, PENDING_TIMEOUT)
+        try:
+            self._queue.put_nowait(submission)
+        except queue.Full:
+            log.warning("submission queue is full, writing synchronously")
+            try:
+                self._write([submission])
+            finally:
+                cache.delete(key)
+        return make_receipt(submission)
+
+    def flush(self) -> None:
+        """
+        Block until all queued submissions are written.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    log.error("submission writer died, starting a new one")
+                else:
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(
+                    target=self._run, name="submission-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                # Keep the thread alive: later submissions must still be written.
+                log.exception("could not write %d submissions", len(batch))
+            finally:
+                self._done(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _done(self, batch: list[Submission]) -> None:
+        cache.delete_many([pending_key(submission_key(s)) for s in batch])
+
+    def _write(self, batch: list[Submission]) -> None:
+        if self._attempt(batch, MAX_ATTEMPTS):
+            self._schedule_grading()
+            return
+
+        # A single bad row fails the whole batch: write rows one by one and
+        # keep the ones that still fail.
+        failed = [s for s in batch if not self._attempt([s], 1)]
+        if len(failed) < len(batch):
+            self._schedule_grading()
+        if failed:
+            try:
+                dead_letter(failed)
+            except OSError:
+                log.exception("could not save %d submissions", len(failed))
+            else:
+                log.error("saved %d submissions to the dead letter file", len(failed))
+
+    def _schedule_grading(self) -> None:
+        # Written submissions wait for grading in the database, so a broker
+        # error only delays them until the next batch schedules a task.
+        try:
+            schedule_grading()
+        except Exception:
+            log.exception("could not schedule grading")
+
+    def _attempt(self, batch: list[Submission], attempts: int) -> bool:
+        for attempt in range(1, attempts + 1):
+            if threading.current_thread() is self._thread:
+                # Requests that write synchronously keep their own connection.
+                close_old_connections()
+            try:
+                write_submissions(batch)
+                return True
+            except DatabaseError:
+                if attempt == attempts:
+                    log.exception("could not write %d submissions", len(batch))
+                    return False
+                # SQLite reports "database is locked" under heavy write load.
+                time.sleep(0.05 * 2**attempt)
+        return False
+
+
+_dead_letter_lock = threading.Lock()
+_writer: SubmissionWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> SubmissionWriter:
+    """
+    The writer of this process, created on first use from settings.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SubmissionWriter(
+                    batch_size=settings.SUBMISSIONS_BATCH_SIZE,
+                    interval=settings.SUBMISSIONS_FLUSH_INTERVAL,
+                    max_pending=settings.SUBMISSIONS_MAX_PENDING,
+                )
+    return _writer
+
+
+def enqueue(submission: Submission) -> str:
+    """
+    Queue an unsaved submission for writing and return its receipt.
+    """
+    return get_writer().submit(submission)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from codehood.exams.models import Exam
+from codehood.submissions.models import Graded
+from codehood.text import gettext_lazy as _
+
+
+class Command(BaseCommand):
+    help = _("Rebuild the grade cache from feedback")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "exams",
+            nargs="*",
+            type=str,
+            help=_("Slugs of the exams to rebuild. Rebuild all exams if omitted."),
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.filter(slug__in=options["exams"]) if options["exams"] else None
+        count = Graded.rebuild(exams)
+        self.stdout.write(self.style.SUCCESS(_("Graded %d submissions") % count))
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from codehood.submissions import ingest
+from codehood.submissions.tasks import schedule_grading
+from codehood.text import gettext_lazy as _
+
+
+class Command(BaseCommand):
+    help = _("Write submissions saved in the dead letter file to the database")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            type=Path,
+            help=_("Dead letter file. Defaults to settings.SUBMISSIONS_DEAD_LETTER."),
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or Path(settings.SUBMISSIONS_DEAD_LETTER)
+        if not path.exists():
+            self.stdout.write(_("No dead letter file at %s") % path)
+            return
+
+        submissions = ingest.read_dead_letter(path)
+        ingest.write_submissions(submissions)
+        path.unlink()
+        schedule_grading()
+        self.stdout.write(self.style.SUCCESS(_("Wrote %d submissions") % len(submissions)))
@@ -1,6 +1,11 @@
+from itertools import groupby
 from json import JSONEncoder
-from typing import Any
-from django.db import models
+from operator import itemgetter
+from typing import Any, Iterable
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from model_utils.models import TimeStampedModel
 
@@ -10,6 +15,27 @@ from ..exams.models import Exam
 from ..questions.models import Question
 from ..users.models import User
 
+#: A (final grade, awarded points) pair. Pairs compare by final grade first.
+type Score = tuple[float, float]
+type ResponseKey = tuple[int, int, int]
+
+#: Rows written per INSERT statement.
+BATCH_SIZE = 1000
+
+#: Awarded points and final grade of feedback rows, as computed by
+#: Feedback.score.
+AWARDED_POINTS = Coalesce(F("awarded_points"), 0.0)
+FINAL_GRADE = models.Case(
+    models.When(awarded_points__isnull=True, then=models.Value(0.0)),
+    default=(
+        F("awarded_points")
+        - F("delay_penalty")
+        - F("resubmission_penalty")
+        + F("arbitrary_adjustment")
+    ),
+    output_field=models.FloatField(),
+)
+
 
 class SubmissionEncoder(JSONEncoder):
     """
@@ -18,7 +44,7 @@ class SubmissionEncoder(JSONEncoder):
 
     def default(self, obj: Any) -> Any:
         if isinstance(obj, set):
-            return [self.encode(item) for item in obj]
+            return sorted(obj)
         return super().default(obj)
 
 
@@ -102,9 +128,28 @@ class Submission(TimeStampedModel):
             hash=question.hash_answer(data),
         )
         new.recycled = not is_created
-        new.save()
+        if new.recycled:
+            # Resubmitting an answer makes it the latest submission again.
+            new.save(update_fields=["modified"])
         return new
 
+    @classmethod
+    def build(
+        cls, request: AuthenticatedRequest, exam: Exam, question: Question, data: Any
+    ) -> "Submission":
+        """
+        Create an unsaved submission, validating and hashing the answer.
+        """
+        return cls(
+            exam=exam,
+            question=question,
+            student=request.user,
+            type=question.type,
+            data=data,
+            hash=question.hash_answer(data),
+            ip_address=request.META.get("REMOTE_ADDR", ""),
+        )
+
 
 class Feedback(TimeStampedModel):
     submission = models.ForeignKey(
@@ -152,6 +197,14 @@ class Feedback(TimeStampedModel):
         ),
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Graded.add_feedback([self])
+
+    @property
+    def score(self) -> Score:
+        return self.compute_final_grade(), self.awarded_points or 0.0
+
     def compute_final_grade(self):
         """
         Compute the final grade for this feedback.
@@ -170,7 +223,18 @@ class Feedback(TimeStampedModel):
 
 class Graded(models.Model):
     """
-    Generic grade cache for Exams, Responses and Submissions.
+    Materialized grades of students in submissions, responses and exams.
+
+    * SUBMISSION grades are the latest feedback given to a submission. Their id
+      is the id of the submission.
+    * RESPONSE grades are the best submission of a student to a question.
+      Their id is the id of the question.
+    * EXAM grades are the sum of the responses of a student in an exam. Their
+      id is the id of the exam.
+
+    Grades are updated incrementally by add_feedback() whenever feedback is
+    saved and can be rebuilt from scratch with rebuild() or the rebuild_grades
+    command.
     """
 
     class For(models.IntegerChoices):
@@ -178,11 +242,257 @@ class Graded(models.Model):
         RESPONSE = 2, _("Response")
         SUBMISSION = 3, _("Submission")
 
-    pk = models.CompositePrimaryKey("id", "role")  # type: ignore
-    id = models.IntegerField()
+    pk = models.CompositePrimaryKey("role", "id", "student")  # type: ignore
     role = models.PositiveSmallIntegerField(choices=For.choices)
-    awarded_points = models.FloatField()
-    final_grade = models.FloatField()
+    id = models.IntegerField(help_text=_("Id of the submission, question or exam"))
+    student = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        related_name="grades",
+    )
+    exam = models.ForeignKey(
+        to=Exam,
+        on_delete=models.CASCADE,
+        related_name="grades",
+    )
+    awarded_points = models.FloatField(default=0.0)
+    final_grade = models.FloatField(default=0.0)
+    objects: models.Manager["Graded"]
+
+    class Meta:
+        indexes = [models.Index(fields=["exam", "role"])]
+        verbose_name = _("grade")
+        verbose_name_plural = _("grades")
+
+    @property
+    def score(self) -> Score:
+        return self.final_grade, self.awarded_points
+
+    def recalculate(self) -> None:
+        """
+        Recompute this grade from the grades below it and save it.
+
+        Responses are recomputed from the grades of their submissions and
+        exams from the grades of their responses.
+        """
+        match self.role:
+            case self.For.SUBMISSION:
+                feedback = (
+                    Feedback.objects.filter(submission_id=self.id)
+                    .order_by("-modified", "-pk")
+                    .first()
+                )
+                score = feedback.score if feedback else (0.0, 0.0)
+            case self.For.RESPONSE:
+                score = best_submission(self.exam_id, self.id, self.student_id)
+            case self.For.EXAM:
+                totals = Graded.objects.filter(
+                    role=self.For.RESPONSE,
+                    exam_id=self.exam_id,
+                    student_id=self.student_id,
+                ).aggregate(
+                    final_grade=Coalesce(models.Sum("final_grade"), 0.0),
+                    awarded_points=Coalesce(models.Sum("awarded_points"), 0.0),
+                )
+                score = totals["final_grade"], totals["awarded_points"]
+        self.final_grade, self.awarded_points = score
+        self.save()
+
+    @classmethod
+    @transaction.atomic
+    def add_feedback(cls, feedback: Iterable["Feedback"]) -> None:
+        """
+        Update the grades affected by new or changed feedback.
+
+        Missing exam totals and responses are created first and every
+        affected row is locked before it is read, so concurrent graders of
+        the same student wait for each other instead of counting the same
+        response twice. Totals are locked before responses, in a fixed order,
+        and act as the lock of all grades of a student in an exam.
+
+        Rows of the affected submissions and responses are replaced, and the
+        exam totals are incremented by the change of their responses. The
+        number of queries does not depend on the number of feedback rows,
+        unless feedback lowers the best submission of a response, which is
+        then recomputed from its submissions.
+        """
+        latest = {fb.submission_id: fb.score for fb in feedback}
+        owners: dict[int, ResponseKey] = {
+            pk: (exam, question, student)
+            for pk, exam, question, student in Submission.objects.filter(
+                pk__in=latest
+            ).values_list("pk", "exam_id", "question_id", "student_id")
+        }
+        if not owners:
+            return
+        keys = set(owners.values())
+        students = {student for _, _, student in keys}
+        exams = {(exam, student) for exam, _, student in keys}
+
+        For = cls.For
+        cls.objects.bulk_create(
+            [cls.make(For.EXAM, exam, exam, student) for exam, student in exams],
+            ignore_conflicts=True,
+        )
+        totals = {
+            (total.exam_id, total.student_id): total
+            for total in cls.objects.select_for_update()
+            .filter(role=For.EXAM, id__in={exam for exam, _ in exams}, student__in=students)
+            .order_by("id", "student")
+            if (total.exam_id, total.student_id) in exams
+        }
+
+        # Nobody else can write these responses while we hold the totals, so
+        # the ones that do not exist yet are new to this transaction. They are
+        # created right away and stay locked by it until it commits.
+        old_responses: dict[ResponseKey, Score] = {
+            (grade.exam_id, grade.id, grade.student_id): grade.score
+            for grade in cls.objects.select_for_update()
+            .filter(
+                role=For.RESPONSE,
+                id__in={question for _, question, _ in keys},
+                student__in=students,
+            )
+            .order_by("id", "student")
+        }
+        cls.objects.bulk_create(
+            [
+                cls.make(For.RESPONSE, question, exam, student)
+                for exam, question, student in keys - old_responses.keys()
+            ],
+            ignore_conflicts=True,
+        )
+        old_submissions = {
+            grade.id: grade.score
+            for grade in cls.objects.select_for_update()
+            .filter(role=For.SUBMISSION, id__in=owners)
+            .order_by("id", "student")
+        }
+
+        responses: dict[ResponseKey, Score] = {}
+        stale: set[ResponseKey] = set()
+        for pk, key in owners.items():
+            score = latest[pk]
+            best = responses.get(key, old_responses.get(key))
+            if best is None or score >= best:
+                responses[key] = score
+            elif old_submissions.get(pk) == best:
+                stale.add(key)
+
+        cls.upsert(
+            cls.make(For.SUBMISSION, pk, exam, student, latest[pk])
+            for pk, (exam, _, student) in owners.items()
+        )
+        for key in stale:
+            responses[key] = best_submission(*key)
+        cls.upsert(
+            cls.make(For.RESPONSE, question, exam, student, score)
+            for (exam, question, student), score in responses.items()
+        )
+
+        for (exam, question, student), (final, awarded) in responses.items():
+            old_final, old_awarded = old_responses.get((exam, question, student), (0.0, 0.0))
+            total = totals[exam, student]
+            total.final_grade += final - old_final
+            total.awarded_points += awarded - old_awarded
+        cls.upsert(totals.values())
+
+    @classmethod
+    def make(
+        cls, role: For, id: int, exam: int, student: int, score: Score = (0.0, 0.0)
+    ) -> "Graded":
+        final_grade, awarded_points = score
+        return cls(
+            role=role,
+            id=id,
+            exam_id=exam,
+            student_id=student,
+            final_grade=final_grade,
+            awarded_points=awarded_points,
+        )
+
+    @classmethod
+    def upsert(cls, grades: Iterable["Graded"]) -> None:
+        """
+        Insert grades, replacing the values of existing rows.
+        """
+        cls.objects.bulk_create(
+            list(grades),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["role", "id", "student"],
+            update_fields=["awarded_points", "final_grade"],
+        )
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, exams: models.QuerySet[Exam] | None = None) -> int:
+        """
+        Recompute all grades from feedback, optionally only for some exams.
 
-    def recalculate(self):
-        raise NotImplementedError
+        Submissions are read in a single query, ordered so that responses and
+        exam totals are computed as they stream. Return the number of graded
+        submissions.
+        """
+        submissions = Submission.objects.all()
+        grades = cls.objects.all()
+        if exams is not None:
+            submissions = submissions.filter(exam__in=exams)
+            grades = grades.filter(exam__in=exams)
+        grades.delete()
+
+        latest = Feedback.objects.filter(submission=OuterRef("pk")).order_by(
+            "-modified", "-pk"
+        )
+        rows = (
+            submissions.annotate(
+                final=Subquery(latest.annotate(value=FINAL_GRADE).values("value")[:1]),
+                awarded=Subquery(latest.annotate(value=AWARDED_POINTS).values("value")[:1]),
+            )
+            .filter(final__isnull=False)
+            .order_by("exam_id", "student_id", "question_id")
+            .values_list("pk", "exam_id", "student_id", "question_id", "final", "awarded")
+        )
+
+        For = cls.For
+        count = 0
+        buffer: list[Graded] = []
+        for (exam, student), group in groupby(
+            rows.iterator(chunk_size=BATCH_SIZE), key=itemgetter(1, 2)
+        ):
+            total = [0.0, 0.0]
+            for question, responses in groupby(group, key=itemgetter(3)):
+                best = None
+                for pk, *_, final, awarded in responses:
+                    buffer.append(cls.make(For.SUBMISSION, pk, exam, student, (final, awarded)))
+                    best = max(best or (final, awarded), (final, awarded))
+                    count += 1
+                assert best is not None
+                buffer.append(cls.make(For.RESPONSE, question, exam, student, best))
+                total[0] += best[0]
+                total[1] += best[1]
+            buffer.append(cls.make(For.EXAM, exam, exam, student, (total[0], total[1])))
+            if len(buffer) >= BATCH_SIZE:
+                cls.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+                buffer.clear()
+        cls.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+        return count
+
+
+def best_submission(exam: int, question: int, student: int) -> Score:
+    """
+    Best grade among the submissions of a student to a question.
+    """
+    best = (
+        Graded.objects.filter(
+            role=Graded.For.SUBMISSION,
+            student_id=student,
+            id__in=Submission.objects.filter(
+                exam_id=exam, question_id=question, student_id=student
+            ).values("pk"),
+        )
+        .order_by("-final_grade", "-awarded_points")
+        .values_list("final_grade", "awarded_points")
+        .first()
+    )
+    return best or (0.0, 0.0)
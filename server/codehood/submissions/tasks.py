@@ -0,0 +1,61 @@
+"""
+Celery tasks for grading submissions.
+
+New submissions call schedule_grading(), which starts a grading task after
+settings.GRADING_DELAY seconds unless one is already scheduled. Submissions
+that arrive in the meantime are graded by the same task, so bursts become a
+few large batches instead of one task per submission.
+
+Each task grades at most settings.GRADING_BATCH_SIZE submissions. When a
+batch is full, the task schedules itself again instead of draining the whole
+queue, so a backlog never holds a worker or a transaction for long.
+
+Scheduled tasks are tracked in the Django cache. It must be shared by all
+processes (see settings.CACHES and the submissions.W001 check), otherwise each
+process schedules its own tasks and batches get smaller.
+"""
+
+from celery import shared_task  # type: ignore[import-untyped]
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from . import grading
+
+SCHEDULED_KEY = "codehood.submissions.grading-scheduled"
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=5,
+    acks_late=True,
+)
+def grade_pending(limit: int | None = None) -> int:
+    """
+    Grade a batch of submissions waiting for grading.
+
+    Return the number of graded submissions.
+    """
+    limit = limit or settings.GRADING_BATCH_SIZE
+    cache.delete(SCHEDULED_KEY)
+    graded = grading.grade_waiting(limit)
+    if graded >= limit:
+        schedule_grading(delay=0)
+    return graded
+
+
+def schedule_grading(delay: float | None = None) -> None:
+    """
+    Schedule a grading task, unless one is already waiting to start.
+    """
+    delay = settings.GRADING_DELAY if delay is None else delay
+    if not cache.add(SCHEDULED_KEY, True, timeout=delay + 60):
+        return
+    try:
+        grade_pending.apply_async(countdown=delay)
+    except Exception:
+        # Nothing was scheduled: let the next submission try again.
+        cache.delete(SCHEDULED_KEY)
+        raise
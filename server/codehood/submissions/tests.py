@@ -1,3 +1,472 @@
-from django.test import TestCase
+import csv
+import io
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..classrooms import fixtures as classroom_fixtures
+from ..exams.models import Exam
+from ..questions.models import Question
+from ..users import fixtures as user_fixtures
+from . import gradebook, grading, ingest, tasks
+from .models import Feedback, Graded, Submission
+
+
+class SubmissionsFixtures:
+    """
+    An exam with a multiple choice and a multiple selection question and a
+    few enrolled students.
+    """
+
+    def setUp(self):
+        # Fixtures are cached, but the database is rolled back after each test.
+        user_fixtures.user.cache_clear()
+        classroom_fixtures.discipline.cache_clear()
+        classroom_fixtures.classroom.cache_clear()
+        cache.clear()
+
+        self.classroom = classroom_fixtures.classroom(exams=0)
+        self.exam = Exam.objects.create(
+            classroom=self.classroom,
+            owner=self.classroom.instructor,
+            slug="midterm",
+            title="Midterm",
+            description="Midterm",
+            kind=Exam.Kind.EXAM,
+        )
+        self.mc = Question.objects.create(
+            exam=self.exam,
+            slug="capitals",
+            title="Capitals",
+            type=Question.Type.MULTIPLE_CHOICE,
+            stem="What is the capital of France?",
+            points=2.0,
+            data={"choices": [{"text": "Lyon"}, {"text": "Paris", "correct": True}]},
+        )
+        self.ms = Question.objects.create(
+            exam=self.exam,
+            slug="primes",
+            title="Primes",
+            type=Question.Type.MULTIPLE_SELECTION,
+            stem="Select the prime numbers.",
+            data={
+                "choices": [
+                    {"text": "2", "correct": True},
+                    {"text": "4", "correct": False},
+                    {"text": "5", "correct": True},
+                ]
+            },
+        )
+        self.students = [user_fixtures.student(i) for i in range(3)]
+        for student in self.students:
+            self.classroom.enroll_student(student)
+
+    def build(self, question, data, student=None) -> Submission:
+        return Submission(
+            exam=self.exam,
+            question=question,
+            student=student or self.students[0],
+            type=question.type,
+            data=data,
+            hash=question.hash_answer(data),
+        )
+
+
+class SubmissionsTestCase(SubmissionsFixtures, TestCase):
+    pass
+
+
+def grades(exam: Exam) -> dict[tuple[int, int, int], tuple[float, float]]:
+    return {
+        (role, id, student): (final, awarded)
+        for role, id, student, final, awarded in Graded.objects.filter(exam=exam).values_list(
+            "role", "id", "student_id", "final_grade", "awarded_points"
+        )
+    }
+
+
+class IngestTestCase(SubmissionsTestCase):
+    def test_recycled_answers_refresh_modified(self):
+        ingest.write_submissions([self.build(self.mc, {"1"})])
+        first = Submission.objects.get()
+        Submission.objects.update(modified=first.modified - timedelta(hours=1))
+
+        ingest.write_submissions([self.build(self.mc, {"1"}), self.build(self.mc, {"1"})])
+        second = Submission.objects.get()
+        self.assertEqual(second.pk, first.pk)
+        self.assertGreater(second.modified, first.modified - timedelta(hours=1))
+
+    def test_receipts_are_pending_until_written(self):
+        writer = ingest.SubmissionWriter(interval=0)
+        submission = self.build(self.mc, {"1"})
+        with mock.patch.object(ingest.SubmissionWriter, "_start"):
+            receipt = writer.submit(submission)
+
+        # Any process sharing the cache sees the submission as pending.
+        key = ingest.read_receipt(receipt)
+        self.assertTrue(ingest.is_pending(key))
+        self.assertEqual(ingest.receipt_status(receipt), "pending")
+
+        batch = [writer._queue.get_nowait()]
+        with mock.patch.object(ingest, "schedule_grading"):
+            writer._write(batch)
+        writer._done(batch)
+        self.assertFalse(ingest.is_pending(key))
+        self.assertEqual(ingest.receipt_status(receipt), "stored")
+        self.assertEqual(ingest.receipt_status(receipt, student_id=self.students[1].pk), "missing")
+
+    def test_grading_errors_do_not_stop_the_writer(self):
+        writer = ingest.SubmissionWriter()
+        with mock.patch.object(ingest, "schedule_grading", side_effect=OSError) as schedule:
+            writer._write([self.build(self.mc, {"1"})])
+        schedule.assert_called_once()
+        self.assertTrue(Submission.objects.exists())
+
+    def test_dead_writer_is_replaced(self):
+        writer = ingest.SubmissionWriter()
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        writer._thread = dead
+
+        with mock.patch.object(ingest.SubmissionWriter, "_run") as run:
+            writer._start()
+            writer._thread.join()
+        self.assertIsNot(writer._thread, dead)
+        run.assert_called_once()
+
+    def test_full_queue_writes_and_schedules_grading(self):
+        writer = ingest.SubmissionWriter(max_pending=1)
+        queued = self.build(self.mc, {"1"})
+        overflow = self.build(self.mc, {"0"}, student=self.students[1])
+        with (
+            mock.patch.object(ingest.SubmissionWriter, "_start"),
+            mock.patch.object(ingest, "schedule_grading") as schedule,
+        ):
+            writer.submit(queued)
+            receipt = writer.submit(overflow)
+
+        schedule.assert_called_once()
+        self.assertEqual(ingest.receipt_status(receipt), "stored")
+        self.assertEqual(Submission.objects.get().student, self.students[1])
+
+    def test_failed_batches_are_dead_lettered_and_replayed(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name, "dead.jsonl")
+        writer = ingest.SubmissionWriter()
+        good = self.build(self.mc, {"1"})
+        bad = self.build(self.ms, ["0", "2"], student=self.students[1])
+
+        def write(batch):
+            if any(s is bad for s in batch):
+                raise DatabaseError("database is locked")
+            Submission.objects.bulk_create(batch)
+
+        with (
+            override_settings(SUBMISSIONS_DEAD_LETTER=path),
+            mock.patch.object(ingest, "write_submissions", write),
+            mock.patch.object(ingest, "schedule_grading") as schedule,
+            mock.patch.object(ingest.time, "sleep"),
+        ):
+            writer._write([good, bad])
+
+        # The good row is written on its own, the bad one is saved for later.
+        schedule.assert_called_once()
+        self.assertEqual(list(Submission.objects.values_list("question_id", flat=True)), [self.mc.pk])
+        self.assertEqual(len(ingest.read_dead_letter(path)), 1)
+
+        command = "codehood.submissions.management.commands.replay_submissions"
+        with mock.patch(f"{command}.schedule_grading"):
+            call_command("replay_submissions", str(path))
+        self.assertFalse(path.exists())
+        replayed = Submission.objects.get(question=self.ms)
+        self.assertEqual((replayed.student, replayed.data), (self.students[1], ["0", "2"]))
+
+
+class GradingTestCase(SubmissionsTestCase):
+    def submit(self, question, data, student=None) -> Submission:
+        submission = self.build(question, data, student)
+        submission.save()
+        return submission
+
+    def test_grade_waiting_uses_mdq_grading(self):
+        right = self.submit(self.mc, ["1"])
+        wrong = self.submit(self.mc, ["0"], student=self.students[1])
+        partial = self.submit(self.ms, ["0", "1"])
+        invalid = self.submit(self.ms, ["7"], student=self.students[1])
+
+        self.assertEqual(grading.grade_waiting(), 4)
+        feedback = {f.submission_id: f for f in Feedback.objects.all()}
+        self.assertEqual(feedback[right.pk].data["score"], 100.0)
+        self.assertEqual(feedback[right.pk].awarded_points, 2.0)
+        self.assertEqual(feedback[wrong.pk].data["score"], 0.0)
+        self.assertAlmostEqual(feedback[partial.pk].data["score"], 100 / 3)
+        self.assertEqual(feedback[invalid.pk].data["error"], "invalid-answer")
+        self.assertFalse(Submission.objects.filter(waiting_for_grading=True).exists())
+
+    def test_legacy_choices_are_converted(self):
+        self.mc.data = {
+            "choices": [{"id": "a", "text": "Lyon"}, {"id": "b", "text": "Paris", "grade": 100.0}]
+        }
+        self.mc.save()
+        grader = grading.ChoiceGrader(self.mc)
+        result = grader.grade_all([["b"], ["a"], ["c"]])
+        self.assertEqual([g.score for g in result], [100.0, 0.0, 0.0])
+        self.assertEqual(result[2], grading.INVALID_ANSWER)
+
+    def test_grading_is_scheduled_once(self):
+        with mock.patch.object(tasks.grade_pending, "apply_async") as apply_async:
+            tasks.schedule_grading()
+            tasks.schedule_grading()
+        apply_async.assert_called_once()
+
+    def test_failed_scheduling_is_retried(self):
+        with mock.patch.object(tasks.grade_pending, "apply_async", side_effect=OSError):
+            with self.assertRaises(OSError):
+                tasks.schedule_grading()
+        self.assertIsNone(cache.get(tasks.SCHEDULED_KEY))
+
+        with mock.patch.object(tasks.grade_pending, "apply_async") as apply_async:
+            tasks.schedule_grading()
+        apply_async.assert_called_once()
+
+    def test_tasks_run_on_the_memory_broker(self):
+        # The testing settings run tasks eagerly on the in-memory broker.
+        self.submit(self.mc, ["1"])
+        self.submit(self.ms, ["0", "2"])
+        tasks.schedule_grading(delay=0)
+
+        self.assertFalse(Submission.objects.filter(waiting_for_grading=True).exists())
+        self.assertEqual(
+            sorted(Feedback.objects.values_list("data__score", flat=True)), [100.0, 100.0]
+        )
+        self.assertIsNone(cache.get(tasks.SCHEDULED_KEY))
+
+    def test_full_batches_schedule_another_task(self):
+        for student in self.students:
+            self.submit(self.mc, ["1"], student=student)
+
+        self.assertEqual(tasks.grade_pending.delay(limit=2).get(), 2)
+        # The follow-up task graded the rest of the backlog.
+        self.assertEqual(Feedback.objects.count(), 3)
+
+
+class GradedTestCase(SubmissionsTestCase):
+    def feedback(self, question, data, points, student=None, **kwargs) -> Feedback:
+        submission = self.build(question, data, student)
+        submission.save()
+        return Feedback.objects.create(
+            submission=submission, data={}, awarded_points=points, **kwargs
+        )
+
+    def total(self, student) -> tuple[float, float]:
+        return Graded.objects.get(role=Graded.For.EXAM, id=self.exam.pk, student=student).score
+
+    def response(self, question, student) -> tuple[float, float]:
+        return Graded.objects.get(role=Graded.For.RESPONSE, id=question.pk, student=student).score
+
+    def test_first_submissions_are_counted_once(self):
+        student = self.students[0]
+        self.feedback(self.mc, ["0"], 1.0)
+        self.feedback(self.mc, ["1"], 2.0)
+        self.feedback(self.ms, ["0"], 0.5)
+
+        self.assertEqual(self.response(self.mc, student), (2.0, 2.0))
+        self.assertEqual(self.total(student), (2.5, 2.5))
+
+    def test_new_submissions_in_the_same_batch_are_counted_once(self):
+        submissions = [self.build(self.mc, ["0"]), self.build(self.mc, ["1"])]
+        Submission.objects.bulk_create(submissions)
+        feedback = Feedback.objects.bulk_create(
+            [Feedback(submission=s, data={}, awarded_points=p) for s, p in zip(submissions, [1, 2])]
+        )
+        Graded.add_feedback(feedback)
+
+        self.assertEqual(self.total(self.students[0]), (2.0, 2.0))
+
+    def test_negative_first_response_is_kept(self):
+        self.feedback(self.mc, ["0"], 0.0, arbitrary_adjustment=-1.0)
+        self.assertEqual(self.response(self.mc, self.students[0]), (-1.0, 0.0))
+        self.assertEqual(self.total(self.students[0]), (-1.0, 0.0))
+
+    def test_lower_feedback_recomputes_the_best_submission(self):
+        best = self.feedback(self.mc, ["1"], 2.0)
+        self.feedback(self.mc, ["0"], 1.0)
+        Feedback.objects.create(submission=best.submission, data={}, awarded_points=0.0)
+
+        self.assertEqual(self.response(self.mc, self.students[0]), (1.0, 1.0))
+        self.assertEqual(self.total(self.students[0]), (1.0, 1.0))
+
+    def test_rebuild_matches_incremental_grades(self):
+        for i, student in enumerate(self.students):
+            self.feedback(self.mc, ["0"], 1.0, student=student)
+            self.feedback(self.mc, ["1"], 2.0 - i, student=student)
+            self.feedback(self.ms, ["0", "2"], 0.5 * i, student=student)
+        incremental = grades(self.exam)
+
+        self.assertEqual(Graded.rebuild(), 9)
+        self.assertEqual(grades(self.exam), incremental)
+
+    def test_rebuild_only_touches_selected_exams(self):
+        self.feedback(self.mc, ["1"], 2.0)
+        other = Exam.objects.create(
+            classroom=self.classroom,
+            owner=self.classroom.instructor,
+            slug="final",
+            title="Final",
+            description="Final",
+            kind=Exam.Kind.EXAM,
+        )
+        Graded.objects.filter(exam=self.exam).update(final_grade=0.0)
+        Graded.objects.create(role=Graded.For.EXAM, id=other.pk, exam=other, student=self.students[0])
+
+        self.assertEqual(Graded.rebuild(Exam.objects.filter(pk=self.exam.pk)), 1)
+        self.assertEqual(self.total(self.students[0]), (2.0, 2.0))
+        self.assertTrue(Graded.objects.filter(exam=other).exists())
+
+
+@unittest.skipUnless(
+    connection.features.has_select_for_update, "the database does not lock rows"
+)
+class ConcurrentGradingTestCase(SubmissionsFixtures, TransactionTestCase):
+    """
+    Graders in different transactions must not count the same response twice.
+    """
+
+    def test_concurrent_first_submissions(self):
+        submissions = [self.build(self.mc, [str(i)]) for i in range(2)]
+        Submission.objects.bulk_create(submissions)
+        barrier = threading.Barrier(len(submissions))
+        errors = []
+
+        def grade(submission, points):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    Feedback.objects.create(submission=submission, data={}, awarded_points=points)
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=grade, args=(s, p)) for s, p in zip(submissions, [1.0, 2.0])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = Graded.objects.get(role=Graded.For.EXAM, id=self.exam.pk, student=self.students[0])
+        self.assertEqual(total.score, (2.0, 2.0))
+
+
+class GradebookTestCase(SubmissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Exam.objects.create(
+            classroom=self.classroom,
+            owner=self.classroom.instructor,
+            slug="midterm",
+            title="Midterm quiz",
+            description="Midterm quiz",
+            kind=Exam.Kind.QUIZ,
+        )
+        self.warmup = Question.objects.create(
+            exam=self.quiz,
+            slug="capitals",
+            title="Capitals",
+            type=Question.Type.MULTIPLE_CHOICE,
+            stem="What is the capital of Italy?",
+            data={"choices": [{"text": "Rome", "correct": True}]},
+        )
+        first, _, last = self.students
+        self.grade(first, self.mc, 2.0)
+        self.grade(first, self.warmup, 1.0)
+        self.grade(last, self.ms, 0.5)
+        # Students that left the classroom keep their grades, but are not listed.
+        self.classroom.students.remove(self.students[1])
+        self.grade(self.students[1], self.mc, 1.0)
+        self.grade(user_fixtures.student(3), self.mc, 1.0)
+
+    def grade(self, student, question, final_grade):
+        Graded.objects.create(
+            role=Graded.For.RESPONSE,
+            id=question.pk,
+            exam=question.exam,
+            student=student,
+            final_grade=final_grade,
+        )
+
+    def expected(self):
+        first, _, last = self.students
+        return [
+            (first.username, first.name, 3.0, [2.0, None, 1.0]),
+            (last.username, last.name, 0.5, [None, 0.5, None]),
+        ]
+
+    def export(self, format):
+        return b"".join(gradebook.export_gradebook(self.classroom, format))
+
+    def test_columns_of_exams_with_the_same_slug_do_not_collide(self):
+        columns = gradebook.gradebook_columns(self.classroom)
+        self.assertEqual(
+            list(columns.values()),
+            ["exam:midterm/capitals", "exam:midterm/primes", "quiz:midterm/capitals"],
+        )
+
+    def test_rows_merge_students_and_grades(self):
+        columns = gradebook.gradebook_columns(self.classroom)
+        self.assertEqual(list(gradebook.gradebook_rows(self.classroom, columns)), self.expected())
+
+    def test_csv_export(self):
+        with mock.patch.object(gradebook, "CSV_CHUNK_SIZE", 1):
+            chunks = list(gradebook.export_gradebook(self.classroom, "csv"))
+        self.assertGreater(len(chunks), 2)
+
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(rows[0][:3], ["student", "name", "total"])
+        self.assertEqual(rows[0][3:], list(gradebook.gradebook_columns(self.classroom).values()))
+        first, last = self.expected()
+        self.assertEqual(rows[1], [first[0], first[1], "3.0", "2.0", "", "1.0"])
+        self.assertEqual(rows[2], [last[0], last[1], "0.5", "", "0.5", ""])
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            self.export("xlsx")
+
+    def assert_table(self, table):
+        header = ["student", "name", "total", *gradebook.gradebook_columns(self.classroom).values()]
+        self.assertEqual(table.column_names, header)
+        rows = [(r[0], r[1], r[2], r[3:]) for r in zip(*table.to_pydict().values())]
+        self.assertEqual(rows, [(u, n, t, list(g)) for u, n, t, g in self.expected()])
+
+    @unittest.skipUnless(gradebook.has_pyarrow(), "pyarrow is not installed")
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+
+        with mock.patch.object(gradebook, "BATCH_SIZE", 1):
+            data = self.export("parquet")
+        self.assertEqual(pq.ParquetFile(io.BytesIO(data)).num_row_groups, 2)
+        self.assert_table(pq.read_table(io.BytesIO(data)))
+
+    @unittest.skipUnless(gradebook.has_pyarrow(), "pyarrow is not installed")
+    def test_arrow_export(self):
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        with mock.patch.object(gradebook, "BATCH_SIZE", 1):
+            data = self.export("arrow")
+        batches = list(pa.ipc.open_stream(data))
+        self.assertEqual(len(batches), 2)
+        self.assert_table(pa.Table.from_batches(batches))
@@ -107,6 +107,45 @@ STATIC_ROOT = Path(env("STATIC_ROOT", BASE_DIR / "collect" / "static/"))
 MEDIA_ROOT = Path(env("MEDIA_ROOT", BASE_DIR / "collect" / "media"))
 MEDIA_URL = env("MEDIA_URL", "media/")
 
+# Submissions
+# If true, submissions are queued by requests and written in batches by a
+# background thread (see codehood.submissions.ingest).
+SUBMISSIONS_ASYNC = False
+SUBMISSIONS_BATCH_SIZE = 200
+SUBMISSIONS_FLUSH_INTERVAL = 0.05
+SUBMISSIONS_MAX_PENDING = 10_000
+# Submissions that could not be written are appended to this file. Run the
+# replay_submissions command to write them to the database.
+SUBMISSIONS_DEAD_LETTER = Path(
+    env("SUBMISSIONS_DEAD_LETTER", BASE_DIR / "collect" / "dead-submissions.jsonl")
+)
+
+# Cache
+# Queued submissions and scheduled grading tasks are tracked in the cache, so
+# deployments with more than one process need a shared backend, like
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://localhost:6379/1.
+CACHES = {
+    "default": {
+        "BACKEND": env("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": env("CACHE_LOCATION", ""),
+    }
+}
+
+# Grading
+# Submissions are graded by celery tasks in batches of GRADING_BATCH_SIZE
+# (see codehood.submissions.tasks). A task starts GRADING_DELAY seconds after
+# the first submission it grades, collecting the ones that arrive meanwhile.
+GRADING_BATCH_SIZE = 500
+GRADING_DELAY = 1.0
+
+# Celery
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -32,6 +32,11 @@ CACHES = {
     }
 }
 
+# Run celery tasks in the request process, no broker or worker required.
+CELERY_BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_TASK_ALWAYS_EAGER = True
+
 # MIDDLEWARE.append(
 #     "debug_toolbar.middleware.DebugToolbarMiddleware",
 # )
@@ -9,5 +9,9 @@ DATABASES = {
         "NAME": BASE_DIR / "testing.sqlite3",
     }
 }
+CELERY_BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS